@@ -0,0 +1,710 @@
+"""
+Module to cache the aggregated pipeline data on the local storage, the asset IDs of the asset GAIs, the last received values, the parsed report templates and the created reports
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+import utils.logger as log
+
+
+LOGGER_NAME = "DataCache"
+LOGGER_LEVEL = log.LOG_LEVEL_DEBUG
+
+DEFAULT_OPEN_PERIOD_TTL = 3600
+DEFAULT_CLOSED_PERIOD_GRACE = 86400
+DEFAULT_MAX_SIZE_MB = 256
+DEFAULT_LAST_VALUE_TTL = 3600
+DEFAULT_LAST_VALUE_ENTRIES = 100000
+
+
+class DataCache:
+	"""
+	Cache for the responses of the aggregated data requests.
+
+	The entries are stored in a SQLite database and are keyed by asset, attribute, raster and time range.
+	Closed periods will never change and are kept until the cache exceeds its size.
+	Periods which are still open will expire after the configured time to live.
+	"""
+
+	logger = log.createLogger(LOGGER_NAME, loglevel=LOGGER_LEVEL)
+
+	enabled = True
+	"""
+	Set to False to bypass the cache
+	"""
+
+	openPeriodTtl = DEFAULT_OPEN_PERIOD_TTL
+	"""
+	Time to live in seconds for time ranges reaching into the future
+	"""
+
+	closedPeriodGrace = DEFAULT_CLOSED_PERIOD_GRACE
+	"""
+	Time in seconds after the end of a time range in which it is still handled as open. Late data may still arrive
+	"""
+
+	maxSize = DEFAULT_MAX_SIZE_MB * 1024 * 1024
+	"""
+	Maximum size of the cached data in bytes
+	"""
+
+	hits = 0
+	misses = 0
+
+	def __init__(self, path:str, logLevel:int=log.LOG_LEVEL_DEBUG) -> None:
+		"""
+		Initialize the cache
+
+		Params
+		------
+		path:str		= File path of the SQLite database
+		logLevel:int	= Log level of the cache
+		"""
+
+		self.logger.setLevel(logLevel)
+		self.path = path
+		self.hits = 0
+		self.misses = 0
+		self._lock = threading.Lock()
+
+		os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+		self._connection = sqlite3.connect(self.path, check_same_thread=False)
+		self._connection.execute("""CREATE TABLE IF NOT EXISTS aggregated (
+										key TEXT PRIMARY KEY,
+										asset TEXT,
+										attribute TEXT,
+										raster TEXT,
+										startDate TEXT,
+										endDate TEXT,
+										expires REAL,
+										lastUsed REAL,
+										size INTEGER,
+										data BLOB)""")
+		self._connection.commit()
+
+	def configure(self, config:dict) -> None:
+		"""
+		Configure the cache
+
+		Params
+		------
+		config:dict		= Cache settings {"enabled", "openPeriodTtl", "closedPeriodGrace", "maxSizeMb"}
+		"""
+
+		self.enabled = bool(config.get("enabled", True))
+		self.openPeriodTtl = int(config.get("openPeriodTtl", DEFAULT_OPEN_PERIOD_TTL))
+		self.closedPeriodGrace = int(config.get("closedPeriodGrace", DEFAULT_CLOSED_PERIOD_GRACE))
+		self.maxSize = int(float(config.get("maxSizeMb", DEFAULT_MAX_SIZE_MB)) * 1024 * 1024)
+
+	def get(self, asset:str, attribute:str, raster:str, startDate:str, endDate:str) -> tuple[list, int] | None:
+		"""
+		Get a cached response
+
+		Params
+		------
+		asset:str		= Asset GAI or asset ID of the request
+		attribute:str	= Requested attribute
+		raster:str		= Requested raster
+		startDate:str	= Start of the requested time range as iso string
+		endDate:str		= End of the requested time range as iso string
+
+		Return
+		------
+		-> (list: cached response, int: asset ID) | None if nothing valid is cached
+		"""
+
+		if not self.enabled:
+			return None
+
+		_key = self._key(asset, attribute, raster, startDate, endDate)
+		_now = time.time()
+		_value = None
+
+		with self._lock:
+
+			#A locked or broken database is handled like a missing entry
+			try:
+				_row = self._connection.execute("SELECT expires, data FROM aggregated WHERE key = ?", (_key,)).fetchone()
+
+				if (_row != None) and ((_row[0] == None) or (_row[0] > _now)):
+					self._connection.execute("UPDATE aggregated SET lastUsed = ? WHERE key = ?", (_now, _key))
+					self._connection.commit()
+					_value = pickle.loads(_row[1])
+
+			except sqlite3.Error as err:
+				self.logger.warning(f"Could not read data from the cache: {err}")
+
+			if _value == None:
+				self.misses += 1
+			else:
+				self.hits += 1
+
+		if _value != None:
+			self.logger.debug(f"Cache hit: asset: {asset} // attribute: {attribute} // raster: {raster} // start date: {startDate} // end date: {endDate}")
+
+		return _value
+
+	def set(self, asset:str, attribute:str, raster:str, startDate:str, endDate:str, openPeriod:bool, data:list, assetId:int) -> None:
+		"""
+		Store a response in the cache
+
+		Params
+		------
+		asset:str		= Asset GAI or asset ID of the request
+		attribute:str	= Requested attribute
+		raster:str		= Requested raster
+		startDate:str	= Start of the requested time range as iso string
+		endDate:str		= End of the requested time range as iso string
+		openPeriod:bool	= True if the time range is not closed yet. The entry will expire after the time to live
+		data:list		= Response of the request
+		assetId:int		= Asset ID of the requested asset
+		"""
+
+		if not self.enabled:
+			return
+
+		_key = self._key(asset, attribute, raster, startDate, endDate)
+		_now = time.time()
+		_data = pickle.dumps((data, assetId))
+
+		if openPeriod:
+			_expires = _now + self.openPeriodTtl
+		else:
+			_expires = None
+
+		try:
+			with self._lock:
+				self._connection.execute("INSERT OR REPLACE INTO aggregated VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+										(_key, str(asset), attribute, raster, startDate, endDate, _expires, _now, len(_data), _data))
+				self._connection.commit()
+				self._evict()
+
+		except sqlite3.Error as err:
+			self.logger.warning(f"Could not store data in the cache: {err}")
+
+	def logStatistics(self) -> None:
+		"""
+		Log the hit and miss counters and reset them
+		"""
+
+		with self._lock:
+			_hits, _misses = self.hits, self.misses
+			self.hits = 0
+			self.misses = 0
+
+		_requests = _hits + _misses
+		if _requests > 0:
+			self.logger.info(f"Cache hits: {_hits} // misses: {_misses} // hit rate: {(_hits / _requests) * 100:.1f}%")
+
+	def _evict(self) -> None:
+		"""
+		Remove expired entries and the least recently used entries until the cache fits its maximum size.
+		Must be called with the lock held.
+		"""
+
+		self._connection.execute("DELETE FROM aggregated WHERE expires IS NOT NULL AND expires <= ?", (time.time(),))
+
+		_size = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM aggregated").fetchone()[0]
+
+		if _size > self.maxSize:
+
+			_removed = 0
+			for _key, _entrySize in self._connection.execute("SELECT key, size FROM aggregated ORDER BY lastUsed ASC").fetchall():
+
+				if _size <= self.maxSize:
+					break
+
+				self._connection.execute("DELETE FROM aggregated WHERE key = ?", (_key,))
+				_size -= _entrySize
+				_removed += 1
+
+			self.logger.debug(f"Evicted {_removed} entries from the cache")
+
+		self._connection.commit()
+
+	def _key(self, asset:str, attribute:str, raster:str, startDate:str, endDate:str) -> str:
+		"""
+		Create the key of a cache entry
+		"""
+
+		return f"{asset}|{attribute}|{raster}|{startDate}|{endDate}"
+
+
+class AssetIdCache:
+	"""
+	Process wide cache to resolve asset GAIs to asset IDs.
+
+	The mapping is effectively static. Therefore every GAI is only resolved once until the cache is cleared.
+	"""
+
+	logger = log.createLogger("AssetIdCache", loglevel=LOGGER_LEVEL)
+
+	lookups = 0
+	"""
+	Number of asset ID requests sent to eliona since the last statistics
+	"""
+
+	generation = 0
+	"""
+	Number of times the cache was cleared. The caches of the render processes are outdated if it changed
+	"""
+
+	def __init__(self, logLevel:int=log.LOG_LEVEL_DEBUG) -> None:
+		"""
+		Initialize the cache
+
+		Params
+		------
+		logLevel:int	= Log level of the cache
+		"""
+
+		self.logger.setLevel(logLevel)
+		self.lookups = 0
+		self.generation = 0
+		self._assetIds = {}
+		self._lock = threading.Lock()
+
+	def get(self, eliona, assetGai:str) -> int:
+		"""
+		Get the asset ID of an asset GAI. Will ask eliona if the GAI is not cached yet
+
+		Params
+		------
+		eliona:ElionaApiHandler	= Connected eliona API Handler instance
+		assetGai:str			= Asset GAI to resolve
+
+		Return
+		------
+		-> int 					= Asset ID of the GAI. 0 if it could not be resolved
+		"""
+
+		with self._lock:
+			_assetId = self._assetIds.get(assetGai, None)
+
+		if _assetId == None:
+
+			_assetId = eliona.get_asset_id(asset_gai=assetGai)
+			self.lookups += 1
+
+			if _assetId:
+				with self._lock:
+					self._assetIds[assetGai] = _assetId
+			else:
+				_assetId = 0
+
+		return _assetId
+
+	def prefill(self, eliona, assetGais:set) -> None:
+		"""
+		Resolve all given asset GAIs which are not cached yet
+
+		Params
+		------
+		eliona:ElionaApiHandler	= Connected eliona API Handler instance
+		assetGais:set			= Asset GAIs to resolve
+		"""
+
+		for _assetGai in assetGais:
+			self.get(eliona=eliona, assetGai=_assetGai)
+
+		self.logger.debug(f"Asset ID cache holds {len(self._assetIds)} GAIs. Asset ID requests: {self.lookups}")
+		self.lookups = 0
+
+	def clear(self) -> None:
+		"""
+		Remove all cached asset IDs
+		"""
+
+		with self._lock:
+			self._assetIds = {}
+			self.generation += 1
+
+
+class LastValueCache:
+	"""
+	Process wide memo of the last received values before a time stamp.
+
+	All reports of the process share the memo. The fillNone "last" cells of different reports and users with the same assets only search once.
+	An entry expires after its time to live, as late data may still change the last value. The least recently used entries are removed above the maximum number of entries.
+	"""
+
+	_instance = None
+	_instanceLock = threading.Lock()
+
+	@classmethod
+	def shared(cls) -> "LastValueCache":
+		"""
+		Get the memo shared by all reports of the process
+
+		Return
+		------
+		-> LastValueCache	= Shared memo
+		"""
+
+		with cls._instanceLock:
+
+			if cls._instance == None:
+				cls._instance = LastValueCache()
+
+			return cls._instance
+
+	def __init__(self, ttl:float=DEFAULT_LAST_VALUE_TTL, maxEntries:int=DEFAULT_LAST_VALUE_ENTRIES) -> None:
+		"""
+		Initialize the memo
+
+		Params
+		------
+		ttl:float			= Time to live of an entry in seconds
+		maxEntries:int		= Maximum number of entries
+		"""
+
+		self.ttl = ttl
+		self.maxEntries = maxEntries
+		self._values = OrderedDict()
+		self._lock = threading.Lock()
+
+	def get(self, key:tuple):
+		"""
+		Get a memorized value
+
+		Params
+		------
+		key:tuple		= Connection, asset, attribute and time stamp of the value
+
+		Return
+		------
+		-> Memorized value // None if not memorized or expired
+		"""
+
+		with self._lock:
+			_entry = self._values.get(key, None)
+
+			if _entry == None:
+				return None
+
+			if _entry[0] <= time.monotonic():
+				del self._values[key]
+				return None
+
+			self._values.move_to_end(key)
+			return _entry[1]
+
+	def set(self, key:tuple, value) -> None:
+		"""
+		Memorize a value
+
+		Params
+		------
+		key:tuple		= Connection, asset, attribute and time stamp of the value
+		value			= Value to memorize. None is not memorized
+		"""
+
+		if value == None:
+			return
+
+		with self._lock:
+			self._values[key] = (time.monotonic() + self.ttl, value)
+			self._values.move_to_end(key)
+
+			while len(self._values) > self.maxEntries:
+				self._values.popitem(last=False)
+
+	def clear(self) -> None:
+		"""
+		Remove all memorized values
+		"""
+
+		with self._lock:
+			self._values = OrderedDict()
+
+	def __len__(self) -> int:
+		"""
+		Number of memorized values
+		"""
+
+		with self._lock:
+			return len(self._values)
+
+
+class TemplateCache:
+	"""
+	Process wide cache of the parsed report templates.
+
+	The entries are keyed by the template file and the settings used to parse it.
+	An entry is parsed again as soon as the modification time or the size of the file changes.
+	"""
+
+	logger = log.createLogger("TemplateCache", loglevel=LOGGER_LEVEL)
+
+	hits = 0
+	misses = 0
+
+	def __init__(self, logLevel:int=log.LOG_LEVEL_DEBUG) -> None:
+		"""
+		Initialize the cache
+
+		Params
+		------
+		logLevel:int	= Log level of the cache
+		"""
+
+		self.logger.setLevel(logLevel)
+		self.hits = 0
+		self.misses = 0
+		self._templates = {}
+		self._lock = threading.Lock()
+
+	def get(self, path:str, key:tuple, loader) -> dict | None:
+		"""
+		Get a parsed template. Will call the loader if the template is not cached yet or the file has changed
+
+		Params
+		------
+		path:str		= File path of the template
+		key:tuple		= Settings used to parse the template. Templates parsed with other settings are cached separately
+		loader			= Function without arguments to parse the template. Returns the entry to cache or None if the template is invalid
+
+		Return
+		------
+		-> dict 		= Cached entry of the template // None if the template could not be parsed
+		"""
+
+		try:
+			_stat = os.stat(path)
+			_signature = (_stat.st_mtime_ns, _stat.st_size)
+		except OSError:
+			#Let the loader report the missing file
+			return loader()
+
+		with self._lock:
+			_cached = self._templates.get((path, key), None)
+
+			if (_cached != None) and (_cached[0] == _signature):
+				self.hits += 1
+				return _cached[1]
+
+			self.misses += 1
+
+		#The signature is taken before parsing. A file changed meanwhile is parsed again on the next request
+		_entry = loader()
+
+		if _entry != None:
+			with self._lock:
+				self._templates[(path, key)] = (_signature, _entry)
+			self.logger.debug(f"Parsed template: {path}")
+
+		return _entry
+
+	def logStatistics(self) -> None:
+		"""
+		Log the hit and miss counters and reset them
+		"""
+
+		with self._lock:
+			_hits, _misses = self.hits, self.misses
+			self.hits = 0
+			self.misses = 0
+
+		if (_hits + _misses) > 0:
+			self.logger.debug(f"Template cache hits: {_hits} // parsed templates: {_misses}")
+
+	def clear(self) -> None:
+		"""
+		Remove all cached templates
+		"""
+
+		with self._lock:
+			self._templates = {}
+
+
+
+class KeyLocks:
+	"""
+	Locks by key. A lock only exists while a thread holds or waits for it, so the number of locks does not grow with the number of keys
+	"""
+
+	def __init__(self) -> None:
+		"""
+		Initialize the locks
+		"""
+
+		self._locks = {}
+		self._lock = threading.Lock()
+
+	@contextmanager
+	def hold(self, key:str):
+		"""
+		Hold the lock of a key. Waits till other threads holding the same key are done
+
+		Params
+		------
+		key:str		= Key to lock
+		"""
+
+		with self._lock:
+			_entry = self._locks.setdefault(key, [threading.Lock(), 0])
+			_entry[1] += 1
+
+		try:
+			with _entry[0]:
+				yield
+
+		finally:
+			with self._lock:
+				_entry[1] -= 1
+				if _entry[1] == 0:
+					del self._locks[key]
+
+	def __len__(self) -> int:
+		"""
+		Number of locks held or waited for
+		"""
+
+		with self._lock:
+			return len(self._locks)
+
+
+class ArtifactStore:
+	"""
+	Store of the created report files.
+
+	The files are addressed by the hash of the report settings, the template and the time span.
+	Every report and time span is created only once, no matter how many reports or users reference it.
+	A report is created in a temporary directory and moved to the store once complete. Partially written files are never returned.
+	"""
+
+	logger = log.createLogger("ArtifactStore", loglevel=LOGGER_LEVEL)
+
+	IGNORED_SETTINGS = ("tempPath", "receiver")
+	"""
+	Report settings not affecting the content of the report
+	"""
+
+	hits = 0
+	misses = 0
+
+	def __init__(self, path:str, logLevel:int=log.LOG_LEVEL_DEBUG) -> None:
+		"""
+		Initialize the store
+
+		Params
+		------
+		path:str		= Directory of the store
+		logLevel:int	= Log level of the store
+		"""
+
+		self.logger.setLevel(logLevel)
+		self.path = path
+		self.hits = 0
+		self.misses = 0
+		self._locks = KeyLocks()
+		self._lock = threading.Lock()
+
+		os.makedirs(self.path, exist_ok=True)
+
+	def key(self, settings:dict, connectionSettings:dict, startDt, endDt) -> str:
+		"""
+		Create the content address of a report
+
+		Params
+		------
+		settings:dict				= Settings of the report
+		connectionSettings:dict		= Connection settings of the eliona handler
+		startDt:datetime			= Start of the report
+		endDt:datetime				= End of the report
+
+		Return
+		------
+		-> str 						= Hash of the report
+		"""
+
+		#A changed template creates a new report
+		try:
+			_stat = os.stat(settings.get("templateFile", ""))
+			_template = [_stat.st_mtime_ns, _stat.st_size]
+		except OSError:
+			_template = None
+
+		_content = {"report": {_key: _value for _key, _value in settings.items() if _key not in self.IGNORED_SETTINGS},
+					"connection": [connectionSettings.get("host"), connectionSettings.get("api"), connectionSettings.get("projectId")],
+					"template": _template,
+					"start": startDt.isoformat(),
+					"end": endDt.isoformat()}
+
+		return hashlib.sha256(json.dumps(_content, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+	def get(self, key:str, fileName:str, create) -> str | None:
+		"""
+		Get the report file of the key. Will create the report if not stored yet.
+		Requests for the same key wait till the first one is done
+
+		Params
+		------
+		key:str			= Content address of the report
+		fileName:str	= File name of the report
+		create			= Called with the path to create the report at. Returns True if the report was created
+
+		Return
+		------
+		-> str | None 	= Path of the stored report. None if the report could not be created
+		"""
+
+		_artifactPath = os.path.join(self.path, key)
+		_filePath = os.path.join(_artifactPath, fileName)
+
+		with self._locks.hold(key=key):
+
+			if os.path.isfile(_filePath):
+				with self._lock:
+					self.hits += 1
+				self.logger.debug(f"Reuse the stored report: {_filePath}")
+				return _filePath
+
+			#Remove the rest of a report cleaned up by the temp file handling
+			shutil.rmtree(_artifactPath, ignore_errors=True)
+
+			_tempPath = os.path.join(self.path, f".{key}.{os.getpid()}.{threading.get_ident()}")
+			shutil.rmtree(_tempPath, ignore_errors=True)
+			os.makedirs(_tempPath)
+
+			try:
+				if create(os.path.join(_tempPath, fileName)) and os.path.isfile(os.path.join(_tempPath, fileName)):
+					os.replace(_tempPath, _artifactPath)
+					with self._lock:
+						self.misses += 1
+					return _filePath
+			finally:
+				shutil.rmtree(_tempPath, ignore_errors=True)
+
+		return None
+
+	def cleanUp(self) -> None:
+		"""
+		Remove the empty report directories left by the temp file handling and log the statistics
+		"""
+
+		with self._lock:
+			_hits, _misses = self.hits, self.misses
+
+		self.logger.debug(f"Report store hits: {_hits} misses: {_misses}")
+
+		for _entry in os.listdir(self.path):
+
+			_entryPath = os.path.join(self.path, _entry)
+
+			if os.path.isdir(_entryPath) and not _entry.startswith(".") and len(os.listdir(_entryPath)) == 0:
+
+				with self._locks.hold(key=_entry):
+					try:
+						os.rmdir(_entryPath)
+					except OSError:
+						pass
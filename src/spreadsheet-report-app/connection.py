@@ -0,0 +1,189 @@
+"""
+Module to share the eliona connections between the reports and mails
+"""
+
+import json
+import threading
+import utils.logger as log
+from contextlib import contextmanager
+from eliona_modules.api.core.eliona_core import ElionaApiHandler, ConStat
+
+
+LOGGER_NAME = "Connection"
+LOGGER_LEVEL = log.LOG_LEVEL_DEBUG
+
+
+class ConnectionManager:
+	"""
+	Process wide manager of the eliona connections.
+
+	The thread safety of the eliona API handler is not guaranteed. A handler is therefore never used by two threads at once:
+	get() returns a handler owned by the calling thread and lease() lends an idle handler of a shared pool to one thread at a time.
+	The handlers and their HTTP sessions are reused by all reports and mails.
+	The connection of a handler is only checked once per cycle. The check runs outside the lock of the manager.
+	"""
+
+	logger = log.createLogger(LOGGER_NAME, loglevel=LOGGER_LEVEL)
+
+	checks = 0
+	"""
+	Number of connection checks since the start of the cycle
+	"""
+
+	def __init__(self, logLevel:int=log.LOG_LEVEL_DEBUG) -> None:
+		"""
+		Initialize the manager
+
+		Params
+		------
+		logLevel:int	= Log level of the manager
+		"""
+
+		self.logger.setLevel(logLevel)
+		self.checks = 0
+		self._cycle = 0
+		self._generation = 0
+		self._owned = threading.local()
+		self._idle = {}
+		self._handlers = 0
+		self._lock = threading.Lock()
+
+	def get(self, settings:dict) -> ElionaApiHandler:
+		"""
+		Get the eliona handler of the calling thread for a connection configuration. The connection is checked if not done in the current cycle
+
+		Params
+		------
+		settings:dict	= Connection settings for the eliona handler {"host", "api", "projectId", "apiKey", "dbTimeZone"}
+
+		Return
+		------
+		-> ElionaApiHandler	= Eliona handler of the calling thread. Check eliona.connection for the connection state
+		"""
+
+		_key = self._key(settings=settings)
+
+		with self._lock:
+			_generation = self._generation
+
+		_entries = getattr(self._owned, "entries", None)
+		if (_entries == None) or (self._owned.generation != _generation):
+			_entries = {}
+			self._owned.entries = _entries
+			self._owned.generation = _generation
+
+		_entry = _entries.get(_key, None)
+		if _entry == None:
+			_entry = self._create(settings=settings)
+			_entries[_key] = _entry
+
+		self._check(entry=_entry, settings=settings)
+
+		return _entry["eliona"]
+
+	@contextmanager
+	def lease(self, settings:dict):
+		"""
+		Lend an idle eliona handler of a connection configuration to the calling thread. The connection is checked if not done in the current cycle.
+		The handler is given back to the pool when the context is left
+
+		Params
+		------
+		settings:dict	= Connection settings for the eliona handler {"host", "api", "projectId", "apiKey", "dbTimeZone"}
+
+		Return
+		------
+		-> ElionaApiHandler	= Eliona handler for the exclusive use inside the context. Check eliona.connection for the connection state
+		"""
+
+		_key = self._key(settings=settings)
+
+		with self._lock:
+			_generation = self._generation
+			_idle = self._idle.get(_key, [])
+			_entry = _idle.pop() if len(_idle) > 0 else None
+
+		if _entry == None:
+			_entry = self._create(settings=settings)
+
+		try:
+			self._check(entry=_entry, settings=settings)
+			yield _entry["eliona"]
+		finally:
+			with self._lock:
+				#Handlers of a cleared generation are dropped
+				if _generation == self._generation:
+					self._idle.setdefault(_key, []).append(_entry)
+
+	def newCycle(self) -> None:
+		"""
+		Start a new cycle. The connections will be checked again on the next request
+		"""
+
+		with self._lock:
+			self.logger.debug(f"Open connections: {self._handlers}. Connection checks: {self.checks}")
+			self._cycle += 1
+			self.checks = 0
+
+	def clear(self) -> None:
+		"""
+		Remove all handlers. Handlers owned by threads are replaced on their next request
+		"""
+
+		with self._lock:
+			self._generation += 1
+			self._cycle += 1
+			self._idle = {}
+			self._handlers = 0
+
+	def _create(self, settings:dict) -> dict:
+		"""
+		Create a new unchecked eliona handler
+
+		Params
+		------
+		settings:dict	= Connection settings for the eliona handler
+
+		Return
+		------
+		-> dict	= Entry of the handler {"eliona", "cycle"}
+		"""
+
+		self.logger.debug("Host: " + str(settings["host"]))
+		_eliona = ElionaApiHandler(settings=settings, logger=LOGGER_NAME)
+
+		with self._lock:
+			self._handlers += 1
+
+		return {"eliona": _eliona, "cycle": None}
+
+	def _check(self, entry:dict, settings:dict) -> None:
+		"""
+		Check the connection of a handler if not done in the current cycle. The entry must only be used by the calling thread
+
+		Params
+		------
+		entry:dict		= Entry of the handler {"eliona", "cycle"}
+		settings:dict	= Connection settings of the handler
+		"""
+
+		with self._lock:
+			_cycle = self._cycle
+
+		if entry["cycle"] == _cycle:
+			return
+
+		entry["eliona"].check_connection()
+		entry["cycle"] = _cycle
+
+		with self._lock:
+			self.checks += 1
+
+		self.logger.debug(f"Checked connection to host: {settings['host']}. Connected: {entry['eliona'].connection == ConStat.CONNECTED}")
+
+	def _key(self, settings:dict) -> str:
+		"""
+		Create the key of a connection configuration
+		"""
+
+		return json.dumps(settings, sort_keys=True, default=str)
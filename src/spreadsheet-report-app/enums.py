@@ -24,3 +24,15 @@ class Schedule(Enum):
 	MONTHLY = 1,
 	WEEKLY = 2,
 	DAILY = 3
+
+
+class PlaceholderKind(Enum):
+	"""
+	Kinds of json configurations in the template cells
+	"""
+
+	TIME_STAMP_START = 0
+	TIME_STAMP_END = 1
+	DATA = 2
+
+	UNKNOWN = 500
@@ -0,0 +1,574 @@
+"""
+Module to calculate the formulas of a single sheet without the formulas package
+"""
+
+import re
+from openpyxl.utils import column_index_from_string
+import utils.logger as log
+
+
+LOGGER_NAME = "FormulaEvaluator"
+LOGGER_LEVEL = log.LOG_LEVEL_DEBUG
+
+TOKEN_PATTERN = re.compile(r"""
+	\s*(?:
+		(?P<string>"(?:[^"]|"")*")
+		|(?P<reference>(?:(?:'(?:[^']|'')+'|[A-Za-z_][A-Za-z0-9_\.]*)!)?\$?[A-Za-z]{1,3}\$?[0-9]+(?::\$?[A-Za-z]{1,3}\$?[0-9]+)?(?![A-Za-z0-9_\(]))
+		|(?P<number>[0-9]+\.?[0-9]*(?:[eE][+-]?[0-9]+)?|\.[0-9]+(?:[eE][+-]?[0-9]+)?)
+		|(?P<name>[A-Za-z_][A-Za-z0-9_\.]*)
+		|(?P<operator><>|<=|>=|[-+*/^&=<>%(),])
+	)""", re.VERBOSE)
+"""
+Tokens of the supported formulas. Everything else can not be calculated
+"""
+
+CELL_PATTERN = re.compile(r"\$?([A-Za-z]{1,3})\$?([0-9]+)")
+
+BINARY_OPERATORS = {
+	"=": 1, "<>": 1, "<": 1, ">": 1, "<=": 1, ">=": 1,
+	"&": 2,
+	"+": 3, "-": 3,
+	"*": 4, "/": 4,
+	"^": 5,
+}
+"""
+Binary operators and their precedence. Higher values bind stronger
+"""
+
+
+class UnsupportedFormulaError(Exception):
+	"""
+	Raised if a formula can not be calculated by the evaluator.
+	The caller should fall back to the formulas package
+	"""
+
+
+class Range:
+	"""
+	Resolved cell range of a formula argument
+	"""
+
+	def __init__(self, values:list) -> None:
+		self.values = values
+
+
+class FormulaEvaluator:
+	"""
+	Calculate the formulas of one sheet of an openpyxl workbook.
+
+	Only the cells reachable from the formulas of the sheet are evaluated. Referenced formulas on other sheets are calculated on demand.
+	Supported are numbers, strings, booleans, cell references and ranges, the arithmetic, comparison and concatenation operators
+	and the functions SUM, AVERAGE, MIN, MAX and IF. Everything else raises an UnsupportedFormulaError.
+	"""
+
+	logger = log.createLogger(LOGGER_NAME, loglevel=LOGGER_LEVEL)
+
+	def __init__(self, workbook, logLevel:int=log.LOG_LEVEL_DEBUG) -> None:
+		"""
+		Initialize the evaluator
+
+		Params
+		------
+		workbook:Workbook	= Openpyxl workbook loaded with the formulas (not data_only)
+		logLevel:int		= Log level of the evaluator
+		"""
+
+		self.logger.setLevel(logLevel)
+		self.workbook = workbook
+		self._sheetNames = {_name.upper(): _name for _name in workbook.sheetnames}
+		self._cells = {}
+		self._results = {}
+		self._evaluating = set()
+
+	def evaluateSheet(self, sheet:str) -> list:
+		"""
+		Get the values of a sheet with all formulas calculated
+
+		Params
+		------
+		sheet:str	= Name of the sheet
+
+		Return
+		------
+		-> list		= Rows of the sheet like openpyxl Worksheet.values
+
+		Raise
+		------
+		UnsupportedFormulaError if any reachable formula can not be calculated
+		"""
+
+		_sheet = self.__sheetName(sheet)
+		_rows = []
+
+		for _row in self.workbook[_sheet].iter_rows():
+
+			_values = []
+			for _cell in _row:
+				if _cell.data_type == "f":
+					_values.append(normalizeValue(self.__cellValue(sheet=_sheet, row=_cell.row, column=_cell.column)))
+				else:
+					_values.append(normalizeValue(_cell.value))
+
+			_rows.append(tuple(_values))
+
+		return _rows
+
+	def __sheetName(self, sheet:str) -> str:
+		"""
+		Get the name of a sheet as used in the workbook. Sheet names are not case sensitive
+		"""
+
+		_sheet = self._sheetNames.get(sheet.upper(), None)
+
+		if _sheet == None:
+			raise UnsupportedFormulaError(f"Unknown sheet: {sheet}")
+
+		return _sheet
+
+	def __sheetCells(self, sheet:str) -> dict:
+		"""
+		Get the cells of a sheet by (row, column). The dictionary is only created once per sheet
+		"""
+
+		if sheet not in self._cells:
+			self._cells[sheet] = {(_cell.row, _cell.column): _cell for _row in self.workbook[sheet].iter_rows() for _cell in _row}
+
+		return self._cells[sheet]
+
+	def __cellValue(self, sheet:str, row:int, column:int):
+		"""
+		Get the value of a cell. Formulas are calculated once and memorized
+		"""
+
+		_cell = self.__sheetCells(sheet).get((row, column), None)
+
+		if _cell == None:
+			return None
+
+		if _cell.data_type != "f":
+			return _cell.value
+
+		_key = (sheet, row, column)
+		if _key in self._results:
+			return self._results[_key]
+
+		if _key in self._evaluating:
+			raise UnsupportedFormulaError(f"Circular reference: {sheet}!{_cell.coordinate}")
+
+		if not isinstance(_cell.value, str):
+			raise UnsupportedFormulaError(f"Array formula: {sheet}!{_cell.coordinate}")
+
+		self._evaluating.add(_key)
+		try:
+			_parser = _Parser(evaluator=self, sheet=sheet, formula=_cell.value)
+			_value = _parser.evaluate()
+		finally:
+			self._evaluating.discard(_key)
+
+		if isinstance(_value, Range):
+			raise UnsupportedFormulaError(f"Range as cell result: {sheet}!{_cell.coordinate}")
+
+		self._results[_key] = _value
+		return _value
+
+	def resolveReference(self, sheet:str, reference:str):
+		"""
+		Resolve a cell reference or a range of a formula
+
+		Params
+		------
+		sheet:str		= Sheet of the formula
+		reference:str	= Reference like A1, $A$1, Sheet1!A1:B2 or 'My Sheet'!A1
+
+		Return
+		------
+		-> Value of the cell // Range with the values of all cells in the range
+		"""
+
+		if "!" in reference:
+			_sheetPart, reference = reference.rsplit("!", 1)
+			if _sheetPart.startswith("'"):
+				_sheetPart = _sheetPart[1:-1].replace("''", "'")
+			sheet = self.__sheetName(_sheetPart)
+
+		_cells = [CELL_PATTERN.fullmatch(_part) for _part in reference.split(":")]
+		_rows = [int(_match.group(2)) for _match in _cells]
+		_columns = [column_index_from_string(_match.group(1).upper()) for _match in _cells]
+
+		if len(_cells) == 1:
+			return self.__cellValue(sheet=sheet, row=_rows[0], column=_columns[0])
+
+		_values = []
+		for _row in range(min(_rows), max(_rows) + 1):
+			for _column in range(min(_columns), max(_columns) + 1):
+				_values.append(self.__cellValue(sheet=sheet, row=_row, column=_column))
+
+		return Range(values=_values)
+
+
+class _Parser:
+	"""
+	Recursive descent parser which evaluates a formula while parsing it
+	"""
+
+	def __init__(self, evaluator:FormulaEvaluator, sheet:str, formula:str) -> None:
+		"""
+		Tokenize the formula
+
+		Params
+		------
+		evaluator:FormulaEvaluator	= Evaluator to resolve the references
+		sheet:str					= Sheet of the formula
+		formula:str					= Formula including the leading "="
+		"""
+
+		self.evaluator = evaluator
+		self.sheet = sheet
+		self.formula = formula
+		self.tokens = []
+		self.position = 0
+
+		_text = formula[1:] if formula.startswith("=") else formula
+		_index = 0
+
+		while _index < len(_text):
+
+			if _text[_index:].strip() == "":
+				break
+
+			_match = TOKEN_PATTERN.match(_text, _index)
+			if (_match == None) or (_match.end() == _index):
+				raise UnsupportedFormulaError(f"Unknown syntax: {formula}")
+
+			self.tokens.append((_match.lastgroup, _match.group(_match.lastgroup)))
+			_index = _match.end()
+
+	def evaluate(self):
+		"""
+		Evaluate the whole formula
+		"""
+
+		_value = self.__expression(0)
+
+		if self.position != len(self.tokens):
+			raise UnsupportedFormulaError(f"Unknown syntax: {self.formula}")
+
+		return _value
+
+	def __peek(self) -> tuple:
+		if self.position < len(self.tokens):
+			return self.tokens[self.position]
+		return (None, None)
+
+	def __next(self) -> tuple:
+		_token = self.__peek()
+		self.position += 1
+		return _token
+
+	def __expect(self, operator:str) -> None:
+		if self.__next() != ("operator", operator):
+			raise UnsupportedFormulaError(f"Expected '{operator}': {self.formula}")
+
+	def __expression(self, precedence:int):
+		"""
+		Evaluate an expression with operators binding stronger than the given precedence
+		"""
+
+		_left = self.__unary()
+
+		while True:
+			_kind, _operator = self.__peek()
+
+			if (_kind != "operator") or (_operator not in BINARY_OPERATORS) or (BINARY_OPERATORS[_operator] <= precedence):
+				return _left
+
+			self.position += 1
+			_right = self.__expression(BINARY_OPERATORS[_operator])
+			_left = self.__binary(_operator, _left, _right)
+
+	def __unary(self):
+		"""
+		Evaluate unary operators, the percent operator and the operands
+		"""
+
+		_kind, _value = self.__peek()
+
+		if (_kind == "operator") and (_value in ("-", "+")):
+			self.position += 1
+			_operand = _number(self.__unary())
+			return -_operand if _value == "-" else _operand
+
+		_operand = self.__operand()
+
+		while self.__peek() == ("operator", "%"):
+			self.position += 1
+			_operand = _number(_operand) / 100
+
+		return _operand
+
+	def __operand(self):
+		"""
+		Evaluate a single operand
+		"""
+
+		_kind, _value = self.__next()
+
+		if _kind == "number":
+			return float(_value) if any(_char in _value for _char in ".eE") else int(_value)
+
+		elif _kind == "string":
+			return _value[1:-1].replace('""', '"')
+
+		elif _kind == "reference":
+			return self.evaluator.resolveReference(sheet=self.sheet, reference=_value)
+
+		elif (_kind == "operator") and (_value == "("):
+			_result = self.__expression(0)
+			self.__expect(")")
+			return _result
+
+		elif _kind == "name":
+
+			_name = _value.upper()
+
+			if self.__peek() == ("operator", "("):
+				self.position += 1
+				return self.__function(_name)
+			elif _name == "TRUE":
+				return True
+			elif _name == "FALSE":
+				return False
+
+		raise UnsupportedFormulaError(f"Unsupported operand '{_value}': {self.formula}")
+
+	def __function(self, name:str):
+		"""
+		Evaluate a function call. The opening bracket is already consumed
+		"""
+
+		if name == "IF":
+			return self.__if()
+
+		if name not in FUNCTIONS:
+			raise UnsupportedFormulaError(f"Unsupported function {name}: {self.formula}")
+
+		_arguments = []
+		if self.__peek() != ("operator", ")"):
+			while True:
+				_arguments.append(self.__expression(0))
+				if self.__peek() != ("operator", ","):
+					break
+				self.position += 1
+
+		self.__expect(")")
+
+		return FUNCTIONS[name](_numbers(_arguments))
+
+	def __if(self):
+		"""
+		Evaluate an IF function. Only the selected branch is evaluated
+		"""
+
+		_condition = _boolean(self.__expression(0))
+		_results = []
+
+		while self.__peek() == ("operator", ","):
+			self.position += 1
+
+			if (_condition and (len(_results) == 0)) or ((not _condition) and (len(_results) == 1)):
+				_results.append(self.__expression(0))
+			else:
+				_results.append(self.__skip())
+
+		self.__expect(")")
+
+		if len(_results) not in (1, 2):
+			raise UnsupportedFormulaError(f"Wrong number of IF arguments: {self.formula}")
+
+		if _condition:
+			return _results[0]
+		elif len(_results) == 2:
+			return _results[1]
+		else:
+			return False
+
+	def __skip(self) -> None:
+		"""
+		Skip the tokens of an argument which is not evaluated
+		"""
+
+		_depth = 0
+		while True:
+			_kind, _value = self.__peek()
+
+			if _kind == None:
+				raise UnsupportedFormulaError(f"Unknown syntax: {self.formula}")
+
+			if (_kind == "operator") and (_depth == 0) and (_value in (",", ")")):
+				return None
+
+			if _value == "(":
+				_depth += 1
+			elif _value == ")":
+				_depth -= 1
+
+			self.position += 1
+
+	def __binary(self, operator:str, left, right):
+		"""
+		Apply a binary operator
+		"""
+
+		if operator == "&":
+			return _text(left) + _text(right)
+
+		if operator in ("=", "<>", "<", ">", "<=", ">="):
+			return _compare(operator, left, right)
+
+		_left = _number(left)
+		_right = _number(right)
+
+		if operator == "+":
+			return _left + _right
+		elif operator == "-":
+			return _left - _right
+		elif operator == "*":
+			return _left * _right
+		elif operator == "/":
+			if _right == 0:
+				raise UnsupportedFormulaError(f"Division by zero: {self.formula}")
+			return _left / _right
+		else:
+			return _left ** _right
+
+
+def normalizeValue(value):
+	"""
+	Round numbers to 16 significant digits and return whole numbers as integers like openpyxl writes and reads them from a saved file
+	"""
+
+	if isinstance(value, float):
+		value = float(f"{value:.16g}")
+
+		if value.is_integer():
+			return int(value)
+
+	return value
+
+
+def _number(value):
+	"""
+	Convert a single value to a number like excel does for the arithmetic operators
+	"""
+
+	if isinstance(value, Range):
+		raise UnsupportedFormulaError("Range used as a single value")
+	elif value == None:
+		return 0
+	elif isinstance(value, bool):
+		return int(value)
+	elif isinstance(value, (int, float)):
+		return value
+
+	try:
+		return float(value)
+	except (TypeError, ValueError):
+		raise UnsupportedFormulaError(f"Not a number: {value}")
+
+
+def _numbers(arguments:list) -> list:
+	"""
+	Collect the numbers of function arguments. Text, booleans and empty cells of ranges are ignored like in excel
+	"""
+
+	_values = []
+
+	for _argument in arguments:
+		if isinstance(_argument, Range):
+			_values.extend(_value for _value in _argument.values if isinstance(_value, (int, float)) and not isinstance(_value, bool))
+		else:
+			_values.append(_number(_argument))
+
+	return _values
+
+
+def _boolean(value) -> bool:
+	"""
+	Convert a condition to a boolean
+	"""
+
+	if isinstance(value, str):
+		raise UnsupportedFormulaError(f"Text used as condition: {value}")
+
+	return bool(_number(value))
+
+
+def _text(value) -> str:
+	"""
+	Convert a value to text for the concatenation
+	"""
+
+	if isinstance(value, Range):
+		raise UnsupportedFormulaError("Range used as a single value")
+	elif value == None:
+		return ""
+	elif isinstance(value, bool):
+		return "TRUE" if value else "FALSE"
+	elif isinstance(value, float):
+		return f"{value:.15g}"
+
+	return str(value)
+
+
+def _compare(operator:str, left, right) -> bool:
+	"""
+	Compare two values. Text is compared case insensitive. Mixed types are not supported
+	"""
+
+	if isinstance(left, Range) or isinstance(right, Range):
+		raise UnsupportedFormulaError("Range used as a single value")
+
+	if left == None:
+		left = "" if isinstance(right, str) else 0
+	if right == None:
+		right = "" if isinstance(left, str) else 0
+
+	if isinstance(left, str) and isinstance(right, str):
+		#Excel compares case insensitive, the formulas package does not. Keep the results of the formulas package
+		if (left != right) and (left.lower() == right.lower()):
+			raise UnsupportedFormulaError(f"Texts only differ in case: {left} {operator} {right}")
+
+		left = left.lower()
+		right = right.lower()
+	elif isinstance(left, str) or isinstance(right, str) or (isinstance(left, bool) != isinstance(right, bool)):
+		raise UnsupportedFormulaError(f"Comparison of different types: {left} {operator} {right}")
+
+	if operator == "=":
+		return left == right
+	elif operator == "<>":
+		return left != right
+	elif operator == "<":
+		return left < right
+	elif operator == ">":
+		return left > right
+	elif operator == "<=":
+		return left <= right
+	else:
+		return left >= right
+
+
+def _average(values:list):
+	if len(values) == 0:
+		raise UnsupportedFormulaError("Average without values")
+	return sum(values) / len(values)
+
+
+FUNCTIONS = {
+	"SUM": lambda values: sum(values),
+	"AVERAGE": _average,
+	"MIN": lambda values: min(values) if len(values) > 0 else 0,
+	"MAX": lambda values: max(values) if len(values) > 0 else 0,
+}
+"""
+Supported functions with number arguments. IF is handled by the parser because of its lazy arguments
+"""
@@ -2,17 +2,34 @@ import os
 import traceback
 import json
 import time
+import threading
 from enum import Enum
 from datetime import datetime
 from email_validator import validate_email, EmailNotValidError
 import base64
 from enums import ReportState
 import utils.logger as log
+from connection import ConnectionManager
 from eliona_modules.api.core.eliona_core import ElionaApiHandler, ConStat
 
 LOGGER_NAME = "mail"
 LOGGER_LEVEL = log.LOG_LEVEL_DEBUG
 
+MAIL_POLL_INTERVAL = 10
+"""
+First delay in seconds before the delivery state of a mail is checked
+"""
+
+MAIL_POLL_MAX_INTERVAL = 120
+"""
+Maximum delay in seconds between two checks of the same mail. The delay is doubled after every check
+"""
+
+MAIL_DELIVERY_TIMEOUT = 600
+"""
+Time in seconds after which a mail not yet sent is canceled
+"""
+
 class Mail:
 	"""
 	Handle the mail delivery.
@@ -25,19 +42,35 @@ class Mail:
 	mailId = ""
 	sendDate = datetime(1990,1,1)
 
-	def __init__(self, logLevel:int=log.LOG_LEVEL_DEBUG) -> None:
+	connectionManager:ConnectionManager|None = None
+	"""
+	Shared eliona connections. A new connection is set up and checked for every request if None
+	"""
+
+	mailTracker:"MailTracker|None" = None
+	"""
+	Background tracker of the mail delivery. sendMail waits for the delivery if None
+	"""
+
+	def __init__(self, logLevel:int=log.LOG_LEVEL_DEBUG, connectionManager:ConnectionManager|None=None, mailTracker:"MailTracker|None"=None) -> None:
 		"""
 		Init the class
 
 		Param
 		-----
+		logLevel:int 							= Log level of the mail handler
+		connectionManager:ConnectionManager 	= Shared eliona connections
+		mailTracker:MailTracker 				= Background tracker of the mail delivery
+
 		Return
 		-----
 		-> None
 		"""
 		self.logger.setLevel(logLevel)
+		self.connectionManager = connectionManager
+		self.mailTracker = mailTracker
 
-	def sendMail(self, connection:dict, subject:str, content:str, receiver:list, blindCopyReceiver:list=None, attachments:list=None, reports:list=None) -> bool:
+	def sendMail(self, connection:dict, subject:str, content:str, receiver:list, blindCopyReceiver:list=None, attachments:list=None, reports:list=None, onDelivery=None) -> bool:
 		"""
 		Sending mail with the api V" to connect the 
 
@@ -49,10 +82,12 @@ class Mail:
 		receiver:list		= List with all recipients
 		attachments:list	= List with all attachments
 		reports:list		= List with all reports
+		onDelivery			= Called with the final ReportState of the mail. Only used with a mail tracker
 
 		Return
 		------
-		-> bool				= Will return true if mail was send successfully, false if not
+		-> bool				= Will return true if mail was send successfully, false if not.
+								With a mail tracker the mail is only submitted and the delivery is reported to onDelivery
 		"""
 
 		#set the local variables
@@ -83,11 +118,9 @@ class Mail:
 
 
 			self.logger.debug("--------connect--------")
-			self.logger.debug("Host: " + str(connection["host"]))
 
 			#Connect to the eliona instance
-			eliona = ElionaApiHandler(settings=connection, logger=LOGGER_NAME)
-			eliona.check_connection() 
+			eliona = self._connect(connection=connection)
 
 			#Check if the connection is established
 			if eliona.connection == ConStat.CONNECTED:
@@ -103,8 +136,14 @@ class Mail:
 														blind_copy_recipients=blindCopyReceiver)
 
 
-				#Wait till the mail was send 		
 				self.mailId = str(_response["id"])
+
+				#Let the tracker wait for the delivery
+				if self.mailTracker != None:
+					self.mailTracker.track(connection=connection, mailId=self.mailId, onDelivery=onDelivery)
+					return True
+
+				#Wait till the mail was send 		
 				_checkCount = 0	
 
 
@@ -161,11 +200,9 @@ class Mail:
 		"""
 
 		self.logger.debug("--------connect--------")
-		self.logger.debug("Host: " + str(connection["host"]))
 
 		#Connect to the eliona instance
-		_eliona = ElionaApiHandler(settings=connection, logger=LOGGER_NAME)
-		_eliona.check_connection() 
+		_eliona = self._connect(connection=connection)
 
 		#Check if the connection is established
 		if _eliona.connection == ConStat.CONNECTED:
@@ -185,6 +222,28 @@ class Mail:
 
 		return _state, _response["status"]
 
+	def _connect(self, connection:dict) -> ElionaApiHandler:
+		"""
+		Get the eliona handler. Will use the shared connection if a connection manager is available
+
+		Param
+		-----
+		connection:dict		= Connection data for the eliona handler
+
+		Return
+		-----
+		-> ElionaApiHandler	= Checked eliona handler
+		"""
+
+		if self.connectionManager != None:
+			return self.connectionManager.get(settings=connection)
+
+		self.logger.debug("Host: " + str(connection["host"]))
+		_eliona = ElionaApiHandler(settings=connection, logger=LOGGER_NAME)
+		_eliona.check_connection() 
+
+		return _eliona
+
 	def _readAttachments(self, attachments:list)->list:
 		"""
 		Read the attachments and transform them to an base64 based string
@@ -241,6 +300,182 @@ class Mail:
 		return _attachmentBase64
 
 
+class MailTracker:
+	"""
+	Background tracker of the delivery state of submitted mails.
+
+	All outstanding mails are checked by one thread. Every mail is checked with a growing delay
+	until it is sent or the delivery timeout is reached.
+	"""
+
+	logger = log.createLogger("MailTracker", loglevel=LOGGER_LEVEL)
+
+	connectionManager:ConnectionManager|None = None
+	"""
+	Shared eliona connections. A new connection is set up and checked for every poll round if None
+	"""
+
+	def __init__(self, logLevel:int=log.LOG_LEVEL_DEBUG, connectionManager:ConnectionManager|None=None) -> None:
+		"""
+		Initialize the tracker
+
+		Param
+		-----
+		logLevel:int 							= Log level of the tracker
+		connectionManager:ConnectionManager 	= Shared eliona connections
+		"""
+
+		self.logger.setLevel(logLevel)
+		self.connectionManager = connectionManager
+		self._mails = {}
+		self._condition = threading.Condition()
+		self._thread = None
+
+	def track(self, connection:dict, mailId:str, onDelivery=None) -> None:
+		"""
+		Track the delivery of a submitted mail
+
+		Param
+		-----
+		connection:dict		= Connection data for the eliona handler
+		mailId:str			= ID of the submitted mail
+		onDelivery			= Called with ReportState.SEND_SUCCESSFULLY or ReportState.CANCELED once the delivery is decided
+		"""
+
+		_now = time.monotonic()
+
+		with self._condition:
+
+			self._mails[mailId] = {	"connection": connection,
+									"onDelivery": onDelivery,
+									"submitted": _now,
+									"interval": MAIL_POLL_INTERVAL,
+									"due": _now + MAIL_POLL_INTERVAL}
+
+			if self._thread == None:
+				self._thread = threading.Thread(target=self._run, name="MailTracker", daemon=True)
+				self._thread.start()
+
+			self._condition.notify()
+
+		self.logger.info(f"Track delivery of mail-ID: {mailId}")
+
+	def pending(self) -> int:
+		"""
+		Return
+		-----
+		-> int = Number of mails waiting for the delivery
+		"""
+
+		with self._condition:
+			return len(self._mails)
+
+	def _run(self) -> None:
+		"""
+		Thread checking the outstanding mails
+		"""
+
+		while True:
+
+			#Wait till the next mail is due
+			with self._condition:
+
+				_now = time.monotonic()
+				_due = [_mailId for _mailId, _mail in self._mails.items() if _mail["due"] <= _now]
+
+				if len(_due) == 0:
+					_timeout = min([_mail["due"] for _mail in self._mails.values()], default=_now + MAIL_POLL_MAX_INTERVAL) - _now
+					self._condition.wait(timeout=_timeout)
+					continue
+
+				_mails = {_mailId: self._mails[_mailId] for _mailId in _due}
+
+			_results = self._poll(mails=_mails)
+
+			#Update the outstanding mails and report the decided ones
+			_decided = []
+			with self._condition:
+
+				_now = time.monotonic()
+				for _mailId, _mail in _mails.items():
+
+					_state = _results.get(_mailId, ReportState.SENDING)
+
+					if (_state != ReportState.SEND_SUCCESSFULLY) and (_now - _mail["submitted"] > MAIL_DELIVERY_TIMEOUT):
+						self.logger.warning(f"Mail with mail-ID: {_mailId} was not sent within {MAIL_DELIVERY_TIMEOUT} seconds")
+						_state = ReportState.CANCELED
+
+					if _state == ReportState.SENDING:
+						_mail["interval"] = min(_mail["interval"] * 2, MAIL_POLL_MAX_INTERVAL)
+						_mail["due"] = _now + _mail["interval"]
+					else:
+						del self._mails[_mailId]
+						_decided.append((_mail, _state))
+
+			for _mail, _state in _decided:
+				try:
+					if _mail["onDelivery"] != None:
+						_mail["onDelivery"](_state)
+				except Exception as err:
+					self.logger.error(err)
+					self.logger.error(traceback.format_exc())
+
+	def _poll(self, mails:dict) -> dict:
+		"""
+		Check the delivery state of the given mails. The mails of the same connection are checked with one handler
+
+		Param
+		-----
+		mails:dict 	= Mails to check by mail ID
+
+		Return
+		-----
+		-> dict 	= ReportState by mail ID. Mails which could not be checked are missing
+		"""
+
+		#Group the mails by connection
+		_batches = {}
+		for _mailId, _mail in mails.items():
+			_key = json.dumps(_mail["connection"], sort_keys=True, default=str)
+			_batches.setdefault(_key, (_mail["connection"], []))[1].append(_mailId)
+
+		_results = {}
+		for _connection, _mailIds in _batches.values():
+
+			try:
+				if self.connectionManager != None:
+					_eliona = self.connectionManager.get(settings=_connection)
+				else:
+					_eliona = ElionaApiHandler(settings=_connection, logger=LOGGER_NAME)
+					_eliona.check_connection() 
+
+				if _eliona.connection != ConStat.CONNECTED:
+					self.logger.info("Connection not possible. Will try again.")
+					continue
+
+				for _mailId in _mailIds:
+
+					_response, errMsg = _eliona.get_mail_state(_mailId)
+
+					#Skip only this mail if the state is not available. It will be checked again with the next poll
+					if (errMsg not in (None, "")) or (not isinstance(_response, dict)) or ("status" not in _response):
+						self.logger.warning(f"Could not read the state of the mail with mail-ID: {_mailId}. Error Msg: {errMsg}")
+						continue
+
+					if _response["status"] == "sent":
+						self.logger.info(f"Successfully send mail with mail-ID: {_mailId}")
+						_results[_mailId] = ReportState.SEND_SUCCESSFULLY
+					else:
+						self.logger.debug(f"Mail with mail-ID: {_mailId} is {_response['status']}")
+						_results[_mailId] = ReportState.SENDING
+
+			except Exception as err:
+				self.logger.error(err)
+				self.logger.error(traceback.format_exc())
+
+		return _results
+
+
 if __name__ == "__main__":
 	"""
 	Testing call of the class
@@ -0,0 +1,207 @@
+"""
+Module to compute the periods of the report schedules
+"""
+
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+import pytz
+from enums import Schedule
+
+
+SCHEDULES = {	"yearly": Schedule.YEARLY,
+				"monthly": Schedule.MONTHLY,
+				"weekly": Schedule.WEEKLY,
+				"daily": Schedule.DAILY}
+"""
+Schedules by their name in the settings
+"""
+
+SCHEDULE_ORDER = (Schedule.YEARLY, Schedule.MONTHLY, Schedule.WEEKLY, Schedule.DAILY)
+"""
+Schedules from the longest to the shortest period
+"""
+
+
+def parseSchedule(schedule:str) -> Schedule:
+	"""
+	Get the schedule of a schedule name. Unknown names are monthly
+
+	Params
+	------
+	schedule:str	= Name of the schedule: "yearly", "monthly", "weekly", "daily"
+
+	Return
+	------
+	-> Schedule
+	"""
+
+	return SCHEDULES.get(str(schedule).lower(), Schedule.MONTHLY)
+
+
+def parseTimeZone(timeZone:str|int) -> pytz.BaseTzInfo:
+	"""
+	Get the time zone of a time zone setting
+
+	Params
+	------
+	timeZone:str|int	= Name of the time zone, for example "Europe/Zurich", or the UTC offset in hours, for example 2
+
+	Return
+	------
+	-> pytz.BaseTzInfo	= Time zone. Offsets are fixed and have no daylight saving time
+	"""
+
+	if isinstance(timeZone, (int, float)):
+		return pytz.FixedOffset(int(timeZone * 60))
+
+	if str(timeZone).lstrip("+-").isdigit():
+		return pytz.FixedOffset(int(timeZone) * 60)
+
+	return pytz.timezone(timeZone)
+
+
+class PeriodCalendar:
+	"""
+	Precomputed period boundaries of a schedule in a time zone.
+
+	The boundaries are the local midnights starting a period: every day, every Monday, the first day of every month or year.
+	They are computed once per year and are daylight saving time aware. The calendars are shared by the whole process.
+	"""
+
+	_calendars = {}
+	_calendarsLock = threading.Lock()
+
+	@classmethod
+	def get(cls, schedule:Schedule, timeZone:str|int) -> "PeriodCalendar":
+		"""
+		Get the shared calendar of a schedule and time zone
+
+		Params
+		------
+		schedule:Schedule	= Schedule of the periods
+		timeZone:str|int	= Name of the time zone or the UTC offset in hours. For example "Europe/Zurich" or 2
+
+		Return
+		------
+		-> PeriodCalendar
+		"""
+
+		with cls._calendarsLock:
+
+			if (schedule, timeZone) not in cls._calendars:
+				cls._calendars[(schedule, timeZone)] = PeriodCalendar(schedule=schedule, timeZone=timeZone)
+
+			return cls._calendars[(schedule, timeZone)]
+
+	def __init__(self, schedule:Schedule, timeZone:str|int) -> None:
+		"""
+		Initialize the calendar
+
+		Params
+		------
+		schedule:Schedule	= Schedule of the periods
+		timeZone:str|int	= Name of the time zone or the UTC offset in hours. For example "Europe/Zurich" or 2
+		"""
+
+		self.schedule = schedule
+		self.timeZone = parseTimeZone(timeZone)
+		self._years = {}
+		self._lock = threading.Lock()
+
+	def lastBoundary(self, moment:datetime) -> datetime:
+		"""
+		Get the start of the period containing the moment
+
+		Params
+		------
+		moment:datetime	= Moment to look up. Naive moments are local times of the calendar
+
+		Return
+		------
+		-> datetime 	= Latest boundary at or before the moment
+		"""
+
+		_moment = self.__localize(moment)
+		_boundaries = self.__boundariesAround(_moment.year)
+
+		return _boundaries[bisect_right(_boundaries, _moment) - 1]
+
+	def nextBoundary(self, moment:datetime) -> datetime:
+		"""
+		Get the end of the period containing the moment
+
+		Params
+		------
+		moment:datetime	= Moment to look up. Naive moments are local times of the calendar
+
+		Return
+		------
+		-> datetime 	= First boundary after the moment
+		"""
+
+		_moment = self.__localize(moment)
+		_boundaries = self.__boundariesAround(_moment.year)
+
+		return _boundaries[bisect_right(_boundaries, _moment)]
+
+	def periodBefore(self, moment:datetime) -> tuple[datetime, datetime]:
+		"""
+		Get the last complete period before the moment
+
+		Params
+		------
+		moment:datetime	= Moment to look up. Naive moments are local times of the calendar
+
+		Return
+		------
+		-> (start:datetime, end:datetime) of the period. The end is the start of the period containing the moment
+		"""
+
+		_moment = self.__localize(moment)
+		_boundaries = self.__boundariesAround(_moment.year)
+		_index = bisect_right(_boundaries, _moment) - 1
+
+		return (_boundaries[_index - 1], _boundaries[_index])
+
+	def __localize(self, moment:datetime) -> datetime:
+		"""
+		Get the moment in the time zone of the calendar
+		"""
+
+		if moment.tzinfo == None:
+			return self.timeZone.localize(moment)
+
+		return moment.astimezone(self.timeZone)
+
+	def __boundariesAround(self, year:int) -> list[datetime]:
+		"""
+		Get the boundaries from the year before till the year after the given year
+		"""
+
+		return self.__boundaries(year - 1) + self.__boundaries(year) + self.__boundaries(year + 1)
+
+	def __boundaries(self, year:int) -> list[datetime]:
+		"""
+		Get the boundaries within a year. Computed once per year
+		"""
+
+		with self._lock:
+
+			if year not in self._years:
+
+				_days = []
+				if self.schedule == Schedule.YEARLY:
+					_days = [datetime(year=year, month=1, day=1)]
+				elif self.schedule == Schedule.MONTHLY:
+					_days = [datetime(year=year, month=_month, day=1) for _month in range(1, 13)]
+				else:
+					_day = datetime(year=year, month=1, day=1)
+					while _day.year == year:
+						if (self.schedule == Schedule.DAILY) or (_day.weekday() == 0):
+							_days.append(_day)
+						_day += timedelta(days=1)
+
+				self._years[year] = [self.timeZone.localize(_day) for _day in _days]
+
+			return self._years[year]
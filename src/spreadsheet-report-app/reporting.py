@@ -4,12 +4,16 @@ Module to handle Report and User Based reportings
 
 import os
 import json
-from mail import Mail
-from spreadsheet import Spreadsheet
+from mail import Mail, MailTracker
+from spreadsheet import Spreadsheet, createRenderJob, renderReport
+from cache import DataCache, AssetIdCache, TemplateCache, ArtifactStore, KeyLocks
+from connection import ConnectionManager
 from threading import Thread
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
 import pytz
 from enums import Schedule, ReportState
+from periods import PeriodCalendar, parseSchedule, SCHEDULE_ORDER
 from typing import Tuple
 import unicodedata
 import re
@@ -53,6 +57,11 @@ class BasicReport:
 	Date of the last send message. Will be 1979.1.1 if never send
 	"""
 
+	canceledAt:datetime|None = None
+	"""
+	Time the last sending was canceled. None if never canceled
+	"""
+
 	storePath = "./tmp_reports/"
 	"""
 	Path to save the temp files to 
@@ -100,10 +109,50 @@ class BasicReport:
 	Filepath for temporary created spreadsheet files
 	"""
 
+	dataCache:DataCache|None = None
+	"""
+	Local cache of the aggregated data shared by all reports
+	"""
+
+	assetIdCache:AssetIdCache|None = None
+	"""
+	Process wide cache of the asset IDs
+	"""
+
+	templateCache:TemplateCache|None = None
+	"""
+	Process wide cache of the parsed templates
+	"""
+
+	connectionManager:ConnectionManager|None = None
+	"""
+	Process wide eliona connections shared by the reports and mails
+	"""
+
+	mailTracker:MailTracker|None = None
+	"""
+	Process wide tracker of the mail delivery. The report waits for the delivery if None
+	"""
+
+	renderPool:ProcessPoolExecutor|None = None
+	"""
+	Process pool to create the reports in. The reports are created in the thread of the report if None
+	"""
+
+	artifactStore:ArtifactStore|None = None
+	"""
+	Process wide store of the created reports. The reports are created at the temp file path if None
+	"""
+
+	createLocks = KeyLocks()
+	"""
+	Process wide locks by temp path of the created reports. Reports with the same temp path are only created once at a time
+	"""
+
 	testing = True
 	currentTestTime:datetime
 
-	def __init__(self, name:str, tempFilePath:str, logLevel:int, testing:bool) -> None:
+	def __init__(self, name:str, tempFilePath:str, logLevel:int, testing:bool, dataCache:DataCache|None=None, assetIdCache:AssetIdCache|None=None, templateCache:TemplateCache|None=None, connectionManager:ConnectionManager|None=None, mailTracker:MailTracker|None=None, renderPool:ProcessPoolExecutor|None=None, artifactStore:ArtifactStore|None=None) -> None:
 		"""
 		Init the class
 
@@ -115,6 +164,13 @@ class BasicReport:
 		"""
 
 		self.testing = testing
+		self.dataCache = dataCache
+		self.assetIdCache = assetIdCache
+		self.templateCache = templateCache
+		self.connectionManager = connectionManager
+		self.mailTracker = mailTracker
+		self.renderPool = renderPool
+		self.artifactStore = artifactStore
 		self.name = name
 		_fileName = self._slugify(value=name)
 
@@ -125,7 +181,7 @@ class BasicReport:
 		self.logger.setLevel(self.loggerLevel)
 		self.logger.name = self.name
 
-		self.mailHandler = Mail(logLevel=self.loggerLevel)
+		self.mailHandler = Mail(logLevel=self.loggerLevel, connectionManager=self.connectionManager, mailTracker=self.mailTracker)
 
 		#Set the temp storage
 		_storePath = tempFilePath + "lastSend/"
@@ -148,19 +204,49 @@ class BasicReport:
 		->bool				= Will return true if report was already send. False if not
 		"""
 				
-		_reportWasSend = False
-		
-		if self.reportSchedule == Schedule.MONTHLY:
-			
-			if (timestamp.month == self.lastSend.month) and (timestamp.year == self.lastSend.year):
-				_reportWasSend = True
+		#Sent if the last sending is within the current period
+		_periodStart = self._calendar().lastBoundary(timestamp).replace(tzinfo=None)
 
-		elif self.reportSchedule == Schedule.YEARLY:
+		return self.lastSend >= _periodStart
 
-			if (timestamp.year != self.lastSend.year):
-				_reportWasSend = True
+	def nextDueTime(self)->datetime:
+		"""
+		Get the time the next report is due
 
-		return _reportWasSend 
+		Return
+		------
+		->datetime			= Start of the period following the last sending or the canceled sending. Time zone of the calendar
+		"""
+
+		if (self.state == ReportState.CANCELED) and (self.canceledAt != None):
+			return self._calendar().nextBoundary(self.canceledAt)
+
+		return self._calendar().nextBoundary(self.lastSend)
+
+	def resumeCanceled(self)->None:
+		"""
+		Set a canceled report idle again once the period of the canceled sending is over. The report is sent again for the next period
+		"""
+
+		if self.state != ReportState.CANCELED:
+			return
+
+		_now = self.currentTestTime if self.testing else datetime.now(tz=timezone.utc)
+
+		if self._calendar().lastBoundary(_now) >= self.nextDueTime():
+			self.logger.info("Resume the canceled sending with the next period")
+			self.state = ReportState.IDLE
+
+	def _calendar(self)->PeriodCalendar:
+		"""
+		Get the period calendar of the report schedule in the time zone of the database
+
+		Return
+		------
+		->PeriodCalendar	= Shared calendar
+		"""
+
+		return PeriodCalendar.get(schedule=self.reportSchedule, timeZone=self.elionaConfig.get("dbTimeZone") or "UTC")
 
 	def readStorage(self)->bool:
 		"""
@@ -221,7 +307,7 @@ class BasicReport:
 
 		return _configState
 
-	def sendReport(self, year:int, month:int=0, createOnly:bool=False, sendAsync:bool=True, subject:str="", content:str="") -> None:
+	def sendReport(self, year:int, month:int=0, createOnly:bool=False, sendAsync:bool=True, subject:str="", content:str="", day:int=1, reports:list|None=None) -> None:
 		"""
 		Create and send the report.
 
@@ -231,17 +317,22 @@ class BasicReport:
 		content				= Content of the mail
 		year:int			= Year of the requested report
 		month:int			= Month of the requested report. If 0 => Yearly report will be created
+		day:int				= Day of the requested report. Used for the daily and weekly reports
 		sendAsync:bool		= Set to True if you want to send it asynchronous
 									to False if you want to send it now and wait for it to be send
+		reports:list		= Settings of the reports to create. All configured reports if None
 
 		Return
 		------
 		->None				= No returns 											
 		"""
 
+		if reports == None:
+			reports = self.reports
+
 		#Define the report name's wit start and end time
 		_reportName = ""
-		for _report in self.reports:
+		for _report in reports:
 
 			#Define the report name
 			if _reportName == "":
@@ -264,7 +355,7 @@ class BasicReport:
 
 
 		self.state = ReportState.CREATING
-		_thread = Thread(target=self._process, args=(year, month, _subject, _content, createOnly))
+		_thread = Thread(target=self._process, args=(year, month, _subject, _content, createOnly, day, reports))
 		_thread.start()
 
 		if not sendAsync:
@@ -272,16 +363,20 @@ class BasicReport:
 			#if not send async wait till done
 			_thread.join()
 
-	def _process(self, year:int, month:int, subject:str, content:str, createOnly:bool):
+	def _process(self, year:int, month:int, subject:str, content:str, createOnly:bool, day:int=1, reports:list|None=None):
 		"""
 		Thread to create and send the Report
 		"""
 		_reports = []
 		_created = False
 
-		#Create the report
-		for _report in self.reports:
-			_created = self._create(report=_report, year=year, month=month)
+		if reports == None:
+			reports = self.reports
+
+		#Create the report. The settings are copied as the same report settings may be processed by other users at the same time
+		for _report in reports:
+			_report = dict(_report)
+			_created = self._create(report=_report, year=year, month=month, day=day)
 
 			#Add the reports to the send list if created
 			if _created:
@@ -291,44 +386,78 @@ class BasicReport:
 		if not createOnly: 
 			self._send(subject=subject, content=content, reports=_reports)
 
-	def _create(self, report:dict, year:int, month:int) -> bool:
+	def _create(self, report:dict, year:int, month:int, day:int=1) -> bool:
 		"""
 		Call the reporter object with the requested settings and TimeSpan
 
 		report:dict 			= Settings of the report as dictionary
 		year:int				= Year create the report from
 		month:int				= Month to create the report from
+		day:int					= Day to create the report from
 
 		Return: bool -> Will return true if report was successfully created
 		"""
 
 		#get the start and stop date
-		if report["schedule"] == "yearly":
-			_reportSchedule = Schedule.YEARLY
-		else:
-			_reportSchedule = Schedule.MONTHLY
+		_reportSchedule = parseSchedule(report["schedule"])
 
 		self.state = ReportState.CREATING
 		_reportName = report["name"]
 
 
 		#Get the start and stop time
-		_startStamp, _stopStamp = self._getReportTimeSpan(schedule=_reportSchedule, timeZone=self.elionaConfig["dbTimeZone"], year=year, month=month)
+		_startStamp, _stopStamp = self._getReportTimeSpan(schedule=_reportSchedule, timeZone=self.elionaConfig["dbTimeZone"], year=year, month=month, day=day)
 
 		_dayDelta = timedelta(days=1)
 		report["tempPath"] = self.tempFilePath + str(report["reportPath"]).split(".")[0] + "_" + _startStamp.date().isoformat() + "_" + (_stopStamp.date() - _dayDelta).isoformat() + "." + str(report["reportPath"]).split(".")[-1]
 
 		self.logger.info(f"Call the reporting function for report: '{_reportName}' with start: '{_startStamp}' and end timestamp '{_stopStamp}'")
 
-		#Call the reporting function
-		_reporter = Spreadsheet(logLevel=self.loggerLevel)
-		_reportSendFeedBack = _reporter.createReport(startDt=_startStamp, endDt=_stopStamp, connectionSettings=self.elionaConfig, reportSettings=report)
+		if self.artifactStore != None:
+
+			#Every report and time span is created once. The stored file is used by all reports and users
+			_key = self.artifactStore.key(settings=report, connectionSettings=self.elionaConfig, startDt=_startStamp, endDt=_stopStamp)
+			_artifactPath = self.artifactStore.get(key=_key, fileName=os.path.basename(report["tempPath"]), 
+													create=lambda tempPath: self._render(report=dict(report, tempPath=tempPath), startDt=_startStamp, endDt=_stopStamp))
+
+			_reportSendFeedBack = _artifactPath != None
+			if _reportSendFeedBack:
+				report["tempPath"] = _artifactPath
+
+		else:
+
+			#Waits if the same report is created for another user. The created file will be reused
+			with self.createLocks.hold(key=report["tempPath"]):
+
+				if os.path.isfile(report["tempPath"]):
+					self.logger.debug(f"Reuse the created report: {report['tempPath']}")
+					_reportSendFeedBack = True
+				else:
+					_reportSendFeedBack = self._render(report=report, startDt=_startStamp, endDt=_stopStamp)
 
 		self.logger.info(f"Report: {_reportName} was send successfully created: {_reportSendFeedBack}")
 
 
 		return _reportSendFeedBack
 
+	def _render(self, report:dict, startDt:datetime, endDt:datetime) -> bool:
+		"""
+		Call the reporting function. Will use the render processes if available
+
+		report:dict 			= Settings of the report with the temp path to create the report at
+		startDt:datetime		= Start of the report
+		endDt:datetime			= End of the report
+
+		Return: bool -> Will return true if report was successfully created
+		"""
+
+		if self.renderPool != None:
+			_job = createRenderJob(startDt=startDt, endDt=endDt, connectionSettings=self.elionaConfig, reportSettings=report, logLevel=self.loggerLevel, dataCache=self.dataCache, assetIdCache=self.assetIdCache)
+			return self.renderPool.submit(renderReport, _job).result()
+
+		_reporter = Spreadsheet(logLevel=self.loggerLevel, dataCache=self.dataCache, assetIdCache=self.assetIdCache, templateCache=self.templateCache, connectionManager=self.connectionManager)
+		return _reporter.createReport(startDt=startDt, endDt=endDt, connectionSettings=self.elionaConfig, reportSettings=report)
+
 	def _send(self, subject:str, content:str, reports:list):
 		"""
 		Send the created reports to the configured receivers
@@ -341,19 +470,42 @@ class BasicReport:
 		"""
 
 		self.state = ReportState.SENDING
+
+		#Keep the test time of the sending. The delivery may be reported after the next tick
+		_testTime = self.currentTestTime if self.testing else None
+
 		_mailState = self.mailHandler.sendMail(	connection=self.elionaConfig, 
 												subject=subject, 
 												content=content, 
 												receiver=self.recipients,
 												blindCopyReceiver=self.blindCopyRecipients,
-												reports=reports)
+												reports=reports,
+												onDelivery=lambda state: self._delivered(state=state, testTime=_testTime))
+
+		#The tracker reports the delivery once the mail is sent
+		if self.mailTracker != None:
+			if not _mailState:
+				self._cancel(testTime=_testTime)
+			return
+
+		self._delivered(state=(ReportState.SEND_SUCCESSFULLY if _mailState else ReportState.CANCELED), testTime=_testTime)
+
+	def _delivered(self, state:ReportState, testTime:datetime|None=None):
+		"""
+		Update the report after the delivery of the mail was decided
+
+		Params
+		-----
+		state:ReportState		= ReportState.SEND_SUCCESSFULLY if the mail was sent
+		testTime:datetime		= Test time of the sending. Only used in testing mode
+		"""
 
-		if _mailState:
+		if state == ReportState.SEND_SUCCESSFULLY:
 
 			#Store the current time stamp that we have send the Data			
 
 			if self.testing:
-				self.lastSend = self.currentTestTime
+				self.lastSend = testTime
 			else:
 				self.lastSend = datetime.now()
 	
@@ -369,15 +521,29 @@ class BasicReport:
 				json.dump(_data, jsonFile)
 				jsonFile.truncate() # remove the "old" overlapping data
 		else:
-			self.state = ReportState.CANCELED
+			self._cancel(testTime=testTime)
 
-	def _getReportTimeSpan(self, schedule:Schedule, timeZone:str, year:int, month:int=1) -> Tuple[datetime, datetime]:
+	def _cancel(self, testTime:datetime|None=None):
+		"""
+		Cancel the sending. The report is due again with the next period
+
+		Params
+		-----
+		testTime:datetime		= Test time of the sending. Only used in testing mode
+		"""
+
+		self.canceledAt = testTime if self.testing else datetime.now(tz=timezone.utc)
+		self.state = ReportState.CANCELED
+
+	def _getReportTimeSpan(self, schedule:Schedule, timeZone:str|int, year:int, month:int=1, day:int=1) -> Tuple[datetime, datetime]:
 		"""
 		Will return the last time span depending on the schedule settings
 
 		Params
 		-----
-		schedule:str = Schedule setting as a string can be: "yearly", "monthly", "weekly" (Not Implemented), "daily" (Not implemented)
+		schedule:Schedule = Schedule of the report. Can be yearly, monthly, weekly (Monday to Sunday) or daily
+		timeZone:str|int = Time zone of the database or its UTC offset in hours. The periods start at local midnight
+		year:int, month:int, day:int = Date of the request. The last complete period before the date is returned
 
 		Return Values
 		-----
@@ -386,44 +552,9 @@ class BasicReport:
 
 		"""
 
-		_startTime = datetime(1979, 1, 1)
-		_endTime = datetime(1979, 1, 1)
-		_timeZone = pytz.timezone(timeZone)
-
-
-		if schedule == Schedule.YEARLY:
-
-			_startTime = datetime(year=(year -1), month=1, day=1)
-			_endTime = datetime(year=(year), month=1, day=1)
-
-		elif schedule == Schedule.MONTHLY:
-
-			if (month == 1):
-
-				_startTime = datetime(year=(year - 1), month=12, day=1)
-				_endTime = datetime(year=(year), month=1, day=1)
-
-			else:
-				_startTime = datetime(year=(year), month=(month - 1), day=1)
-				_endTime = datetime(year=(year), month=(month), day=1)
-
-		elif schedule == Schedule.WEEKLY:
-
-			pass
-
-		elif schedule == Schedule.DAILY:
-
-			pass
-
-		else:
-			self.logger.error("Could define time span for schedule: {schedule}")
-
-
-		_startTime = _startTime.astimezone(_timeZone)
-		_endTime = _endTime.astimezone(_timeZone)
-
+		_calendar = PeriodCalendar.get(schedule=schedule, timeZone=timeZone)
 
-		return (_startTime, _endTime)
+		return _calendar.periodBefore(datetime(year=year, month=max(month, 1), day=day))
 
 	def _slugify(self, value, allow_unicode=False):
 		"""
@@ -472,11 +603,11 @@ class User(BasicReport):
 	"""
 
 	
-	def __init__(self, name:str, tempFilePath:str, logLevel:int, testing:bool) -> None:
+	def __init__(self, name:str, tempFilePath:str, logLevel:int, testing:bool, dataCache:DataCache|None=None, assetIdCache:AssetIdCache|None=None, templateCache:TemplateCache|None=None, connectionManager:ConnectionManager|None=None, mailTracker:MailTracker|None=None, renderPool:ProcessPoolExecutor|None=None, artifactStore:ArtifactStore|None=None) -> None:
 		"""
 		Initialise the object
 		"""
-		super().__init__(name, tempFilePath, logLevel, testing)
+		super().__init__(name, tempFilePath, logLevel, testing, dataCache, assetIdCache, templateCache, connectionManager, mailTracker, renderPool, artifactStore)
 		self.logger.debug("Init the user object")
 
 	def configure(self, elionaConfig:dict, userConfig:dict={}, reportConfig:dict={})->bool:
@@ -492,8 +623,9 @@ class User(BasicReport):
 
 					_reports.append(_reportConfig)
 
-		#Add the reports
+		#Add the reports. The user is checked with the shortest period of its reports
 		self.reports = _reports
+		self.reportSchedule = max([parseSchedule(_report["schedule"]) for _report in _reports], key=SCHEDULE_ORDER.index, default=Schedule.MONTHLY)
 
 		#Add the user to the list
 		self.blindCopyRecipients = None
@@ -502,7 +634,7 @@ class User(BasicReport):
 
 		return super().configure(elionaConfig=elionaConfig)
 
-	def sendReport(self, year:int, month:int=0, createOnly:bool=False, sendAsync:bool=True, subject:str="", content:str="") -> None:
+	def sendReport(self, year:int, month:int=0, createOnly:bool=False, sendAsync:bool=True, subject:str="", content:str="", day:int=1) -> None:
 		"""
 		Create and send the report.
 
@@ -512,6 +644,7 @@ class User(BasicReport):
 		content				= Content of the mail
 		year:int			= Year of the requested report
 		month:int			= Month of the requested report. If 0 => Yearly report will be created
+		day:int				= Day of the requested report. Used for the daily and weekly reports
 		sendAsync:bool		= Set to True if you want to send it asynchronous
 									to False if you want to send it now and wait for it to be send
 
@@ -520,10 +653,11 @@ class User(BasicReport):
 		->None				= No returns
 		"""
 
-		#Remove the yearly reports if we are not in January
-		for _report in self.reports:
-			if (_report["schedule"] == "yearly") and (month != 1):
-				self.reports.remove(_report)
+		#Only send the reports with a period completed since the last sending. For example the yearly reports in January
+		_timeZone = self.elionaConfig.get("dbTimeZone") or "UTC"
+		_requestDate = datetime(year=year, month=max(month, 1), day=day)
+		_reports = [_report for _report in self.reports 
+						if PeriodCalendar.get(schedule=parseSchedule(_report["schedule"]), timeZone=_timeZone).lastBoundary(_requestDate).replace(tzinfo=None) > self.lastSend]
 
 		#Subject of the mail changed to the user based subject
 		if subject == "":
@@ -536,7 +670,7 @@ class User(BasicReport):
 		if content == "":
 			_htmlContentString = f"Heliona {self.name}, <br><br> hier sind die gewünschten Reports aus der Reporting App.<br><br><ul>" 
 					
-			for _report in self.reports:	
+			for _report in _reports:	
 				_htmlContentString = _htmlContentString + "<li>" + _report["name"] + "</li>"
 
 			_htmlContentString = _htmlContentString + "</ul>"
@@ -544,19 +678,19 @@ class User(BasicReport):
 			_htmlContentString = content
 
 		#Pass to the parent class
-		super().sendReport(year, month, createOnly, sendAsync, _subjectString, _htmlContentString)
+		super().sendReport(year, month, createOnly, sendAsync, _subjectString, _htmlContentString, day, _reports)
 
 class Report(BasicReport):
 	"""
 	Object to handle all reports for one user
 	"""
 
-	def __init__(self, name:str, tempFilePath:str, logLevel:int, testing:bool) -> None:
+	def __init__(self, name:str, tempFilePath:str, logLevel:int, testing:bool, dataCache:DataCache|None=None, assetIdCache:AssetIdCache|None=None, templateCache:TemplateCache|None=None, connectionManager:ConnectionManager|None=None, mailTracker:MailTracker|None=None, renderPool:ProcessPoolExecutor|None=None, artifactStore:ArtifactStore|None=None) -> None:
 		"""
 		Initialise the object
 		"""
 
-		super().__init__(name, tempFilePath, logLevel, testing)
+		super().__init__(name, tempFilePath, logLevel, testing, dataCache, assetIdCache, templateCache, connectionManager, mailTracker, renderPool, artifactStore)
 		self.logger.debug("Init the report object")
 
 	def configure(self, elionaConfig:dict, reportConfig:dict)->bool:
@@ -564,6 +698,7 @@ class Report(BasicReport):
 		#Add the reports to the report list
 		self.reports = []
 		self.reports.append(reportConfig)
+		self.reportSchedule = parseSchedule(reportConfig["schedule"])
 
 		#Add the recipients to the list
 		self.recipients = []
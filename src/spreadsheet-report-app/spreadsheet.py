@@ -1,30 +1,94 @@
 import os
 import json
 from json import JSONDecoder
-from openpyxl import load_workbook
+from openpyxl import load_workbook, Workbook
+from openpyxl.worksheet.worksheet import Worksheet
+from openpyxl.worksheet._read_only import ReadOnlyWorksheet
 import formulas
 import pandas as pd
 import shutil
+import time
+import threading
 import utils.logger as log
-from datetime import datetime, timedelta
-import pytz
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from cache import DataCache, AssetIdCache, TemplateCache, LastValueCache
+from connection import ConnectionManager
+from evaluator import FormulaEvaluator, UnsupportedFormulaError, normalizeValue
+from enums import PlaceholderKind
 
 from eliona_modules.api.core.eliona_core import ElionaApiHandler, ConStat
 
 LOGGER_NAME = "Spreadsheet"
 LOGGER_LEVEL = log.LOG_LEVEL_DEBUG
+DEFAULT_MAX_WORKERS = 8
+
+JSON_DECODER = JSONDecoder()
+"""
+Decoder for the json configurations in the template cells. Stateless and shared by all reports
+"""
+
+LAST_VALUE_SEARCH_WINDOWS = (timedelta(hours=1), timedelta(days=1), timedelta(days=7), timedelta(days=31), timedelta(days=92), timedelta(days=400))
+"""
+Growing time windows to search for the last received value. Measured backwards from the requested time stamp
+"""
 
 class Spreadsheet:
 
 	logger = log.createLogger(LOGGER_NAME, loglevel=LOGGER_LEVEL)
 
-	def __init__(self, logLevel:int=log.LOG_LEVEL_DEBUG) -> None:
+	maxWorkers = DEFAULT_MAX_WORKERS
+	"""
+	Maximum number of concurrent data requests for parallel data lists
+	"""
+
+	dataCache:DataCache|None = None
+	"""
+	Local cache of the aggregated data. No caching if None
+	"""
+
+	assetIdCache:AssetIdCache|None = None
+	"""
+	Cache to resolve the asset GAIs. The GAIs will be resolved on every request if None
+	"""
+
+	templateCache:TemplateCache|None = None
+	"""
+	Cache of the parsed templates. The templates will be parsed for every report if None
+	"""
+
+	connectionManager:ConnectionManager|None = None
+	"""
+	Shared eliona connections. A new connection is set up and checked for every report if None
+	"""
+
+	lastValueCache:LastValueCache|None = None
+	"""
+	Memo of the last received values. Shared by all reports of the process unless another memo is given
+	"""
+
+	def __init__(self, logLevel:int=log.LOG_LEVEL_DEBUG, dataCache:DataCache|None=None, assetIdCache:AssetIdCache|None=None, templateCache:TemplateCache|None=None, connectionManager:ConnectionManager|None=None, lastValueCache:LastValueCache|None=None) -> None:
 		"""
 		Initialize the class
 		"""
 
 		self.reportFilePath = ""
 		self.logger.setLevel(logLevel)
+		self.dataCache = dataCache
+		self.assetIdCache = assetIdCache
+		self.templateCache = templateCache
+		self.connectionManager = connectionManager
+
+		if lastValueCache != None:
+			self.lastValueCache = lastValueCache
+		else:
+			self.lastValueCache = LastValueCache.shared()
+
+		#The memorized values are only valid for the same eliona instance
+		self._connectionKey = ()
+
+		#The concurrent requests use their own eliona handlers of the same connection
+		self._connectionSettings = {}
 
 	def createReport(self, startDt:datetime, endDt:datetime, connectionSettings:dict, reportSettings:dict) -> bool:
 		"""
@@ -44,20 +108,17 @@ class Spreadsheet:
 		"""
 
 		self.reportFilePath = reportSettings["tempPath"]
-		
-		# If the file already exists we skip the creation part
-		if os.path.isfile(self.reportFilePath):
-			return True
 
 		#set the local variables
 		_reportCreatedSuccessfully = False
+		self.maxWorkers = int(connectionSettings.get("maxWorkers", DEFAULT_MAX_WORKERS))
+		self._connectionKey = (connectionSettings.get("host"), connectionSettings.get("api"), connectionSettings.get("projectId"))
+		self._connectionSettings = connectionSettings
 
 		self.logger.debug("--------connect--------")
-		self.logger.debug("Host: " + str(connectionSettings["host"]))
 
 		#Connect to the eliona instance
-		eliona = ElionaApiHandler(settings=connectionSettings, logger=LOGGER_NAME)
-		eliona.check_connection() 
+		eliona = self.__connect(connectionSettings=connectionSettings)
 
 		#Check if the connection is established
 		if eliona.connection == ConStat.CONNECTED:
@@ -75,6 +136,65 @@ class Spreadsheet:
 
 		return _reportCreatedSuccessfully
 
+	def prefillAssetIds(self, connectionSettings:dict, reportSettings:list) -> None:
+		"""
+		Resolve all asset GAIs found in the templates of the given reports at once and store them in the asset ID cache
+
+		Params
+		------
+		connectionSettings:dict 	= Connection settings for the eliona handler {"host", "api", "projectId", "apiKey", "dbTimeZone"}
+		reportSettings:list			= Settings of all configured reports
+		"""
+
+		if self.assetIdCache == None:
+			return
+
+		#Collect the GAIs of all templates
+		_assetGais = set()
+		for _settings in reportSettings:
+
+			_template = self.__getTemplate(settings=_settings)
+			if _template is None:
+				continue
+
+			for _placeholder in _template["placeholders"]:
+				for _part in _placeholder["parts"]:
+					if _part["config"].get("assetGai", "") != "":
+						_assetGais.add(_part["config"]["assetGai"])
+
+		if len(_assetGais) == 0:
+			return
+
+		#Connect to the eliona instance
+		eliona = self.__connect(connectionSettings=connectionSettings)
+
+		if eliona.connection == ConStat.CONNECTED:
+			self.assetIdCache.prefill(eliona=eliona, assetGais=_assetGais)
+		else:
+			self.logger.info("Connection not possible. Asset IDs will be resolved on demand.")
+
+	def __connect(self, connectionSettings:dict) -> ElionaApiHandler:
+		"""
+		Get the eliona handler. Will use the shared connection if a connection manager is available
+
+		Params
+		------
+		connectionSettings:dict 	= Connection settings for the eliona handler {"host", "api", "projectId", "apiKey", "dbTimeZone"}
+
+		Return
+		------
+		-> ElionaApiHandler = Checked eliona handler
+		"""
+
+		if self.connectionManager != None:
+			return self.connectionManager.get(settings=connectionSettings)
+
+		self.logger.debug("Host: " + str(connectionSettings["host"]))
+		_eliona = ElionaApiHandler(settings=connectionSettings, logger=LOGGER_NAME)
+		_eliona.check_connection() 
+
+		return _eliona
+
 	def __createDataEntryReport(self, eliona:ElionaApiHandler, settings:dict, startDateTime:datetime, endDateTime:datetime) -> bool:
 		"""
 		Create the table report from the given template
@@ -83,105 +203,124 @@ class Spreadsheet:
 		"""
 		_reportCreated = False
 
-		#Only copy the template if needed 
-		if settings["fromTemplate"]:
-			shutil.copyfile(src=settings["templateFile"], dst=self.reportFilePath)
+		#Open the template. Excel reports keep the workbook in memory until the report is saved
+		_workbook = self.__openReportWorkbook(settings=settings)
+		_template = self.__getTemplate(settings=settings, workbook=_workbook)
+		_dataTable = _template["dataFrame"].copy()
 
-		#Read the template 
-		_dataTable = self.__readTableTemplate(settings=settings)
+		#First run: Collect the required data requests from the precompiled placeholder index
+		#{"assetId":"xxx", "attribute":"yyy"}
+		_placeholders = _template["placeholders"]
+		_dataRequests = {}
 
-		for _rowIndex, _row in _dataTable.iterrows(): #iterate over rows
+		for _placeholder in _placeholders:
 
-			_timeStampFormat = ""
+			for _part in _placeholder["parts"]:
 
-			for _columnIndex, _value in _row.items():
-				_jsonFound = False
-				_newValue = _value
-				#Search for json config
-				#{"assetId":"xxx", "attribute":"yyy"}
-				if type(_value) == str:
+				if _part["kind"] != PlaceholderKind.DATA:
+					continue
 
-					for _config, _configRaw in self.__findJson(_value):
-						_jsonFound = True
+				_requestKey = _part["requestKey"]
 
-						if ("timeStampStart" in _config):
-						
-							_timeStampFormat = _config["timeStampStart"]
-							_newValue = startDateTime.strftime(_timeStampFormat)
+				if _requestKey == None:
+					self.logger.error(f"No raster configured for the data entry: {_part['raw']}")
+				elif _requestKey not in _dataRequests:
+					_assetId, _assetGai, _attribute, _raster = _requestKey
+					_dataRequests[_requestKey] = {	"eliona": eliona,
+													"assetGai": _assetGai,
+													"assetId": _assetId, 
+													"attribute": _attribute, 
+													"startDateTime": startDateTime, 
+													"endDateTime": startDateTime + timedelta(days=1),
+													"raster": _raster}
 
-						elif ("timeStampEnd" in _config):
+		#Second run: Every asset, attribute and raster is requested only once. All modes are read from the same response
+		self.logger.debug(f"Found {len(_placeholders)} cells with a configuration. Request {len(_dataRequests)} data sets")
+		_maxWorkers = int(settings.get("maxWorkers", self.maxWorkers))
+		_dataEntries = self.__fetchConcurrent(function=self.__getAggregatedDataEntries, requests=_dataRequests, maxWorkers=_maxWorkers)
 
-							_timeStampFormat = _config["timeStampEnd"]
-							_newValue = (endDateTime- timedelta(days=1)).strftime(_timeStampFormat)
+		#Third run: Fill the cells from the received data
+		for _placeholder in _placeholders:
 
-						elif ((("assetId" in _config) or ("assetGai" in _config)) and ("attribute" in _config)):
+			_text = _placeholder["text"]
+			_newValue = ""
+			_position = 0
+			_timeStamp = None
 
-							_timeStampFormat = "%Y-%m-%d %H:%M:%S"
+			for _part in _placeholder["parts"]:
 
-							if "assetId" in _config: 
-								_assetId = int(_config["assetId"])
-							else:
-								_assetId = 0
+				if _part["kind"] == PlaceholderKind.TIME_STAMP_START:
 
-							if "assetGai" in _config:
-								_assetGai = _config["assetGai"]
-							else:
-								_assetGai = ""
+					_timeStamp = startDateTime.strftime(_part["config"]["timeStampStart"])
 
-							_data, _dataFrame, _correctTimestamps = self.__getAggregatedDataList(	eliona=eliona, 
-																									assetGai=_assetGai,
-																									assetId=_assetId, 
-																									attribute=str(_config["attribute"]), 
-																									startDateTime= startDateTime, 
-																									endDateTime=startDateTime + timedelta(days=1),
-																									raster=_config["raster"],
-																									mode=_config["mode"],
-																									timeStampKey="TimeStamp",
-																									valueKey="Value")
+				elif _part["kind"] == PlaceholderKind.TIME_STAMP_END:
 
+					_timeStamp = (endDateTime- timedelta(days=1)).strftime(_part["config"]["timeStampEnd"])
 
-							#Set the TimeStamp straight
-							_dataFrame["TimeStamp"] = pd.to_datetime(arg=_dataFrame["TimeStamp"]).dt.strftime(_timeStampFormat)						
+				elif (_part["kind"] == PlaceholderKind.DATA) and (_part["requestKey"] != None):
 
-							#Just get the right timestamp
-							_dataFrame = _dataFrame[(_dataFrame["TimeStamp"] == startDateTime.strftime(_timeStampFormat))]
+					#Replace the json config with the received value
+					_filler = self.__getDataEntryValue(eliona=eliona, config=_part["config"], requestKey=_part["requestKey"], dataEntries=_dataEntries, startDateTime=startDateTime)
+					_newValue += _text[_position:_part["start"]] + str(_filler)
+					_position = _part["end"]
 
-							#Set the Value to the Spreadsheet cell
-							if(len(_dataFrame.index) == 1):
-								_newValue = _newValue.replace(_configRaw,  str(_dataFrame.at[0,"Value"]))
-							elif(len(_dataFrame.index) > 1):
-								self.logger.error("Received more than one data entry from the database: " + str(len(_dataFrame.index)))
-								_newValue = _newValue.replace(_configRaw, "DOUBLE-VALUE")
-							else:
-								
-								# Get the config what to enter if no value was found
-								_noValue = _config.get("fillNone", "NO-VALUE")
+			_newValue += _text[_position:]
 
-								if _noValue == "last":
-									_filler = self.getLastReceivedValue(eliona=eliona, assetGai=_assetGai, assetId=_assetId, attribute=str(_config["attribute"]), startDateTime=startDateTime, timeStampFormat=_timeStampFormat)
-									dateTimeStr = startDateTime.isoformat()
-									assetAttribute = str(_config["attribute"])
-									self.logger.warning(f"No value found and was replaced by last value from year raster. Asset: {_assetGai}, Attribute: {assetAttribute}, DateTime: {dateTimeStr}")
-								elif _noValue == "zero":
-									_filler = 0
-								else:
-									_filler = "NO-VALUE"
+			#A time stamp replaces the whole cell
+			if _timeStamp != None:
+				_newValue = _timeStamp
 
-								# Replace the json config with the filler value
-								_newValue = _newValue.replace(_configRaw, str(_filler))
+			if self.__isFloat(_newValue):
+				_dataTable.iat[_placeholder["row"], _placeholder["column"]] = float(_newValue)
+			else:
+				_dataTable.iat[_placeholder["row"], _placeholder["column"]] = _newValue
 
-				if _jsonFound:
-					if self.__isFloat(_newValue):
-						_dataTable.at[_rowIndex, _columnIndex] = float(_newValue)
-					else:
-						_dataTable.at[_rowIndex, _columnIndex] = _newValue
+		#Write the Data to the 
+		_reportCreated = self.__writeDataToFile(data=_dataTable, settings=settings, workbook=_workbook)
 
+		return _reportCreated
 
+	def __getDataEntryValue(self, eliona:ElionaApiHandler, config:dict, requestKey:tuple, dataEntries:dict, startDateTime:datetime):
+		"""
+		Get the value of a data entry placeholder from the received data
 
-		#Write the Data to the 
-		_reportCreated = self.__writeDataToFile(data=_dataTable, settings=settings)
+		Params
+		------
+		eliona:ElionaApiHandler	= eliona API Handler instance
+		config:dict 			= Json configuration of the placeholder
+		requestKey:tuple 		= Key of the data request. (assetId, assetGai, attribute, raster)
+		dataEntries:dict 		= Received data entries by request key
+		startDateTime:datetime 	= Start of the report
 
-		return _reportCreated
+		Return
+		------
+		-> Value to enter in place of the placeholder
+		"""
+
+		_assetId, _assetGai, _attribute, _raster = requestKey
+
+		#Just get the values of the requested mode
+		_values = [_entry[config["mode"]] for _entry in dataEntries[requestKey] if config["mode"] in _entry]
+
+		if(len(_values) == 1):
+			return _values[0]
+		elif(len(_values) > 1):
+			self.logger.error("Received more than one data entry from the database: " + str(len(_values)))
+			return "DOUBLE-VALUE"
+
+		# Get the config what to enter if no value was found
+		_noValue = config.get("fillNone", "NO-VALUE")
+
+		if _noValue == "last":
+			_filler = self.getLastReceivedValue(eliona=eliona, assetGai=_assetGai, assetId=_assetId, attribute=_attribute, startDateTime=startDateTime)
+			dateTimeStr = startDateTime.isoformat()
+			self.logger.warning(f"No value found and was replaced by last value from year raster. Asset: {_assetGai}, Attribute: {_attribute}, DateTime: {dateTimeStr}")
+		elif _noValue == "zero":
+			_filler = 0
+		else:
+			_filler = "NO-VALUE"
+
+		return _filler
 
 	def __createDataListReport(self, eliona:ElionaApiHandler, settings:dict, startDateTime:datetime, endDateTime:datetime) -> bool:
 		"""
@@ -194,15 +333,12 @@ class Spreadsheet:
 		#Init the data
 		_timeStampColumnName = ""
 		_timeStampFormat = ""
+		_raster = ""
 		_reportCreated = False
-		_correctTimestamps = False
 
-		#Only copy the template if needed 
-		if settings["fromTemplate"]:
-			shutil.copyfile(src=settings["templateFile"], dst=self.reportFilePath)
-
-		#Read the template 
-		_dataTable = self.__readTableTemplate(settings=settings)
+		#Open the template. Excel reports keep the workbook in memory until the report is saved
+		_workbook = self.__openReportWorkbook(settings=settings)
+		_dataTable = self.__getTemplate(settings=settings, workbook=_workbook)["dataFrame"]
 
 		#Read the configuration from the template
 		_configDict = {}
@@ -216,7 +352,7 @@ class Spreadsheet:
 				_configDict[_columnName] = _config
 
 		
-		dataColumns = []
+		_dataColumns = {}
 		#Search for the time stamp configuration
 		for _columnName in _configDict:
 
@@ -227,155 +363,217 @@ class Spreadsheet:
 
 				_raster = str(_configDict[_columnName]["raster"])
 
-				#Get the time tick 
+				#If we got monthly spans we will always start with the first month of the year
 				if _raster == "MONTH":
-
-					#If we got monthly spans we need to work with replace instead of timedelta.
-					#And we will always start with 
 					startDateTime = startDateTime.replace(month=1)
 
-				elif _raster.startswith("H"):
+			elif ((("assetId" in _configDict[_columnName]) or ("assetGai" in _configDict[_columnName])) 
+					and ("attribute" in _configDict[_columnName]) 
+					and ("mode" in _configDict[_columnName])):
 
-					timeTick = timedelta(hours=int(_raster.removeprefix("H")))	
+				if "assetId" in _configDict[_columnName]: 
+					_assetId = int(_configDict[_columnName]["assetId"])
+				else:
+					_assetId = 0
 
-				elif _raster.startswith("M"):
+				if "assetGai" in _configDict[_columnName]:
+					_assetGai = _configDict[_columnName]["assetGai"]
+				else:
+					_assetGai = ""
 
-					timeTick = timedelta(minutes=int(_raster.removeprefix("M")))	
+				_dataColumns[_columnName] = {	"assetGai": _assetGai,
+												"assetId": _assetId,
+												"attribute": str(_configDict[_columnName]["attribute"]),
+												"mode": _configDict[_columnName]["mode"],
+												"fillNone": _configDict[_columnName].get("fillNone", "")}
 
-				elif _raster.startswith("S"):
+			else:
+				self.logger.error("No valid table configuration.")
 
-					timeTick = timedelta(seconds=int(_raster.removeprefix("S")))
+		if _timeStampColumnName == "":
+			self.logger.error("No time stamp column found in the template")
+			return False
 
-				else:
-					self.logger.error("No valid time span found")
-					return False
-				
-				#Create the time column with the required timestamp
-				_timeStampList = []
-				_timeStamp = startDateTime
+		if self.__rasterFrequency(raster=_raster) is None:
+			self.logger.error("No valid time span found")
+			return False
 
-				# Define the end of the list. We do not want to fiddle around with the time interval. Therefore just -1 minute :-) 
-				_endTimeStampForList = (endDateTime-timedelta(minutes=1))
+		#Parallel lists will fetch the columns concurrently
+		if settings["type"] == "DataListParallel":
+			_maxWorkers = int(settings.get("maxWorkers", self.maxWorkers))
+		else:
+			_maxWorkers = 1
 
-				if _raster == "MONTH":
-					while (_timeStamp <= _endTimeStampForList):
-						_timeStampList.append((_timeStamp).strftime(_timeStampFormat))
+		_tableSettings = {	"eliona": eliona,
+							"settings": settings,
+							"timeStampColumnName": _timeStampColumnName,
+							"timeStampFormat": _timeStampFormat,
+							"raster": _raster,
+							"dataColumns": _dataColumns,
+							"maxWorkers": _maxWorkers}
 
-						if _timeStamp.month + 1 > 12:
-							_timeStamp = _timeStamp.replace(month = 1)
-							_timeStamp = _timeStamp.replace(year= _timeStamp.year + 1)
-						else:
-							_timeStamp = _timeStamp.replace(month=_timeStamp.month + 1)
+		#Large csv reports can be written month by month. Like this only one month is kept in memory
+		if settings.get("streaming", False) and (self.reportFilePath.split(".")[-1] == "csv") and (_raster != "MONTH"):
 
-				else:
-					while (_timeStamp <= _endTimeStampForList):
-						_timeStampList.append((_timeStamp).strftime(_timeStampFormat))
-						_timeStamp = _timeStamp + timeTick
+			_previousRow = None
+			_filledColumns = set()
+			_append = False
 
-				#Create the DataFrame for the readed Data
-				_dataTable = pd.DataFrame( _timeStampList, columns=[_timeStampColumnName])
+			for _timeGrid in self.__createTimeGridChunks(startDateTime=startDateTime, endDateTime=endDateTime, raster=_raster):
 
-			elif ((("assetId" in _configDict[_columnName]) or ("assetGai" in _configDict[_columnName])) 
-					and ("attribute" in _configDict[_columnName]) 
-					and ("mode" in _configDict[_columnName])):
-				
-				dataColumns.append(_columnName)
+				_dataTable = self.__createDataListTable(timeGrid=_timeGrid, previousRow=_previousRow, filledColumns=_filledColumns, **_tableSettings)
+				_previousRow = _dataTable.iloc[-1].copy()
 
-				if "assetId" in _configDict[_columnName]: 
-					_assetId = int(_configDict[_columnName]["assetId"])
-				else:
-					_assetId = 0
+				#Format the time stamps once for the output
+				_dataTable[_timeStampColumnName] = _dataTable[_timeStampColumnName].dt.strftime(_timeStampFormat)
 
-				if "assetGai" in _configDict[_columnName]:
-					_assetGai = _configDict[_columnName]["assetGai"]
-				else:
-					_assetGai = ""
+				_reportCreated = self.__writeDataToFile(data=_dataTable, settings=settings, append=_append)
+				_append = True
 
+				if not _reportCreated:
+					break
 
-				_data, _dataFrame, _correctTimestamps = self.__getAggregatedDataList(	eliona=eliona,
-																						assetGai=_assetGai, 
-																						assetId=_assetId,
-																						attribute=str(_configDict[_columnName]["attribute"]), 
-																						startDateTime=startDateTime, 
-																						endDateTime=endDateTime,
-																						raster=_raster,
-																						mode=_configDict[_columnName]["mode"],
-																						timeStampKey = _timeStampColumnName,
-																						valueKey=_columnName)
+		else:
 
+			_timeGrid = self.__createTimeGrid(startDateTime=startDateTime, endDateTime=endDateTime, raster=_raster)
+			_dataTable = self.__createDataListTable(timeGrid=_timeGrid, previousRow=None, filledColumns=set(), **_tableSettings)
 
-				#Convert the data with the right timestamp format
-				_dataFrame[_timeStampColumnName] = pd.to_datetime(arg=_dataFrame[_timeStampColumnName]).dt.strftime(_timeStampFormat)
-				#Merge the Aggregated data with the current dataframe
-				_dataTable = pd.merge(_dataTable, _dataFrame, how='left', on=_timeStampColumnName)
+			#Format the time stamps once for the output
+			_dataTable[_timeStampColumnName] = _dataTable[_timeStampColumnName].dt.strftime(_timeStampFormat)
 
-			else:
-				self.logger.error("No valid table configuration.")
+			#Write the data to file
+			_reportCreated = self.__writeDataToFile(data=_dataTable, settings=settings, workbook=_workbook)
+
+		return _reportCreated
+
+	def __createDataListTable(self, eliona:ElionaApiHandler, settings:dict, timeGrid:pd.DatetimeIndex, timeStampColumnName:str, timeStampFormat:str,
+								raster:str, dataColumns:dict, maxWorkers:int, previousRow:pd.Series|None, filledColumns:set) -> pd.DataFrame:
+		"""
+		Get the data of all columns for the given time stamps and fill the gaps
+
+		Params
+		------
+		eliona:ElionaApiHandler = Eliona handler
+		settings:dict = Settings dictionary
+		timeGrid:pd.DatetimeIndex = Timezone aware time stamps of the table
+		timeStampColumnName:str = Column name of the time stamps
+		timeStampFormat:str = Format of the time stamps
+		raster:str = Raster of the data
+		dataColumns:dict = Configuration of the data columns by column name {"assetGai", "assetId", "attribute", "mode", "fillNone"}
+		maxWorkers:int = Maximum number of concurrent requests
+		previousRow:pd.Series|None = Last row of the previous part of the report. Used to fill the gaps at the start
+		filledColumns:set = Columns which already got their last received value in a previous part. Will be updated
+
+		Return
+		------
+		-> pd.DataFrame = Table with the time stamps (not formatted yet) and the data columns
+		"""
+
+		if len(timeGrid) == 0:
+			return pd.DataFrame(columns=[timeStampColumnName] + list(dataColumns.keys()))
+
+		_startDateTime = timeGrid[0].to_pydatetime()
+		_endDateTime = timeGrid[-1].to_pydatetime() + self.__rasterFrequency(raster=raster)
+
+		#Get the data of all columns
+		_dataRequests = {}
+		for _columnName, _column in dataColumns.items():
+
+			_dataRequests[_columnName] = {	"eliona": eliona,
+											"assetGai": _column["assetGai"],
+											"assetId": _column["assetId"],
+											"attribute": _column["attribute"],
+											"startDateTime": _startDateTime,
+											"endDateTime": _endDateTime,
+											"raster": raster,
+											"mode": _column["mode"],
+											"timeStampKey": timeStampColumnName,
+											"valueKey": _columnName}
+
+		_results = self.__fetchConcurrent(function=self.__getAggregatedDataList, requests=_dataRequests, maxWorkers=maxWorkers)
+
+		#Create the DataFrame for the readed Data. The data is joined by the wall time of the time stamps
+		_dataFrames = {}
+		for _columnName in dataColumns:
+			_data, _dataFrames[_columnName], _correctTimestamps = _results[_columnName]
+
+		_dataTable = self.__joinDataColumns(timeStamps=timeGrid.tz_localize(None), timeStampColumnName=timeStampColumnName, dataFrames=_dataFrames)
 
 		# Search for empty cells in the data columns
 		#Get the empty data from the table
-		emptyTableFrame = pd.isnull(_dataTable)
+		_emptyTableFrame = pd.isnull(_dataTable)
+		_seedRequests = {}
 
-		for _columnName in dataColumns:
+		for _columnName, _column in dataColumns.items():
 
 			# Check if empty entries need to be fixed for this column
-			if _configDict[_columnName].get("fillNone", ""):
-
-				# Get the Rows with empty cells
-				singleDataFrame = emptyTableFrame[emptyTableFrame[_columnName] == True]
-
-				# Check if Data Column has entry cells
-				if singleDataFrame.size >= 1:
-
-					#Fix all the empty cells
-					for _itemIndex, _columnValues in singleDataFrame.iterrows():
-
-						# Get the configuration of the row from teh template
-						fillNone = _configDict[_columnName].get("fillNone", "NO-VALUE")
-
-						if "assetId" in _configDict[_columnName]: 
-							_assetId = int(_configDict[_columnName]["assetId"])
-						else:
-							_assetId = 0
-
-						if "assetGai" in _configDict[_columnName]:
-							_assetGai = _configDict[_columnName]["assetGai"]
-						else:
-							_assetGai = ""
-						_assetAttribute = str(_configDict[_columnName]["attribute"])
-
-						# Get the timestamp
-						dateTimeStr = _dataTable.at[_itemIndex, _timeStampColumnName]
-						_startTimestamp = datetime.strptime(dateTimeStr, _timeStampFormat).astimezone(pytz.timezone("Europe/Zurich"))
-
-						if fillNone == "last":
-							_newValue = self.getLastReceivedValue(eliona=eliona, assetGai=_assetGai, assetId=_assetId, attribute=_assetAttribute, startDateTime=_startTimestamp)
-							_newValueStr = str(_newValue)
-							self.logger.warning(f"No value found and was replaced by last value: {_newValueStr}. AssetGAI: {_assetGai}, Attribute: {_assetAttribute}, DateTime: {dateTimeStr}")
-							_dataTable.at[_itemIndex, _columnName] = _newValue
-							break
-						elif fillNone == "zero":
-							_newValue = 0
-							self.logger.warning(f"No value found and was replaced by zero. AssetGAI: {_assetGai}, Attribute: {_assetAttribute}, DateTime: {dateTimeStr} ")
-							_dataTable.at[_itemIndex, _columnName] = _newValue
-							break
+			_fillNone = _column["fillNone"]
+			_emptyCells = _emptyTableFrame[_columnName]
+			_emptyCount = int(_emptyCells.sum())
+
+			if (_emptyCount == 0) or (_fillNone not in ("last", "zero")):
+				continue
+
+			_assetGai = _column["assetGai"]
+			_assetAttribute = _column["attribute"]
+
+			if _fillNone == "zero":
+
+				_dataTable[_columnName] = _dataTable[_columnName].fillna(0)
+				self.logger.warning(f"No value found for {_emptyCount} time stamps and was replaced by zero. AssetGAI: {_assetGai}, Attribute: {_assetAttribute}")
+
+			elif (_fillNone == "last") and (_columnName in filledColumns):
+
+				#Continue with the last value of the previous part
+				if _emptyCells.iat[0]:
+					_dataTable.at[0, _columnName] = previousRow[_columnName]
+
+				_dataTable[_columnName] = _dataTable[_columnName].fillna(method="ffill")
+
+			elif _fillNone == "last":
+
+				#Only the first gap needs the last received value. The following gaps are forward filled
+				_startTimestamp = timeGrid[_emptyCells.idxmax()].to_pydatetime()
+
+				_seedRequests[_columnName] = {	"eliona": eliona,
+												"assetGai": _assetGai,
+												"assetId": _column["assetId"],
+												"attribute": _assetAttribute,
+												"startDateTime": _startTimestamp}
+
+		_seeds = self.__fetchConcurrent(function=self.getLastReceivedValue, requests=_seedRequests, maxWorkers=maxWorkers)
+
+		for _columnName, _seed in _seeds.items():
+
+			_firstEmptyIndex = _emptyTableFrame[_columnName].idxmax()
+			_dataTable.at[_firstEmptyIndex, _columnName] = _seed
+			_dataTable[_columnName] = _dataTable[_columnName].fillna(method="ffill")
+			filledColumns.add(_columnName)
+
+			_assetGai = _seedRequests[_columnName]["assetGai"]
+			_assetAttribute = _seedRequests[_columnName]["attribute"]
+			_emptyCount = int(_emptyTableFrame[_columnName].sum())
+			self.logger.warning(f"No value found for {_emptyCount} time stamps and was replaced by last value: {_seed}. AssetGAI: {_assetGai}, Attribute: {_assetAttribute}")
 
 		#Fill up the empty cells. First with the newer ones. In case the first row is empty we will also fill with the older ones up
 		if settings.get("fillNone", True):
+
+			if previousRow is not None:
+				_dataTable.iloc[0] = _dataTable.iloc[0].fillna(previousRow)
+
 			_dataTable = _dataTable.fillna(method="ffill")
 			_dataTable = _dataTable.fillna(method="bfill")
 
-		#Write the data to file
-		_reportCreated = self.__writeDataToFile(data=_dataTable, settings=settings)
-
-		return _reportCreated
+		return _dataTable
 
-	def __writeDataToFile(self, data:pd.DataFrame, settings:dict)-> bool:
+	def __writeDataToFile(self, data:pd.DataFrame, settings:dict, append:bool=False, workbook:Workbook|None=None)-> bool:
 		"""
 		Write the dataFrame to the requested file
 
 		data:pd.DataFrame = Data to write to the table
 		settings:dict = Settings with the path of the file
+		append:bool = Only for csv files. Append the data without header to the already written data
+		workbook:Workbook|None = Only for excel files. Opened template of the report. The data is written to the workbook and saved once
 
 		->bool = Will return True if successful
 		"""
@@ -383,13 +581,31 @@ class Spreadsheet:
 		_fileWritten = False
 		_fileType = self.reportFilePath.split(".")[-1]
 		try:
-			if (_fileType == "xlsx") or (_fileType == "xls"):
+			if ((_fileType == "xlsx") or (_fileType == "xls")) and (workbook != None):
 
+				#Set the values in the opened template and save the report once
+				_startTime = time.perf_counter()
+				self.__writeDataToWorkbook(data=data, sheet=workbook[settings["sheet"]])
+				workbook.save(self.reportFilePath)
+				self.logger.debug(f"Wrote the data to the excel file in {time.perf_counter() - _startTime:.3f} s")
+
+				#Create an csv file from the values in memory. Can be disabled per report
+				if settings.get("createCsv", True):
+					self.__createCalculatedCsv(excelFilePath=self.reportFilePath, excelSheet=settings["sheet"], csvSeparator=settings["separator"], formulaEngine=settings.get("formulaEngine", "builtin"), workbook=workbook)
+
+				# Write the file was successful
+				_fileWritten = True
+
+			elif (_fileType == "xlsx") or (_fileType == "xls"):
+
+				_startTime = time.perf_counter()
 				with pd.ExcelWriter(path=(self.reportFilePath), mode="a", if_sheet_exists="overlay") as writer:
 					data.to_excel(writer, sheet_name= settings["sheet"], index=False)
+				self.logger.debug(f"Wrote the data to the excel file in {time.perf_counter() - _startTime:.3f} s")
 
-				#Create an csv file from the calculated ExcelFile
-				self.__createCalculatedCsv(excelFilePath=self.reportFilePath, excelSheet=settings["sheet"], csvSeparator=settings["separator"])
+				#Create an csv file from the calculated ExcelFile. Can be disabled per report
+				if settings.get("createCsv", True):
+					self.__createCalculatedCsv(excelFilePath=self.reportFilePath, excelSheet=settings["sheet"], csvSeparator=settings["separator"], formulaEngine=settings.get("formulaEngine", "builtin"))
 
 				# Write the file was successful
 				_fileWritten = True
@@ -397,12 +613,12 @@ class Spreadsheet:
 			elif (_fileType == "csv"):
 
 				_mode = ""
-				if settings["fromTemplate"]:
+				if settings["fromTemplate"] or append:
 					_mode = "a"
 				else:
 					_mode = "w"
 				
-				data.to_csv(path_or_buf= (self.reportFilePath), mode=_mode, index=False, header=True, sep=settings["separator"])
+				data.to_csv(path_or_buf= (self.reportFilePath), mode=_mode, index=False, header=(not append), sep=settings["separator"])
 				
 				# Write the file was successful
 				_fileWritten = True
@@ -413,6 +629,195 @@ class Spreadsheet:
 
 		return _fileWritten
 
+	def __writeDataToWorkbook(self, data:pd.DataFrame, sheet:Worksheet) -> None:
+		"""
+		Write the values of the data frame to the sheet. The header row is kept from the template.
+		Only the values are set. The formatting of the template stays untouched
+
+		Params
+		------
+		data:pd.DataFrame	= Data to write. The first data row is written to the second row of the sheet
+		sheet:Worksheet		= Sheet of the opened template
+		"""
+
+		_values = data.astype(object).where(pd.notnull(data), None).values.tolist()
+
+		for _rowIndex, _row in enumerate(_values, start=2):
+			for _columnIndex, _value in enumerate(_row, start=1):
+				sheet.cell(row=_rowIndex, column=_columnIndex, value=_value)
+
+	def __createTimeGrid(self, startDateTime:datetime, endDateTime:datetime, raster:str) -> pd.DatetimeIndex | None:
+		"""
+		Create the time stamps of a data list from the start time in steps of the raster.
+		The end time stamp is not included.
+
+		The time stamps keep the utc offset of the start time. Like this the wall time stays in the same raster over the whole time span.
+
+		Params
+		------
+		startDateTime:datetime = First time stamp of the list
+		endDateTime:datetime = End of the list
+		raster:str = Raster of the list: "MONTH", "H<hours>", "M<minutes>", "S<seconds>"
+
+		Return
+		------
+		-> pd.DatetimeIndex = Timezone aware time stamps // None if the raster is invalid
+		"""
+
+		_frequency = self.__rasterFrequency(raster=raster)
+		if _frequency is None:
+			return None
+
+		# Define the end of the list. We do not want to fiddle around with the time interval. Therefore just -1 minute :-) 
+		_timeZone = timezone(startDateTime.utcoffset())
+		_start = startDateTime.astimezone(_timeZone)
+		_end = (endDateTime - timedelta(minutes=1)).astimezone(_timeZone)
+
+		return pd.date_range(start=_start, end=_end, freq=_frequency)
+
+	def __createTimeGridChunks(self, startDateTime:datetime, endDateTime:datetime, raster:str):
+		"""
+		Create the same time stamps as __createTimeGrid month by month.
+		Only for time tick rasters "H<hours>", "M<minutes>", "S<seconds>"
+
+		Params
+		------
+		startDateTime:datetime = First time stamp of the list
+		endDateTime:datetime = End of the list
+		raster:str = Raster of the list
+
+		Return
+		------
+		-> yields a pd.DatetimeIndex with the time stamps of every month
+		"""
+
+		_frequency = self.__rasterFrequency(raster=raster)
+		_timeZone = timezone(startDateTime.utcoffset())
+		_start = pd.Timestamp(startDateTime.astimezone(_timeZone))
+		_end = pd.Timestamp((endDateTime - timedelta(minutes=1)).astimezone(_timeZone))
+
+		if _end < _start:
+			return
+
+		_count = int((_end - _start) // _frequency) + 1
+
+		#Get the index of the first time stamp of every month
+		_monthStarts = pd.date_range(start=_start.normalize().replace(day=1) + pd.DateOffset(months=1), end=_end, freq="MS")
+		_positions = [0] + [int(-((_start - _monthStart) // _frequency)) for _monthStart in _monthStarts] + [_count]
+
+		for _first, _last in zip(_positions[:-1], _positions[1:]):
+			if _last > _first:
+				yield pd.date_range(start=_start + (_frequency * _first), periods=(_last - _first), freq=_frequency)
+
+	def __rasterFrequency(self, raster:str) -> pd.DateOffset | pd.Timedelta | None:
+		"""
+		Get the time step of a raster
+
+		Params
+		------
+		raster:str = Raster of the list: "MONTH", "H<hours>", "M<minutes>", "S<seconds>"
+
+		Return
+		------
+		-> Time step of the raster // None if the raster is invalid
+		"""
+
+		if raster == "MONTH":
+			return pd.DateOffset(months=1)
+		elif raster.startswith("H"):
+			return pd.Timedelta(hours=int(raster.removeprefix("H")))
+		elif raster.startswith("M"):
+			return pd.Timedelta(minutes=int(raster.removeprefix("M")))
+		elif raster.startswith("S"):
+			return pd.Timedelta(seconds=int(raster.removeprefix("S")))
+		else:
+			return None
+
+	def __joinDataColumns(self, timeStamps:pd.DatetimeIndex, timeStampColumnName:str, dataFrames:dict[str, pd.DataFrame]) -> pd.DataFrame:
+		"""
+		Join the data columns to the time stamps in one step
+
+		Every column is aligned to the time stamps on its own and the table is created once at the end.
+		Like this the growing table is not copied for every column.
+
+		Params
+		------
+		timeStamps:pd.DatetimeIndex = Time stamps of the table
+		timeStampColumnName:str = Column name of the time stamps
+		dataFrames:dict = Data frames with the time stamp and the value column by the column name
+
+		Return
+		------
+		-> pd.DataFrame = Table with the time stamp column and all data columns
+		"""
+
+		_columns = {timeStampColumnName: timeStamps}
+
+		for _columnName, _dataFrame in dataFrames.items():
+
+			_series = pd.Series(_dataFrame[_columnName].to_numpy(), index=pd.DatetimeIndex(_dataFrame[timeStampColumnName]))
+
+			#Keep the last value of doubled time stamps
+			_series = _series[~_series.index.duplicated(keep="last")]
+
+			_columns[_columnName] = _series.reindex(timeStamps).to_numpy()
+
+		return pd.DataFrame(_columns)
+
+	def __fetchConcurrent(self, function, requests:dict, maxWorkers:int=1) -> dict:
+		"""
+		Call a data request function for several requests
+
+		Params
+		------
+		function = Function to call with the parameters of each request
+		requests:dict = Dictionary with a key of the request and the parameters of the function as value
+		maxWorkers:int = Maximum number of concurrent requests. 1 will call the requests one after another
+
+		Return
+		------
+		-> dict:{key, return value} = Return value of the function of each request
+		"""
+
+		_results = {}
+
+		if (maxWorkers <= 1) or (len(requests) <= 1):
+
+			for _key, _request in requests.items():
+				_results[_key] = function(**_request)
+
+		else:
+
+			self.logger.debug(f"Fetch {len(requests)} requests with {maxWorkers} workers")
+
+			#The eliona handler is not shared between threads. Every worker uses a handler of its own
+			_workerHandlers = threading.local()
+
+			def _call(request:dict):
+
+				if ("eliona" not in request) or (self._connectionSettings == {}):
+					return function(**request)
+
+				if self.connectionManager != None:
+					with self.connectionManager.lease(settings=self._connectionSettings) as _eliona:
+						return function(**{**request, "eliona": _eliona})
+
+				if getattr(_workerHandlers, "eliona", None) == None:
+					_workerHandlers.eliona = self.__connect(connectionSettings=self._connectionSettings)
+
+				return function(**{**request, "eliona": _workerHandlers.eliona})
+
+			with ThreadPoolExecutor(max_workers=maxWorkers) as _executor:
+
+				_futures = {}
+				for _key, _request in requests.items():
+					_futures[_key] = _executor.submit(_call, _request)
+
+				for _key, _future in _futures.items():
+					_results[_key] = _future.result()
+
+		return _results
+
 	def __getAggregatedDataList(self, eliona:ElionaApiHandler, assetId:int, attribute:str, startDateTime:datetime, 
 								endDateTime:datetime, raster:str, mode:str, timeStampKey:str, valueKey:str, assetGai:str="",
 								fillNone="") -> tuple[dict|None, pd.DataFrame|None, bool]:
@@ -441,54 +846,27 @@ class Spreadsheet:
 
 		try:
 
-			_assetId = 0
-			_utcOffset = int(startDateTime.utcoffset().total_seconds()/3600)
-			_startDate = (startDateTime-timedelta(hours=_utcOffset + 1)).isoformat()
-			_endDate = (endDateTime+timedelta(hours=_utcOffset + 1)).isoformat()
-
-			if assetGai != "":
-
-				self.logger.debug(f"get data from: assetGai: {assetGai} // attribute: {attribute} // raster: {raster} // start date: {_startDate} // end date: {_endDate}")
+			_retVal, _assetId = self.__requestAggregatedData(	eliona=eliona,
+																assetGai=assetGai,
+																assetId=assetId,
+																attribute=attribute,
+																startDateTime=startDateTime,
+																endDateTime=endDateTime,
+																raster=raster)
 
-				_retVal, part = eliona.get_data_aggregated(	asset_gai=assetGai, 
-															from_date=_startDate, 
-															to_date=_endDate, 
-															data_subtype="input",
-															raster=raster,
-															attribute=attribute)
-				_assetId = eliona.get_asset_id(asset_gai=assetGai)
-
-			elif assetId > 0 :
-
-				self.logger.debug(f"get data from: assetGai: {assetGai} // attribute: {attribute} // raster: {raster} // start date: {_startDate} // end date: {_endDate}")
-
-				_retVal, part = eliona.get_data_aggregated(	asset_id=assetId, 
-															from_date=_startDate, 
-															to_date=_endDate, 
-															data_subtype="input",
-															raster=raster,
-															attribute=attribute)
-				_assetId = assetId
-
-			
 			# Dictionary will return True if not empty
 			if _retVal:
 
 				#Get the requested data and acquisition mode
-				for _data in _retVal:
-
-					#write the info to the LOGGER
-					if ((str(_data["asset_id"]) == str(_assetId))
-						and (_data["attribute"] == attribute) 
-						and (_data["raster"] == raster)
-						and mode in _data ):
-
-						_dataSet[_data["timestamp"]] = _data[mode]
-						_dataFrame = pd.concat([_dataFrame, pd.DataFrame([[_data["timestamp"].replace(tzinfo=None), _data[mode]]], columns=(timeStampKey, valueKey))] )
+				_dataSet, _dataFrame = self.__accumulateAggregatedData(	data=_retVal,
+																		assetId=_assetId,
+																		attribute=attribute,
+																		raster=raster,
+																		mode=mode,
+																		timeStampKey=timeStampKey,
+																		valueKey=valueKey)
 
-						self.logger.debug(	"Timestamp" + str(_data["timestamp"]) + " // AssetId:  " + 
-								str(_data["asset_id"]) + " // Attribute: " + str(_data["attribute"]) + 
-								" // Raster: " + str(_data["raster"]) + " // Value: " +str(_data[mode]))
+				self.logger.debug(f"Received {len(_dataFrame.index)} data entries for AssetId: {_assetId} // Attribute: {attribute} // Raster: {raster}")
 
 				#Validate the Data
 				_checkActive = False
@@ -554,16 +932,292 @@ class Spreadsheet:
 		#Return the values
 		return (_dataSet, _dataFrame, _validKeys)
 
-	def __readTableTemplate(self, settings:dict) -> pd.DataFrame | None:
+	def __requestAggregatedData(self, eliona:ElionaApiHandler, assetId:int, attribute:str, startDateTime:datetime,
+								endDateTime:datetime, raster:str, assetGai:str="") -> tuple[list, int]:
+		"""
+		Request the aggregated data of an asset attribute from eliona
+
+		Params
+		------
+		eliona:ElionaApiHandler	= eliona API Handler instance
+		assetId:int = Asset ID to get the data from. Only used if no assetGai is given
+		attribute:str = Attribute from the Asset to read the data from
+		startDateTime:datetime = Start of the requested time span
+		endDateTime:datetime = End of the requested time span
+		raster:str = pipeline raster to search for
+		assetGai:str = Asset GAI to get the data from
+
+		Return
+		------
+		-> (list: response of the get_data_aggregated call, int: asset ID of the requested asset)
+		"""
+
+		_retVal = []
+		_assetId = 0
+		_utcOffset = int(startDateTime.utcoffset().total_seconds()/3600)
+		_startDate = (startDateTime-timedelta(hours=_utcOffset + 1)).isoformat()
+		_endDate = (endDateTime+timedelta(hours=_utcOffset + 1)).isoformat()
+
+		#Check if the data was already received
+		if assetGai != "":
+			_cacheAsset = assetGai
+		else:
+			_cacheAsset = str(assetId)
+
+		if self.dataCache != None:
+			_cached = self.dataCache.get(asset=_cacheAsset, attribute=attribute, raster=raster, startDate=_startDate, endDate=_endDate)
+			if _cached != None:
+				return _cached
+
+		#Resolve the GAI first. Known asset IDs can be requested directly
+		if assetGai != "":
+			_assetId = self.__getAssetId(eliona=eliona, assetGai=assetGai)
+		else:
+			_assetId = assetId
+
+		if (assetGai != "") and (_assetId == 0):
+
+			self.logger.debug(f"get data from: assetGai: {assetGai} // attribute: {attribute} // raster: {raster} // start date: {_startDate} // end date: {_endDate}")
+
+			_retVal, part = eliona.get_data_aggregated(	asset_gai=assetGai, 
+														from_date=_startDate, 
+														to_date=_endDate, 
+														data_subtype="input",
+														raster=raster,
+														attribute=attribute)
+
+		elif _assetId > 0 :
+
+			self.logger.debug(f"get data from: assetGai: {assetGai} // assetId: {_assetId} // attribute: {attribute} // raster: {raster} // start date: {_startDate} // end date: {_endDate}")
+
+			_retVal, part = eliona.get_data_aggregated(	asset_id=_assetId, 
+														from_date=_startDate, 
+														to_date=_endDate, 
+														data_subtype="input",
+														raster=raster,
+														attribute=attribute)
+
+		#Store the received data. Time spans reaching into the future or closed only recently can still change
+		if (self.dataCache != None) and _retVal:
+			_closedSince = datetime.now(tz=endDateTime.tzinfo) - (endDateTime + timedelta(hours=_utcOffset + 1))
+			_openPeriod = _closedSince < timedelta(seconds=self.dataCache.closedPeriodGrace)
+			self.dataCache.set(asset=_cacheAsset, attribute=attribute, raster=raster, startDate=_startDate, endDate=_endDate, openPeriod=_openPeriod, data=_retVal, assetId=_assetId)
+
+		return (_retVal, _assetId)
+
+	def __getAggregatedDataEntries(self, eliona:ElionaApiHandler, assetId:int, attribute:str, startDateTime:datetime,
+									endDateTime:datetime, raster:str, assetGai:str="", timeStampFormat:str="%Y-%m-%d %H:%M:%S") -> list[dict]:
+		"""
+		Get all aggregated data entries of an asset attribute at the start time stamp.
+		The entries contain every mode of the pipeline. Therefore all cells with the same asset, attribute and raster can share one request.
+
+		Params
+		------
+		eliona:ElionaApiHandler	= eliona API Handler instance
+		assetId:int = Asset ID to get the data from
+		attribute:str = Attribute from the Asset to read the data from
+		startDateTime:datetime = Time stamp of the requested entries
+		endDateTime:datetime = End of the requested time span
+		raster:str = pipeline raster to search for
+		assetGai:str = Asset GAI to get the data from
+		timeStampFormat:str = Format to compare the time stamps with
+
+		Return
+		------
+		-> list: Data entries of the given time stamp. Empty if nothing was found
+		"""
+
+		_entries = []
+
+		try:
+
+			_retVal, _assetId = self.__requestAggregatedData(	eliona=eliona,
+																assetGai=assetGai,
+																assetId=assetId,
+																attribute=attribute,
+																startDateTime=startDateTime,
+																endDateTime=endDateTime,
+																raster=raster)
+
+			_assetIdStr = str(_assetId)
+			_timeStamp = startDateTime.strftime(timeStampFormat)
+
+			for _data in (_retVal or []):
+
+				if ((str(_data["asset_id"]) == _assetIdStr)
+					and (_data["attribute"] == attribute)
+					and (_data["raster"] == raster)
+					and (_data["timestamp"].replace(tzinfo=None).strftime(timeStampFormat) == _timeStamp)):
+
+					_entries.append(_data)
+
+		except Exception as err:
+			self.logger.exception("Exception getting aggregated data\n" + str(err))
+
+		return _entries
+
+	def __accumulateAggregatedData(self, data:list, assetId:int, attribute:str, raster:str, mode:str,
+									timeStampKey:str, valueKey:str) -> tuple[dict, pd.DataFrame]:
+		"""
+		Collect the matching entries of an aggregated data response column by column
+		and build the data frame once at the end.
+
+		Params
+		------
+		data:list = Response list of the get_data_aggregated call
+		assetId:int = Asset ID the entries must belong to
+		attribute:str = Attribute the entries must belong to
+		raster:str = Raster the entries must belong to
+		mode:str = Aggregation mode to read the value from
+		timeStampKey:str = Column name of the timestamp column
+		valueKey:str = Column name of the value column
+
+		Return
+		------
+		-> (dict:{datetime, dataValue}, pd.DataFrame with the columns (timeStampKey, valueKey))
+		"""
+
+		_dataSet = {}
+		_timeStamps = []
+		_values = []
+		_assetIdStr = str(assetId)
+
+		for _data in data:
+
+			if ((str(_data["asset_id"]) == _assetIdStr)
+				and (_data["attribute"] == attribute)
+				and (_data["raster"] == raster)
+				and mode in _data ):
+
+				_dataSet[_data["timestamp"]] = _data[mode]
+				_timeStamps.append(_data["timestamp"].replace(tzinfo=None))
+				_values.append(_data[mode])
+
+		#Build the data frame in one step instead of concatenating every single row
+		_dataFrame = pd.DataFrame({timeStampKey: _timeStamps, valueKey: _values}, columns=(timeStampKey, valueKey))
+
+		return (_dataSet, _dataFrame)
+
+	def __getTemplate(self, settings:dict, workbook:Workbook|None=None) -> dict | None:
+		"""
+		Get the parsed template. Unchanged templates are only parsed once if a template cache is set.
+		The cached entry is shared. Copy the data frame before changing it
+
+		settings:dict = Settings dictionary
+		workbook:Workbook|None = Already opened template. Will be loaded from the template file if not given
+		returns {"dataFrame": template data, "placeholders": [(row index, column name, cell value, [(config, raw config)])]} // None if the template could not be read
+		"""
+
+		if self.templateCache == None:
+			return self.__parseTemplate(settings=settings, workbook=workbook)
+
+		return self.templateCache.get(	path=settings["templateFile"], 
+										key=(settings.get("sheet", ""), settings.get("separator", "")),
+										loader=lambda: self.__parseTemplate(settings=settings, workbook=workbook))
+
+	def __parseTemplate(self, settings:dict, workbook:Workbook|None=None) -> dict | None:
+		"""
+		Read the template and compile the json configurations of all cells into a placeholder index.
+		Only cells containing a configuration are listed in the index
+
+		settings:dict = Settings dictionary
+		workbook:Workbook|None = Already opened template. Will be loaded from the template file if not given
+		returns {"dataFrame": template data, "placeholders": [{"row", "column", "text", "parts"}]} // None if the template could not be read
+		"""
+
+		_dataTable = self.__readTableTemplate(settings=settings, workbook=workbook)
+
+		if _dataTable is None:
+			return None
+
+		_placeholders = []
+		for _rowPosition, _row in enumerate(_dataTable.itertuples(index=False, name=None)): #iterate over rows
+
+			for _columnPosition, _value in enumerate(_row):
+
+				if type(_value) == str:
+
+					_parts = [self.__compilePlaceholder(config=_config, start=_start, end=_end, raw=_value[_start:_end]) for _config, _start, _end in self.__findJson(_value)]
+
+					if len(_parts) > 0:
+						_placeholders.append({"row": _rowPosition, "column": _columnPosition, "text": _value, "parts": _parts})
+
+		return {"dataFrame": _dataTable, "placeholders": _placeholders}
+
+	def __compilePlaceholder(self, config:dict, start:int, end:int, raw:str) -> dict:
+		"""
+		Compile a json configuration of a template cell
+
+		Params
+		------
+		config:dict = Decoded json configuration
+		start:int 	= Position of the configuration in the cell text
+		end:int 	= End of the configuration in the cell text
+		raw:str 	= Configuration as written in the cell
+
+		Return
+		------
+		-> {"start", "end", "raw", "config", "kind", "requestKey"}. The request key is None if the placeholder requests no data or no raster is configured
+		"""
+
+		_requestKey = None
+
+		if "timeStampStart" in config:
+			_kind = PlaceholderKind.TIME_STAMP_START
+		elif "timeStampEnd" in config:
+			_kind = PlaceholderKind.TIME_STAMP_END
+		elif (("assetId" in config) or ("assetGai" in config)) and ("attribute" in config):
+			_kind = PlaceholderKind.DATA
+			if "raster" in config:
+				_requestKey = self.__dataEntryRequestKey(config=config)
+		else:
+			_kind = PlaceholderKind.UNKNOWN
+
+		return {"start": start, "end": end, "raw": raw, "config": config, "kind": _kind, "requestKey": _requestKey}
+
+	def __openReportWorkbook(self, settings:dict) -> Workbook | None:
+		"""
+		Open the template of an excel report created from a template. The workbook is used for reading, writing and the csv export.
+		Other reports only copy the template if requested
+
+		settings:dict = Settings dictionary
+		returns the opened workbook // None if the report is not an excel report from a template
+		"""
+
+		_fileType = self.reportFilePath.split(".")[-1]
+
+		if settings["fromTemplate"] and (_fileType in ("xlsx", "xls")) and (settings["templateFile"].split(".")[-1] in ("xlsx", "xls")):
+
+			#The template is parsed for every report and not cached. Parsing the xml is the cost, not reading the file,
+			#and openpyxl workbooks can not be copied reliably
+			_workbook = None
+			try:
+				_workbook = load_workbook(filename = settings["templateFile"])
+			except OSError:
+				self.logger.exception("Template file could not be opened: " + settings["templateFile"])
+
+			return _workbook
+
+		#Only copy the template if needed 
+		if settings["fromTemplate"]:
+			shutil.copyfile(src=settings["templateFile"], dst=self.reportFilePath)
+
+		return None
+
+	def __readTableTemplate(self, settings:dict, workbook:Workbook|None=None) -> pd.DataFrame | None:
 		"""
 		Read the template Data 
 
 		settings:dict {	"path": "path of the template file",
 						"sheet": "Sheet name if excel file is used",
 						"type": "file type: csv, xls, xlsx"}
+		workbook:Workbook|None = Already opened template. Will be loaded from the template file if not given
 		returns an pandas dataFrame
 		"""
 
+		if workbook != None:
+			return self.__sheetToDataFrame(sheet=workbook[settings["sheet"]])
+
 		_template = None
 
 		try:
@@ -577,16 +1231,19 @@ class Spreadsheet:
 
 				elif settings["templateFile"].endswith(".xlsx") or settings["templateFile"].endswith(".xls"):
 
-					wb = load_workbook(filename = settings["templateFile"])
-					sheet_ranges = wb[settings["sheet"]]
-					_template = pd.DataFrame(sheet_ranges.values)
+					#Only the configured sheet is read. Styles and the other sheets are not loaded
+					wb = load_workbook(filename = settings["templateFile"], read_only=True)
+
+					try:
+						sheet_ranges = wb[settings["sheet"]]
 
-					#set column names equal to values in row index position 0
-					_template.columns = _template.iloc[0]
+						#Some files do not store the used range. It will be calculated from the cells
+						if (sheet_ranges.max_row == None) or (sheet_ranges.max_column == None):
+							sheet_ranges.calculate_dimension(force=True)
 
-					#remove first row from DataFrame
-					_template = _template[1:]
-					_template.reset_index(drop=True, inplace=True)
+						_template = self.__sheetToDataFrame(sheet=sheet_ranges)
+					finally:
+						wb.close()
 
 					#_template = pd.read_excel(io=settings["templateFile"], sheet_name=settings["sheet"])
 
@@ -597,14 +1254,38 @@ class Spreadsheet:
 		#Return the _template
 		return _template
 
-	def __createCalculatedCsv(self, excelFilePath:str, excelSheet:str, csvSeparator:str) -> bool:
+	def __sheetToDataFrame(self, sheet:Worksheet|ReadOnlyWorksheet) -> pd.DataFrame:
+		"""
+		Create a data frame from the values of a sheet. The first row is used as header
+
+		sheet:Worksheet|ReadOnlyWorksheet = Sheet to read
+		returns an pandas dataFrame
+		"""
+
+		_dataFrame = pd.DataFrame(sheet.values)
+
+		#set column names equal to values in row index position 0
+		_dataFrame.columns = _dataFrame.iloc[0]
+
+		#remove first row from DataFrame
+		_dataFrame = _dataFrame[1:]
+		_dataFrame.reset_index(drop=True, inplace=True)
+
+		return _dataFrame
+
+	def __createCalculatedCsv(self, excelFilePath:str, excelSheet:str, csvSeparator:str, formulaEngine:str="builtin", workbook:Workbook|None=None) -> bool:
 		"""
 		Create a csv file from a excel with possible calculations.
 		Will create a template excel file and 
+		The formulas are only calculated if the sheet contains any. Otherwise the values are written directly
 
 		Params
 		----
 		excelFilePath:str	= Filepath of the ExelFile
+		excelSheet:str		= Sheet to export
+		csvSeparator:str	= Separator of the csv file
+		formulaEngine:str	= "builtin" to calculate only the cells of the sheet with a fallback to the formulas package // "formulas" to always use the formulas package
+		workbook:Workbook	= Workbook of the saved excel file which is still in memory. Will be loaded from the file if not given
 
 
 		Return
@@ -619,18 +1300,37 @@ class Spreadsheet:
 
 
 		try:
-			#The variable spreadsheet provides the full path with filename to the excel spreadsheet with unevaluated formulae		
-			_fpath = os.path.basename(excelFilePath) 
-			_dirname = os.path.dirname(excelFilePath) + "/calculated" 
+			_startTime = time.perf_counter()
+			if workbook != None:
+				_wb = workbook
+			else:
+				_wb = load_workbook(filename = excelFilePath)
+
+			_sheetRanges = _wb[excelSheet]
+			_hasFormulas = self.__hasFormulas(sheet=_sheetRanges)
+			self.logger.debug(f"Loaded the excel file in {time.perf_counter() - _startTime:.3f} s. Formulas found: {_hasFormulas}")
+
+			_values = None
+			if _hasFormulas and (formulaEngine == "builtin"):
+
+				#Only calculate the cells needed for the sheet. Unsupported formulas will be calculated by the formulas package
+				try:
+					_startTime = time.perf_counter()
+					_values = FormulaEvaluator(workbook=_wb, logLevel=self.logger.level).evaluateSheet(sheet=excelSheet)
+					self.logger.debug(f"Calculated the formulas of the sheet in {time.perf_counter() - _startTime:.3f} s")
+
+				except UnsupportedFormulaError as err:
+					self.logger.debug(f"Formulas can not be calculated by the builtin engine. Fall back to the formulas package: {err}")
 
-			_excelModel = formulas.ExcelModel().loads(excelFilePath).finish()
-			_excelModel.calculate()
-			_excelModel.write( dirpath=(_dirname))
+			if _hasFormulas and (_values == None):
+				_values = self.__calculateWithFormulas(excelFilePath=excelFilePath, excelSheet=excelSheet)
 
-			#Use openpyxl to open the updated excel spreadsheet now
-			_wb = load_workbook(filename = _dirname + "/" + _fpath.upper(), data_only = True)
-			_sheetRanges = _wb[excelSheet.upper()]
-			_calculatedDataFrame = pd.DataFrame(_sheetRanges.values)
+			elif _values == None:
+				#Numbers are read like they are stored in the saved file
+				_values = [tuple(normalizeValue(_value) for _value in _row) for _row in _sheetRanges.values]
+
+			#Formatted but empty cells are not written
+			_calculatedDataFrame = pd.DataFrame(self.__trimValues(_values))
 
 			#set column names equal to values in row index position 0
 			_calculatedDataFrame.columns = _calculatedDataFrame.iloc[0]
@@ -640,110 +1340,239 @@ class Spreadsheet:
 			_calculatedDataFrame.reset_index(drop=True, inplace=True)
 
 			# Create the csv file 
+			_startTime = time.perf_counter()
 			_csvReportPath = excelFilePath.replace(_fileType, "csv")
 			_calculatedDataFrame.to_csv(path_or_buf=_csvReportPath, mode="w", index=False, header=True, sep=csvSeparator)
+			self.logger.debug(f"Wrote the csv file in {time.perf_counter() - _startTime:.3f} s")
 
 			# Write the file was successful
 			_fileWritten = True
 
-			# Clean up the temp file
-			os.remove(_dirname + "/" + _fpath.upper())
-
 
 		except:
 			self.logger.exception("Could not create csv file from Excel File: " + self.reportFilePath)
 
 		return _fileWritten
 
+	def __calculateWithFormulas(self, excelFilePath:str, excelSheet:str) -> list:
+		"""
+		Calculate the whole workbook with the formulas package
+
+		Params
+		------
+		excelFilePath:str	= Filepath of the excel file
+		excelSheet:str		= Sheet to return
+
+		Return
+		------
+		-> list = Rows of the calculated sheet
+		"""
+
+		#The variable spreadsheet provides the full path with filename to the excel spreadsheet with unevaluated formulae		
+		_fpath = os.path.basename(excelFilePath) 
+		_dirname = os.path.dirname(excelFilePath) + "/calculated" 
+
+		_startTime = time.perf_counter()
+		_excelModel = formulas.ExcelModel().loads(excelFilePath).finish()
+		_excelModel.calculate()
+		_excelModel.write( dirpath=(_dirname))
+		self.logger.debug(f"Calculated the formulas in {time.perf_counter() - _startTime:.3f} s")
+
+		#Use openpyxl to open the updated excel spreadsheet now
+		_startTime = time.perf_counter()
+		_wb = load_workbook(filename = _dirname + "/" + _fpath.upper(), data_only = True)
+		_values = list(_wb[excelSheet.upper()].values)
+		self.logger.debug(f"Loaded the calculated excel file in {time.perf_counter() - _startTime:.3f} s")
+
+		# Clean up the temp file
+		os.remove(_dirname + "/" + _fpath.upper())
+
+		return _values
+
+	def __trimValues(self, rows) -> list:
+		"""
+		Remove the empty trailing rows and columns like the formulas package does when it writes a calculated workbook.
+		Openpyxl also returns the cells which are only formatted
+
+		Params
+		------
+		rows		= Rows of a sheet like openpyxl Worksheet.values
+
+		Return
+		------
+		-> list		= Rows without the empty trailing rows and columns
+		"""
+
+		_rows = [tuple(_row) for _row in rows]
+
+		while (len(_rows) > 0) and all(_value == None for _value in _rows[-1]):
+			_rows.pop()
+
+		_columns = max([max([_index + 1 for _index, _value in enumerate(_row) if _value != None], default=0) for _row in _rows], default=0)
+
+		return [_row[:_columns] for _row in _rows]
+
+	def __hasFormulas(self, sheet) -> bool:
+		"""
+		Check if a sheet contains any formula
+
+		Params
+		------
+		sheet:Worksheet = Openpyxl worksheet loaded with the formulas (not data_only)
+
+		Return
+		------
+		-> bool = True if at least one cell contains a formula
+		"""
+
+		for _row in sheet.iter_rows():
+			for _cell in _row:
+				if _cell.data_type == "f":
+					return True
+
+		return False
+
 	def getLastReceivedValue(self, eliona:ElionaApiHandler, assetGai:str, assetId:int, attribute:str, startDateTime:datetime)->str:
 		"""
-		Will try to get the last received Value for the given asset and attribute.
-		=> try to get the timestamp of this year. If not available try to get the timestamp from last year.
-		If No value is available NO-Value will be returned
+		Will try to get the last received Value for the given asset and attribute before the start time.
+		=> Searches backwards in growing time windows (see LAST_VALUE_SEARCH_WINDOWS). Every window is only requested once.
+		If No value is available NO-VALUE will be returned
+
+		The values are memorized for all reports of the process. Repeated requests for the same asset, attribute and time stamp will not call eliona again.
+		Values of searches stopped by an error are not memorized.
 
 		Params
 		------
 		eliona:ElionaApiHandler
 		assetGai:str
-		assetId:str
-		config:dict
-		configRaw:dict
+		assetId:int
+		attribute:str
 		startDateTime:datetime
 
 		"""
 
-		_value = ""
-		_loopCounter = 12
-		_startTimestamp = startDateTime
-		
-		while True:
+		_memoKey = (self._connectionKey, assetGai, assetId, attribute, startDateTime)
 
-			_endTimestamp = startDateTime
-			if startDateTime.month > 1:
-				# We will set the day to the first of the Mont. 
-				# Otherwise maybe the month will not have the day of the next month
-				_startTimestamp = _startTimestamp.replace(month=(_startTimestamp.month-1), day=1)
-			else:
-				_startTimestamp = _startTimestamp.replace(year=(_startTimestamp.year-1), month=12, day=1)
+		_memorized = self.lastValueCache.get(key=_memoKey)
+		if _memorized != None:
+			return _memorized
 
-			if assetId == 0:
-				_assetId = eliona.get_asset_id(asset_gai=assetGai)
-			else:
-				_assetId = assetId
+		_value = "NO-VALUE"
+
+		if assetId == 0:
+			_assetId = self.__getAssetId(eliona=eliona, assetGai=assetGai)
+		else:
+			_assetId = assetId
+
+		_complete = True
+		_endTimestamp = startDateTime
+		for _window in LAST_VALUE_SEARCH_WINDOWS:
+
+			#The newer windows were already empty. Therefore only request the older part
+			_startTimestamp = startDateTime - _window
 
 			_data, _errorMsg = eliona.get_data_trends(  asset_id=_assetId,
 														from_date=_startTimestamp.isoformat(),
 														to_date=_endTimestamp.isoformat(),
 														data_subtype="input")
 
-
-			if _errorMsg == "":
-				_value = "NO-VALUE"
-				if len(_data)>0:
-					if _data[-1].get("asset_id", "") == _assetId:
-						_lastData = _data[-1].get("data", {})
-						_value = _lastData.get(attribute, None)
-						break
-			else:
-				_value = "NO-VALUE"
+			if _errorMsg != "":
 				_startDateStr = _startTimestamp.isoformat()
 				_endDateStr = _endTimestamp.isoformat()
 				self.logger.error(f"Tried to read the trend data from: {_startDateStr} to: {_endDateStr} with AssetGai {assetGai} Attribute: {attribute} Error Msg: {_errorMsg}")
+				_complete = False
 				break
 
-			if _loopCounter <= 0:
+			#Search for the newest entry with the requested attribute
+			_found = False
+			for _entry in reversed(_data or []):
+				if (_entry.get("asset_id", "") == _assetId) and (attribute in _entry.get("data", {})):
+					_value = _entry["data"][attribute]
+					_found = True
+					break
+
+			if _found:
 				break
-			else:
-				_loopCounter = _loopCounter - 1
+
+			_endTimestamp = _startTimestamp
+
+		#A failed request may succeed for the next report
+		if _complete:
+			self.lastValueCache.set(key=_memoKey, value=_value)
 
 		return _value
 
 	def __findJson(self, text:str):
 		"""
-		Find JSON objects in text, and yield the decoded JSON data
+		Find JSON objects in text, and yield the decoded JSON data with its position in the text
 
 		Does not attempt to look for JSON arrays, text, or other JSON types outside
 		of a parent JSON object.
 
 		Params
 		----
+		text:str = Text to search
 
-
+		Return
+		------
+		-> yields (result, start, end) of every JSON object found. text[start:end] is the raw JSON object
 		"""
-		decoder=JSONDecoder()
 		pos = 0
 		while True:
 			match = text.find('{', pos)
 			if match == -1:
 				break
 			try:
-				result, index = decoder.raw_decode(text[match:])
-				resultRaw = text[match:(match + index)]
-				yield result, resultRaw
-				pos = match + index
+				result, end = JSON_DECODER.raw_decode(text, match)
+				yield result, match, end
+				pos = end
 			except ValueError:
 				pos = match + 1
 
+	def __getAssetId(self, eliona:ElionaApiHandler, assetGai:str) -> int:
+		"""
+		Get the asset ID of an asset GAI. Will use the asset ID cache if available
+
+		Params
+		------
+		eliona:ElionaApiHandler	= eliona API Handler instance
+		assetGai:str = Asset GAI to resolve
+
+		Return
+		------
+		-> int = Asset ID of the GAI
+		"""
+
+		if self.assetIdCache != None:
+			return self.assetIdCache.get(eliona=eliona, assetGai=assetGai)
+		else:
+			return eliona.get_asset_id(asset_gai=assetGai)
+
+	def __dataEntryRequestKey(self, config:dict) -> tuple[int, str, str, str]:
+		"""
+		Get the key of the data request for a data entry configuration
+
+		Params
+		------
+		config:dict = Json configuration of the cell
+
+		Return
+		------
+		-> (assetId:int, assetGai:str, attribute:str, raster:str)
+		"""
+
+		if "assetId" in config: 
+			_assetId = int(config["assetId"])
+		else:
+			_assetId = 0
+
+		if "assetGai" in config:
+			_assetGai = config["assetGai"]
+		else:
+			_assetGai = ""
+
+		return (_assetId, _assetGai, str(config["attribute"]), config["raster"])
+
 	def __isFloat(self, num:str) -> bool:
 		"""
 		Check if a string is a float or not
@@ -762,4 +1591,88 @@ class Spreadsheet:
 			float(num)
 			return True
 		except ValueError:
-			return False
\ No newline at end of file
+			return False
+
+
+_renderCaches = {}
+"""
+Caches and connections of a render process. Created with the first job and kept for all following jobs of the process
+"""
+
+def createRenderJob(startDt:datetime, endDt:datetime, connectionSettings:dict, reportSettings:dict, logLevel:int, dataCache:DataCache|None=None, assetIdCache:AssetIdCache|None=None) -> dict:
+	"""
+	Describe the creation of a report as picklable job for a render process
+
+	Params
+	------ 
+	startDt:datetime			= Start time of the Report
+	endDt:datetime 				= End Time of the Report
+	connectionSettings:dict 	= Connection settings for the eliona handler {"host", "api", "projectId", "apiKey", "dbTimeZone"}
+	reportSettings:dict			= Settings for the to configured report
+	logLevel:int				= Log level of the render process
+	dataCache:DataCache			= Data cache to be opened by the render process. No caching if None
+	assetIdCache:AssetIdCache	= Asset ID cache of the scheduler. The render process clears its caches when the scheduler cleared this one
+
+	Return
+	------
+	-> dict = Job description for renderReport
+	"""
+
+	_dataCache = None
+	if dataCache != None:
+		_dataCache = {	"path": dataCache.path,
+						"config": {	"enabled": dataCache.enabled,
+									"openPeriodTtl": dataCache.openPeriodTtl,
+									"closedPeriodGrace": dataCache.closedPeriodGrace,
+									"maxSizeMb": dataCache.maxSize / (1024 * 1024)}}
+
+	return {"startDt": startDt,
+			"endDt": endDt,
+			"connectionSettings": dict(connectionSettings),
+			"reportSettings": dict(reportSettings),
+			"logLevel": logLevel,
+			"dataCache": _dataCache,
+			"cacheGeneration": assetIdCache.generation if assetIdCache != None else 0}
+
+def renderReport(job:dict) -> bool:
+	"""
+	Create a report from a job description. Entry point of the render processes
+
+	Params
+	------ 
+	job:dict	= Job description created by createRenderJob
+
+	Return
+	----
+	bool -> Will return True if report was successfully created. // False if a error occurred
+	"""
+
+	#Open the caches of the process once
+	if "connectionManager" not in _renderCaches:
+		_renderCaches["connectionManager"] = ConnectionManager(logLevel=job["logLevel"])
+
+	#The settings changed since the caches were created. Assets and templates are resolved again
+	if _renderCaches.get("cacheGeneration", None) != job["cacheGeneration"]:
+		_renderCaches["assetIdCache"] = AssetIdCache(logLevel=job["logLevel"])
+		_renderCaches["templateCache"] = TemplateCache(logLevel=job["logLevel"])
+		_renderCaches["cacheGeneration"] = job["cacheGeneration"]
+
+	_dataCache = None
+	if job["dataCache"] != None:
+		_path = job["dataCache"]["path"]
+		if _renderCaches.get("dataCachePath", None) != _path:
+			_renderCaches["dataCache"] = DataCache(path=_path, logLevel=job["logLevel"])
+			_renderCaches["dataCachePath"] = _path
+		_dataCache = _renderCaches["dataCache"]
+		_dataCache.configure(config=job["dataCache"]["config"])
+
+	#The connection is checked once per job
+	_renderCaches["connectionManager"].newCycle()
+
+	_reporter = Spreadsheet(logLevel=job["logLevel"], 
+							dataCache=_dataCache, 
+							assetIdCache=_renderCaches["assetIdCache"], 
+							templateCache=_renderCaches["templateCache"], 
+							connectionManager=_renderCaches["connectionManager"])
+
+	return _reporter.createReport(startDt=job["startDt"], endDt=job["endDt"], connectionSettings=job["connectionSettings"], reportSettings=job["reportSettings"])
@@ -3,18 +3,38 @@ import os
 import traceback
 import sys
 import json
+import hashlib
 import time
+import heapq
+import multiprocessing
 from typing import Tuple
 import jsonschema
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future
 from enums import ReportState
-from reporting import User, Report
+from reporting import BasicReport, User, Report
+from cache import DataCache, AssetIdCache, TemplateCache, ArtifactStore
+from connection import ConnectionManager
+from mail import MailTracker
+from spreadsheet import Spreadsheet
 import utils.logger as log
 
 
 
 LOGGER_NAME = "Scheduler"
 SLEEP_TILL_NEXT_REQUEST = 3600
+DEFAULT_SCHEDULER_WORKERS = 1
+DEFAULT_RENDER_PROCESSES = 0
+
+SETTINGS_POLL_INTERVAL = 5
+"""
+Interval in seconds to check the settings file for changes while waiting for the next report
+"""
+
+BUSY_RECHECK_INTERVAL = 60
+"""
+Interval in seconds to check the reports again which are still creating or sending
+"""
 
 
 DEFAULT_SETTINGS_PATH = "./storage/config/config.json"
@@ -23,36 +43,113 @@ DEFAULT_OUTPUT_PATH = "./storage/debug/"
 class Spreadsheet_report_app:
 
 	SETTINGS_SCHEME	= {
-			"eliona_handler": {
-				"host": {"type": "string"},
-				"api": {"type": "string"},
-				"projectId": {"type": "number"},
-				"apiKey": {"type": "string"}
-			},
-
-			"reports": [
-				{
-					"name": {"type": "string"},
-					"schedule": {"type": "string"},
-					"type": {"type": "string"},
-					"templateFile": {"type": "string"},
-					"sheet": {"type": "string"},
-					"separator":{"type": "string"},
-					"firstRow": {"type": "string"},
-					"fromTemplate": {"type": "boolean"},
-					"reportPath": {"type": "string"},
-					"receiver": [
-						{
+			"$schema": "http://json-schema.org/draft-07/schema#",
+			"type": "object",
+			"required": ["eliona_handler"],
+			"properties": {
+				"eliona_handler": {
+					"type": "object",
+					"properties": {
+						"host": {"type": "string"},
+						"api": {"type": "string"},
+						"projectId": {"type": ["integer", "string"]},
+						"apiKey": {"type": "string"},
+						"dbTimeZone": {"type": ["string", "integer", "null"]},
+						"sslVerify": {"type": "boolean"},
+						"maxWorkers": {"type": "integer", "minimum": 1}
+					}
+				},
+				"cache": {
+					"type": "object",
+					"properties": {
+						"enabled": {"type": "boolean"},
+						"openPeriodTtl": {"type": "number", "minimum": 0},
+						"closedPeriodGrace": {"type": "number", "minimum": 0},
+						"maxSizeMb": {"type": "number", "minimum": 0}
+					}
+				},
+				"scheduler": {
+					"type": "object",
+					"properties": {
+						"workers": {"type": "integer", "minimum": 1},
+						"renderProcesses": {"type": "integer", "minimum": 0}
+					}
+				},
+				"reports": {
+					"type": "array",
+					"items": {
+						"allOf": [{"$ref": "#/definitions/report"}],
+						"required": ["receiver"]
+					}
+				},
+				"reportConfig": {
+					"type": "array",
+					"items": {"$ref": "#/definitions/report"}
+				},
+				"users": {
+					"type": "array",
+					"items": {
+						"type": "object",
+						"required": ["name", "msgEndpoint", "reports"],
+						"properties": {
 							"name": {"type": "string"},
 							"msgType": {"type": "string"},
-							"msgEndpoint": {"type": "string"}
+							"msgEndpoint": {"type": "string"},
+							"reports": {"type": "array", "items": {"type": "string"}}
 						}
-            		]
+					}
 				}
-			]
+			},
+			"definitions": {
+				"report": {
+					"type": "object",
+					"required": ["name", "schedule", "type", "templateFile", "reportPath"],
+					"properties": {
+						"name": {"type": "string"},
+						"schedule": {"type": "string"},
+						"type": {"enum": ["DataListSequential", "DataListParallel", "DataEntry"]},
+						"templateFile": {"type": "string"},
+						"mimeType": {"type": "string"},
+						"fileType": {"type": "string"},
+						"sheet": {"type": "string"},
+						"separator": {"type": "string"},
+						"firstRow": {"type": ["string", "integer"]},
+						"fromTemplate": {"type": "boolean"},
+						"reportPath": {"type": "string"},
+						"tempPath": {"type": "string"},
+						"fillNone": {"type": "boolean"},
+						"maxWorkers": {"type": "integer", "minimum": 1},
+						"streaming": {"type": "boolean"},
+						"createCsv": {"type": "boolean"},
+						"formulaEngine": {"enum": ["builtin", "formulas"]},
+						"receiver": {
+							"type": "array",
+							"items": {
+								"type": "object",
+								"required": ["msgEndpoint"],
+								"properties": {
+									"name": {"type": "string"},
+									"msgType": {"type": "string"},
+									"msgEndpoint": {"type": "string"}
+								}
+							}
+						}
+					}
+				}
+			}
 		}
 	"""
-	Scheme definition of the application settings
+	JSON schema of the application settings
+	"""
+
+	SETTINGS_VALIDATOR = jsonschema.validators.validator_for(SETTINGS_SCHEME)(SETTINGS_SCHEME)
+	"""
+	Validator of the application settings. Built once for all settings reads
+	"""
+
+	SETTINGS_ENTRIES = ("reports", "reportConfig", "users")
+	"""
+	Settings lists whose invalid entries are skipped instead of the whole settings
 	"""
 
 	PERSISTENT_STORAGE_SCHEME = {
@@ -74,6 +171,56 @@ class Spreadsheet_report_app:
 	timeIndex = 0
 	users:dict[str, User] = {}
 	reports:dict[str, Report] = {}
+	dataCache:DataCache = None
+	assetIdCache:AssetIdCache = None
+	templateCache:TemplateCache = None
+	connectionManager:ConnectionManager = None
+	mailTracker:MailTracker = None
+	artifactStore:ArtifactStore = None
+
+	workers = DEFAULT_SCHEDULER_WORKERS
+	"""
+	Number of reports and users processed at the same time. The reports are processed one after another if 1
+	"""
+
+	executor:ThreadPoolExecutor = None
+	"""
+	Worker pool of the scheduler. Only used for more than one worker
+	"""
+
+	jobs:dict[str, Future] = {}
+	"""
+	Running and queued jobs of the worker pool by report or user
+	"""
+
+	renderProcesses = DEFAULT_RENDER_PROCESSES
+	"""
+	Number of processes to create the reports in. The reports are created in the threads of the reports if 0
+	"""
+
+	renderPool:ProcessPoolExecutor = None
+	"""
+	Process pool to create the reports in. Shared by all reports and users
+	"""
+
+	dueTimes:list[tuple[datetime, str]] = []
+	"""
+	Priority queue of the next due time by report or user
+	"""
+
+	settingsAreValid = False
+	"""
+	True if the last read settings are valid
+	"""
+
+	pendingConfigurations:set[str] = set()
+	"""
+	Keys of the reports and users to be configured. Added or changed by the last settings changes
+	"""
+
+	_settingsSignature = None
+	_settingsHash = None
+	_validSettings = {}
 
 	def __init__(self, settingsPath:str, storagePath:str, testingEnable:bool, loggingLevel:str) -> None:
 		"""
@@ -103,6 +250,20 @@ class Spreadsheet_report_app:
 		#Initially delete the temp files after start up. 
 		self._deleteOldTempFiles(path=self.sendTmpPath, force=True)
 
+		#Local cache of the aggregated data
+		self.dataCache = DataCache(path=storagePath + "cache/aggregated.sqlite", logLevel=self.loggerLevel)
+		self.assetIdCache = AssetIdCache(logLevel=self.loggerLevel)
+		self.templateCache = TemplateCache(logLevel=self.loggerLevel)
+
+		#Created reports shared by all reports and users. Cleaned up with the temp files
+		self.artifactStore = ArtifactStore(path=self.sendTmpPath + "artifacts/", logLevel=self.loggerLevel)
+
+		#Eliona connections shared by all reports and mails
+		self.connectionManager = ConnectionManager(logLevel=self.loggerLevel)
+
+		#Confirm the mail delivery in the background
+		self.mailTracker = MailTracker(logLevel=self.loggerLevel, connectionManager=self.connectionManager)
+
 		self.testing = testingEnable
 		if self.testing:
 		
@@ -133,93 +294,424 @@ class Spreadsheet_report_app:
 
 		self.logger.info("--------run--------")
 
+		#All reports and users are checked in the first cycle
+		_dueKeys = None
+
 		#Loop constantly through the settings
 		while True:
 
 			#Reset temp variables
 			_storeNewData = False
 
-			#Read the Settings file and validate it
-			self.logger.info("--------read the settings--------")
-			self.settings, _settingsAreValid = self._readSettings(self.settingsPath, self.SETTINGS_SCHEME)
+			#Read the Settings file and validate it. Only if the file changed
+			_settingsChanged = self._reloadSettings()
 
 			#If Settings are valid we will read them and perform the actions
-			if _settingsAreValid:
+			if self.settingsAreValid:
+
+				#Check the eliona connections once per cycle
+				self.connectionManager.newCycle()
+
+				if _settingsChanged:
+					self._applySettings()
 
 				#Check if the report based reports are available
 				if "reports" in self.settings:
 
-					#Get through all the reports
+					#Get through all the due reports
 					for _report in self.settings["reports"]:
-						
-						_reportName = _report["name"]
 
-						if not(_reportName in self.reports):
-							#Create the report object if not already created
-							self.reports[_reportName] = Report(name=_reportName, tempFilePath=self.sendTmpPath, logLevel=self.loggerLevel, testing=self.testing)
+						if (_dueKeys == None) or (("report:" + _report["name"]) in _dueKeys):
+							self._processReport(report=_report)
+
+				#Check if user based reports are available
+				if "users" in self.settings:
+
+					#Get through all the due users
+					for _user in self.settings["users"]:
 
-						_reportObj = self.reports[_reportName]
+						if (_dueKeys == None) or (("user:" + _user["name"]) in _dueKeys):
+							self._processUser(user=_user)
 
-						self.logger.debug(f"State of report {_reportName} : {self.reports[_reportName].state}")
+				self._queueDueTimes()
 
-						#Only update the configuration if we are in idle
-						if self.reports[_reportName].state == ReportState.IDLE:
-							
-							self.reports[_reportName].configure(elionaConfig=self.settings["eliona_handler"], reportConfig=_report)
+			else:
 
-							_now = self._now()
-							self.logger.debug(f"current Timestamp: {_now}")
-							_reportWasSend = self.reports[_reportName].wasReportSend(_now)
-							
-							self.logger.debug(f"Report {_reportName} was already send : {_reportWasSend}")
-							if not _reportWasSend:
-								self.reports[_reportName].sendReport(year=_now.year, month=_now.month, sendAsync=False)
+				self.logger.error("Skipped the Create report process due to errors in the settings")
 
+			#Check for files to delete
+			self._deleteOldTempFiles(path=self.sendTmpPath)
+			self.artifactStore.cleanUp()
 
-				#Check if user based reports are available
-				if "users" in self.settings:
+			self.dataCache.logStatistics()
+			self.templateCache.logStatistics()
 
-					#Get through all the users
-					for _user in self.settings["users"]:
+			_dueKeys = self._waitTillDue()
+
+	def _applySettings(self) -> None:
+		"""
+		Apply the changed settings to the caches and the scheduler shared by all reports and users
+		"""
+
+		self.dataCache.configure(config=self.settings.get("cache", {}))
+		self._configureScheduler(config=self.settings.get("scheduler", {}))
+
+		#Resolve the asset GAIs of all templates again. Assets may be renamed or created again with another id
+		self.assetIdCache.clear()
+		_reporter = Spreadsheet(logLevel=self.loggerLevel, assetIdCache=self.assetIdCache, templateCache=self.templateCache, connectionManager=self.connectionManager)
+		_reporter.prefillAssetIds(connectionSettings=self.settings["eliona_handler"], reportSettings=self.settings.get("reports", []) + self.settings.get("reportConfig", []))
+
+	def _processReport(self, report:dict) -> None:
+		"""
+		Configure a report based report and send it if due
+
+		Params
+		-----
+		report:dict		= Settings of the report
+		"""
+
+		_reportName = report["name"]
+
+		if not(_reportName in self.reports):
+			#Create the report object if not already created
+			self.reports[_reportName] = Report(name=_reportName, tempFilePath=self.sendTmpPath, logLevel=self.loggerLevel, testing=self.testing, dataCache=self.dataCache, assetIdCache=self.assetIdCache, templateCache=self.templateCache, connectionManager=self.connectionManager, mailTracker=self.mailTracker, renderPool=self.renderPool, artifactStore=self.artifactStore)
+
+		self.logger.debug(f"State of report {_reportName} : {self.reports[_reportName].state}")
+
+		self.reports[_reportName].resumeCanceled()
+
+		#Only update the configuration if we are in idle and the configuration changed
+		if self.reports[_reportName].state == ReportState.IDLE:
+			
+			if ("report:" + _reportName) in self.pendingConfigurations:
+				self.reports[_reportName].configure(elionaConfig=self.settings["eliona_handler"], reportConfig=report)
+				self.pendingConfigurations.discard("report:" + _reportName)
+
+			_now = self._now()
+			self.logger.debug(f"current Timestamp: {_now}")
+			_reportWasSend = self.reports[_reportName].wasReportSend(_now)
+			
+			self.logger.debug(f"Report {_reportName} was already send : {_reportWasSend}")
+			if not _reportWasSend:
+				self._schedule(key="report:" + _reportName, sender=self.reports[_reportName], now=_now)
+
+	def _processUser(self, user:dict) -> None:
+		"""
+		Configure a user based report and send it if due
+
+		Params
+		-----
+		user:dict		= Settings of the user
+		"""
 
-						_userName = _user["name"]
+		_userName = user["name"]
 
-						if not(_userName in self.users):
-							#Create the report object if not already created
-							self.users[_userName] = User(name=_userName, tempFilePath=self.sendTmpPath, logLevel=self.loggerLevel, testing=self.testing)
+		if not(_userName in self.users):
+			#Create the report object if not already created
+			self.users[_userName] = User(name=_userName, tempFilePath=self.sendTmpPath, logLevel=self.loggerLevel, testing=self.testing, dataCache=self.dataCache, assetIdCache=self.assetIdCache, templateCache=self.templateCache, connectionManager=self.connectionManager, mailTracker=self.mailTracker, renderPool=self.renderPool, artifactStore=self.artifactStore)
 
-						_userObj = self.users[_userName]
+		_userObj = self.users[_userName]
+		_userObj.resumeCanceled()
+
+		#Only update the configuration if we are in idle and the configuration changed
+		if _userObj.state == ReportState.IDLE:
+
+			if ("user:" + _userName) in self.pendingConfigurations:
+				_userObj.configure(elionaConfig=self.settings["eliona_handler"], userConfig=user, reportConfig=self.settings["reportConfig"])
+				self.pendingConfigurations.discard("user:" + _userName)
+
+			_now = self._now()
+			_reportWasSend = _userObj.wasReportSend(_now)
+			
+			self.logger.debug(f"Reports  for user: {_userName} was already send : {_reportWasSend}")
+			if not _reportWasSend:
+				self._schedule(key="user:" + _userName, sender=_userObj, now=_now)
+
+	def _queueDueTimes(self) -> None:
+		"""
+		Queue the next due time of every configured report and user.
+		Reports and users still creating or sending are checked again after a short time. Canceled ones are queued at the start of the next period
+		"""
 
-						#Only update the configuration if we are in idle					
-						if _userObj.state == ReportState.IDLE:
+		#The due times are in the time zones of the calendars
+		_now = datetime.now(tz=timezone.utc)
+		_senders = [("report:" + _report["name"], self.reports.get(_report["name"], None)) for _report in self.settings.get("reports", [])]
+		_senders += [("user:" + _user["name"], self.users.get(_user["name"], None)) for _user in self.settings.get("users", [])]
 
-							_userObj.configure(elionaConfig=self.settings["eliona_handler"], userConfig=_user, reportConfig=self.settings["reportConfig"])
+		self.dueTimes = []
+		for _key, _sender in _senders:
 
-							_now = self._now()
-							_reportWasSend = _userObj.wasReportSend(_now)
-							
-							self.logger.debug(f"Reports  for user: {_userName} was already send : {_reportWasSend}")
-							if not _reportWasSend:
-								_userObj.sendReport(year=_now.year, month=_now.month, sendAsync=False)
+			if _sender == None:
+				continue
 
+			if _sender.state in (ReportState.IDLE, ReportState.CANCELED):
+				_dueTime = max(_sender.nextDueTime(), _now)
+			elif _sender.state in (ReportState.CREATING, ReportState.SENDING):
+				_dueTime = _now + timedelta(seconds=BUSY_RECHECK_INTERVAL)
 			else:
+				continue
 
-				self.logger.error("Skipped the Create report process due to errors in the settings")
+			self.dueTimes.append((_dueTime, _key))
 
-			#Check for files to delete
-			self._deleteOldTempFiles(path=self.sendTmpPath)
+		heapq.heapify(self.dueTimes)
 
+		if len(self.dueTimes) > 0:
+			self.logger.info(f"Next report is due at {self.dueTimes[0][0]}: {self.dueTimes[0][1]}")
 
+	def _waitTillDue(self) -> set | None:
+		"""
+		Sleep till the next report or user is due. Wakes up early if the settings file changed
+
+		Return
+		-----
+		-> set | None = Keys of the due reports and users. None if all have to be checked
+		"""
+
+		#The test time table is processed tick by tick
+		if self.testing:
 			self.logger.debug(f"Sleep for {SLEEP_TILL_NEXT_REQUEST} seconds")
 			time.sleep(SLEEP_TILL_NEXT_REQUEST)
+			return None
+
+		#Check all reports at least once per period to run the house keeping
+		_deadline = time.monotonic() + SLEEP_TILL_NEXT_REQUEST
 
-	def _readSettings(self, settingsPath : str, settingsScheme:dict) -> Tuple[dict, bool]:
+		while True:
+
+			_now = datetime.now(tz=timezone.utc)
+			_dueKeys = set()
+
+			while (len(self.dueTimes) > 0) and (self.dueTimes[0][0] <= _now):
+				_dueKeys.add(heapq.heappop(self.dueTimes)[1])
+
+			if len(_dueKeys) > 0:
+				self.logger.debug(f"Due: {_dueKeys}")
+				return _dueKeys
+
+			if self._readSettingsSignature() != self._settingsSignature:
+				self.logger.info("Settings changed")
+				return None
+
+			_timeout = _deadline - time.monotonic()
+			if _timeout <= 0:
+				return None
+
+			if len(self.dueTimes) > 0:
+				_timeout = min(_timeout, (self.dueTimes[0][0] - _now).total_seconds())
+
+			time.sleep(max(min(_timeout, SETTINGS_POLL_INTERVAL), 0))
+
+	def _reloadSettings(self) -> bool:
+		"""
+		Read and validate the settings if the settings file changed since the last read.
+		The reports and users affected by the change will be configured again
+
+		Return
+		-----
+		-> bool = True if the settings changed
+		"""
+
+		_signature = self._readSettingsSignature()
+		if (_signature != None) and (_signature == self._settingsSignature):
+			return False
+
+		self._settingsSignature = _signature
+
+		#Only the modification time changed
+		try:
+			with open(self.settingsPath, "rb") as settingsFile:
+				_hash = hashlib.sha256(settingsFile.read()).hexdigest()
+		except OSError:
+			_hash = None
+
+		if (_hash != None) and (_hash == self._settingsHash):
+			return False
+
+		self._settingsHash = _hash
+
+		self.logger.info("--------read the settings--------")
+		self.settings, self.settingsAreValid = self._readSettings(self.settingsPath, self.SETTINGS_VALIDATOR)
+
+		if self.settingsAreValid:
+
+			#Compare with the last valid settings. Invalid settings are never applied
+			_changedKeys = self._diffSettings(lastSettings=self._validSettings, settings=self.settings)
+			self._validSettings = self.settings
+			self.logger.info(f"Changed reports and users: {sorted(_changedKeys)}")
+
+			#Remove the objects of removed reports and users. Running jobs are finished
+			for _key in _changedKeys:
+				_type, _name = _key.split(":", 1)
+				_configs = self.settings.get("reports" if _type == "report" else "users", [])
+				if _name not in [_config["name"] for _config in _configs]:
+					(self.reports if _type == "report" else self.users).pop(_name, None)
+					self.pendingConfigurations.discard(_key)
+				else:
+					self.pendingConfigurations.add(_key)
+
+		return True
+
+	def _diffSettings(self, lastSettings:dict, settings:dict) -> set[str]:
+		"""
+		Compare the settings with the last settings
+
+		Params
+		-----
+		lastSettings:dict	= Last valid settings
+		settings:dict		= New settings
+
+		Return
+		-----
+		-> set[str]			= Keys of the added, removed and changed reports and users. For example "report:Report 1" or "user:User 1"
+		"""
+
+		#The connection is used by every report and user
+		_allChanged = lastSettings.get("eliona_handler", None) != settings.get("eliona_handler", None)
+
+		def byName(configs:list) -> dict:
+			return {_config["name"]: _config for _config in configs}
+
+		def changedNames(lastConfigs:dict, configs:dict) -> set[str]:
+			return {_name for _name in set(lastConfigs) | set(configs) if _allChanged or (lastConfigs.get(_name, None) != configs.get(_name, None))}
+
+		_changedKeys = {"report:" + _name for _name in changedNames(byName(lastSettings.get("reports", [])), byName(settings.get("reports", [])))}
+
+		#Users are changed by their own settings or the settings of their reports
+		_changedReportConfigs = changedNames(byName(lastSettings.get("reportConfig", [])), byName(settings.get("reportConfig", [])))
+		_lastUsers = byName(lastSettings.get("users", []))
+		_users = byName(settings.get("users", []))
+
+		for _name in changedNames(_lastUsers, _users):
+			_changedKeys.add("user:" + _name)
+
+		for _name, _user in _users.items():
+			if len(_changedReportConfigs.intersection(_user.get("reports", []))) > 0:
+				_changedKeys.add("user:" + _name)
+
+		return _changedKeys
+
+	def _readSettingsSignature(self) -> tuple | None:
+		"""
+		Return
+		-----
+		-> tuple | None = Modification time and size of the settings file. None if not available
+		"""
+
+		try:
+			_stat = os.stat(self.settingsPath)
+			return (_stat.st_mtime_ns, _stat.st_size)
+		except OSError:
+			return None
+
+	def _configureScheduler(self, config:dict) -> None:
+		"""
+		Configure the worker pool and the render processes of the scheduler
+
+		Params
+		-----
+		config:dict	= Scheduler settings {"workers", "renderProcesses"}
+		"""
+
+		_workers = max(int(config.get("workers", DEFAULT_SCHEDULER_WORKERS)), 1)
+		_changed = (_workers != self.workers) or ((self.executor == None) and (_workers > 1))
+
+		#Queued jobs of the old pool are canceled and running ones are finished. The running ones still need the render processes
+		if _changed and (self.executor != None):
+			self.executor.shutdown(wait=True, cancel_futures=True)
+			self.executor = None
+			self._resetCanceledJobs()
+
+		self._configureRenderPool(processes=max(int(config.get("renderProcesses", DEFAULT_RENDER_PROCESSES)), 0))
+
+		if not _changed:
+			return
+
+		self.workers = _workers
+		if self.workers > 1:
+			self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="Report")
+
+		self.logger.info(f"Process {self.workers} reports at the same time")
+
+	def _configureRenderPool(self, processes:int) -> None:
+		"""
+		Create the process pool to create the reports in and hand it to all reports and users
+
+		Params
+		-----
+		processes:int	= Number of render processes. No process pool if 0
+		"""
+
+		if processes == self.renderProcesses:
+			return
+
+		_oldPool = self.renderPool
+		self.renderPool = None
+
+		self.renderProcesses = processes
+		if self.renderProcesses > 0:
+			#Spawn the processes. Forking would copy the locks and connections of the running threads
+			self.renderPool = ProcessPoolExecutor(max_workers=self.renderProcesses, mp_context=multiprocessing.get_context("spawn"))
+
+		for _sender in list(self.reports.values()) + list(self.users.values()):
+			_sender.renderPool = self.renderPool
+
+		#The queued jobs of the old pool are awaited by running reports and users. They are finished before the pool is closed
+		if _oldPool != None:
+			_oldPool.shutdown(wait=True)
+
+		self.logger.info(f"Create the reports in {self.renderProcesses} processes")
+
+	def _resetCanceledJobs(self) -> None:
+		"""
+		Forget the jobs of a closed worker pool. The reports and users of canceled jobs are idle again and scheduled with the next cycle
+		"""
+
+		for _key, _job in self.jobs.items():
+
+			if not _job.cancelled():
+				continue
+
+			_type, _name = _key.split(":", 1)
+			_sender = (self.reports if _type == "report" else self.users).get(_name, None)
+
+			if _sender != None:
+				self.logger.info(f"Canceled the queued job {_key}. Will be scheduled again")
+				_sender.state = ReportState.IDLE
+
+		self.jobs = {}
+
+	def _schedule(self, key:str, sender:BasicReport, now:datetime) -> None:
+		"""
+		Create and send the reports of a report or user. Will be queued to the worker pool if more than one worker is configured
+
+		Params
+		-----
+		key:str				= Unique key of the report or user
+		sender:BasicReport	= Report or user object to process
+		now:datetime		= Current time stamp
+		"""
+
+		if self.executor == None:
+			sender.sendReport(year=now.year, month=now.month, day=now.day, sendAsync=False)
+			return
+
+		_job = self.jobs.get(key, None)
+		if (_job != None) and not _job.done():
+			self.logger.debug(f"Job {key} is still queued or running")
+			return
+
+		#Leave the idle state before the job is queued. The report won't be configured or scheduled again till done
+		sender.state = ReportState.CREATING
+		self.jobs[key] = self.executor.submit(sender.sendReport, year=now.year, month=now.month, day=now.day, sendAsync=False)
+
+	def _readSettings(self, settingsPath : str, settingsValidator:jsonschema.protocols.Validator) -> Tuple[dict, bool]:
 		"""
 		# read the settings and store them in the class variables
 
-		This method will read a json file to an dictionary
+		This method will read a json file to an dictionary. Invalid reports and users are removed from the settings
 
 		- settingsPath : str = Settings source path as string
+		- settingsValidator : jsonschema.protocols.Validator = Validator of the settings
 		"""
 
 		settingsJson = {}
@@ -228,52 +720,66 @@ class Spreadsheet_report_app:
 		if os.path.isfile(settingsPath):
 
 			#Read the configuration file 
-			with open(settingsPath, "r") as settingsFile:
-				settingsJson = json.load(settingsFile)
-
+			try:
+				with open(settingsPath, "r") as settingsFile:
+					settingsJson = json.load(settingsFile)
+			except json.JSONDecodeError as err:
+				self.logger.error(f"File: {settingsPath} is no valid json: {err}")
+				return {}, False
 
 			#Get the environments variables if the values are not available or empty
-			settingsJson["eliona_handler"]["host"] = settingsJson["eliona_handler"].get("host", os.environ.get("HOST_DOMAIN")) 
-			settingsJson["eliona_handler"]["api"] = settingsJson["eliona_handler"].get("api", os.environ.get("API_ENDPOINT"))
-			settingsJson["eliona_handler"]["apiKey"] = settingsJson["eliona_handler"].get("apiKey", os.environ.get("API_TOKEN"))
-			settingsJson["eliona_handler"]["dbTimeZone"] = settingsJson["eliona_handler"].get("dbTimeZone", os.environ.get("TZ"))
-			settingsJson["eliona_handler"]["sslVerify"] = settingsJson["eliona_handler"].get("sslVerify", json.loads(os.environ.get("SSL_VERIFY", "false").lower()))	#Take the way with json to convert the data to boolean
+			if isinstance(settingsJson, dict) and isinstance(settingsJson.get("eliona_handler", None), dict):
+				settingsJson["eliona_handler"]["host"] = settingsJson["eliona_handler"].get("host", os.environ.get("HOST_DOMAIN")) 
+				settingsJson["eliona_handler"]["api"] = settingsJson["eliona_handler"].get("api", os.environ.get("API_ENDPOINT"))
+				settingsJson["eliona_handler"]["apiKey"] = settingsJson["eliona_handler"].get("apiKey", os.environ.get("API_TOKEN"))
+				settingsJson["eliona_handler"]["dbTimeZone"] = settingsJson["eliona_handler"].get("dbTimeZone", os.environ.get("TZ"))
+				settingsJson["eliona_handler"]["sslVerify"] = settingsJson["eliona_handler"].get("sslVerify", json.loads(os.environ.get("SSL_VERIFY", "false").lower()))	#Take the way with json to convert the data to boolean
 
 			#Check if validate
-			_settingIsValid = self._validateJson(settingsFile, settingsScheme)
+			_errors = self._validateJson(settingsJson, settingsValidator)
+
+			#Skip the invalid reports and users. Other errors invalidate the whole settings
+			_invalidEntries = {}
+			_settingIsValid = True
+
+			for _error in _errors:
+
+				_path = list(_error.absolute_path)
+				self.logger.error(f"File: {settingsPath} invalid setting at /{'/'.join([str(_part) for _part in _path])}: {_error.message}")
+
+				if (len(_path) >= 2) and (_path[0] in self.SETTINGS_ENTRIES) and isinstance(_path[1], int):
+					_invalidEntries.setdefault(_path[0], set()).add(_path[1])
+				else:
+					_settingIsValid = False
 
 			if _settingIsValid:
+
+				for _entries, _indexes in _invalidEntries.items():
+					self.logger.warning(f"Skipped {len(_indexes)} invalid entries of {_entries}")
+					settingsJson[_entries] = [_entry for _index, _entry in enumerate(settingsJson[_entries]) if _index not in _indexes]
+
 				self.logger.debug(f"File: {settingsPath} read data's are valid.")			
 			else:
 				self.logger.error(f"File: {settingsPath} read data's are invalid")
 
 		return settingsJson, _settingIsValid
 	
-	def _validateJson(self, jsonData:dict, jsonScheme:dict) -> bool:
+	def _validateJson(self, jsonData:dict, jsonValidator:jsonschema.protocols.Validator) -> list[jsonschema.ValidationError]:
 		"""
-		Validate the json file.Will be checked with a given scheme
+		Validate the json data with a given validator
 		WIll check if attributes with correct types are available
 
 		Param
 		-----
 		jsonData:dict = Real Json data as an Dictionary
-		jsonScheme:dict = Json scheme to verify the data as an dictionary
+		jsonValidator:jsonschema.protocols.Validator = Validator of the json scheme
 
 		Return
 		-----
-		bool -> True if valid // False if not valid
+		list[jsonschema.ValidationError] -> All errors ordered by their path. Empty if valid
 		"""
-		_retVal = False
-
-		try:
-			jsonschema.validate(instance=jsonData, schema=jsonScheme)
-			_retVal = True
-		except jsonschema.exceptions.ValidationError as err:
-			_retVal = False
-		except jsonschema.exceptions.SchemaError as err:
-			_retVal = False
 
-		return _retVal
+		return sorted(jsonValidator.iter_errors(jsonData), key=lambda error: [str(_part) for _part in error.absolute_path])
 
 	def _now(self)->datetime:
 		"""
@@ -384,6 +890,8 @@ class Spreadsheet_report_app:
 			with open(self.settingsPath, "r") as settingsFile:
 				_settingsJson = json.load(settingsFile)
 
+		self.dataCache.configure(config=_settingsJson.get("cache", {}))
+
 		#Set the Output path
 		_outputPath = self.storagePath +"manual_created/"
 
@@ -395,9 +903,9 @@ class Spreadsheet_report_app:
 
 				if userName == _user["name"]: 				
 
-					_userObj = User(name=userName, tempFilePath=_outputPath, logLevel=self.loggerLevel, testing=self.testing)
+					_userObj = User(name=userName, tempFilePath=_outputPath, logLevel=self.loggerLevel, testing=self.testing, dataCache=self.dataCache, assetIdCache=self.assetIdCache, templateCache=self.templateCache, connectionManager=self.connectionManager, mailTracker=self.mailTracker, renderPool=self.renderPool)
 					_userObj.configure(elionaConfig=_settingsJson["eliona_handler"], userConfig=_user, reportConfig=_settingsJson["reportConfig"])
-					_userObj.sendReport(year=reportDate.year, month=reportDate.month, createOnly=True, sendAsync=False)
+					_userObj.sendReport(year=reportDate.year, month=reportDate.month, day=reportDate.day, createOnly=True, sendAsync=False)
 
 
 		elif reportName != None:
@@ -407,9 +915,9 @@ class Spreadsheet_report_app:
 				
 				if reportName == _report["name"]:
 
-					_reportObj = Report(name=reportName, tempFilePath=_outputPath, logLevel=self.loggerLevel, testing=self.testing)
+					_reportObj = Report(name=reportName, tempFilePath=_outputPath, logLevel=self.loggerLevel, testing=self.testing, dataCache=self.dataCache, assetIdCache=self.assetIdCache, templateCache=self.templateCache, connectionManager=self.connectionManager, mailTracker=self.mailTracker, renderPool=self.renderPool)
 					_reportObj.configure(elionaConfig=self.settings["eliona_handler"], reportConfig=_settingsJson["reportConfig"])
-					_reportObj.sendReport(year=reportDate.year, month=reportDate.month, createOnly=True, sendAsync=False)
+					_reportObj.sendReport(year=reportDate.year, month=reportDate.month, day=reportDate.day, createOnly=True, sendAsync=False)
 
 	def _dirHandling(self, path) -> bool:
 		"""
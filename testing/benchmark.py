@@ -0,0 +1,441 @@
+"""
+Benchmarks for the spreadsheet report creation
+
+Call the script from the repository root:
+
+	python ./testing/benchmark.py -b aggregation
+
+The benchmarks feed synthetic data to the report functions. No eliona instance is needed.
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytz
+from openpyxl import load_workbook, Workbook
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "spreadsheet-report-app"))
+
+from spreadsheet import Spreadsheet
+from evaluator import FormulaEvaluator
+import utils.logger as log
+
+
+def measure(function, *args, **kwargs) -> tuple[float, float]:
+	"""
+	Measure the wall time and the peak memory of a function call
+
+	Return
+	------
+	-> (wall time in seconds, peak memory in MB)
+	"""
+
+	tracemalloc.start()
+	_start = time.perf_counter()
+	function(*args, **kwargs)
+	_duration = time.perf_counter() - _start
+	_current, _peak = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+
+	return (_duration, _peak / (1024 * 1024))
+
+
+def syntheticAggregatedData(rows:int, assetId:int=1, attribute:str="power", raster:str="M15") -> list:
+	"""
+	Create a synthetic get_data_aggregated response with the given amount of rows
+	"""
+
+	_start = datetime(2022, 1, 1)
+	_tick = timedelta(minutes=15)
+
+	return [{	"asset_id": assetId,
+				"attribute": attribute,
+				"raster": raster,
+				"timestamp": _start + _tick * _index,
+				"average": float(_index)} for _index in range(rows)]
+
+
+def legacyAccumulation(data:list, assetId:int, attribute:str, raster:str, mode:str, timeStampKey:str, valueKey:str) -> pd.DataFrame:
+	"""
+	Accumulation as it was done before with one pd.concat per row. Only used as reference.
+	"""
+
+	_dataSet = {}
+	_dataFrame = pd.DataFrame(columns=(timeStampKey, valueKey))
+
+	for _data in data:
+		if ((str(_data["asset_id"]) == str(assetId))
+			and (_data["attribute"] == attribute)
+			and (_data["raster"] == raster)
+			and mode in _data ):
+
+			_dataSet[_data["timestamp"]] = _data[mode]
+			_dataFrame = pd.concat([_dataFrame, pd.DataFrame([[_data["timestamp"].replace(tzinfo=None), _data[mode]]], columns=(timeStampKey, valueKey))] )
+
+	return _dataFrame
+
+
+def benchAggregation(args) -> None:
+	"""
+	Compare the legacy row wise accumulation with the columnar accumulation of the aggregated data
+	"""
+
+	_spreadsheet = Spreadsheet(logLevel=log.LOG_LEVEL_ERROR)
+	_settings = {"assetId": 1, "attribute": "power", "raster": "M15", "mode": "average", "timeStampKey": "TimeStamp", "valueKey": "Value"}
+
+	print(f"{'rows':>10} | {'legacy [s]':>12} | {'legacy [MB]':>12} | {'columnar [s]':>12} | {'columnar [MB]':>13}")
+
+	for _rows in args.rows:
+
+		_data = syntheticAggregatedData(rows=_rows)
+
+		if _rows <= args.legacy_limit:
+			_legacyTime, _legacyMemory = measure(legacyAccumulation, _data, **_settings)
+			_legacyTimeStr = f"{_legacyTime:12.3f}"
+			_legacyMemoryStr = f"{_legacyMemory:12.1f}"
+		else:
+			_legacyTimeStr = f"{'skipped':>12}"
+			_legacyMemoryStr = f"{'skipped':>12}"
+
+		_time, _memory = measure(_spreadsheet._Spreadsheet__accumulateAggregatedData, _data, **_settings)
+
+		print(f"{_rows:>10} | {_legacyTimeStr} | {_legacyMemoryStr} | {_time:12.3f} | {_memory:13.1f}")
+
+
+def legacyTimeGrid(startDateTime:datetime, endDateTime:datetime, timeTick:timedelta, timeStampFormat:str, dataFrame:pd.DataFrame) -> pd.DataFrame:
+	"""
+	Time column as it was created before with one strftime per tick and a merge on formatted strings. Only used as reference.
+	"""
+
+	_timeStampList = []
+	_timeStamp = startDateTime
+	_endTimeStampForList = (endDateTime-timedelta(minutes=1))
+
+	while (_timeStamp <= _endTimeStampForList):
+		_timeStampList.append((_timeStamp).strftime(timeStampFormat))
+		_timeStamp = _timeStamp + timeTick
+
+	_dataTable = pd.DataFrame( _timeStampList, columns=["TimeStamp"])
+
+	_dataFrame = dataFrame.copy()
+	_dataFrame["TimeStamp"] = pd.to_datetime(arg=_dataFrame["TimeStamp"]).dt.strftime(timeStampFormat)
+	return pd.merge(_dataTable, _dataFrame, how='left', on="TimeStamp")
+
+
+def timeGrid(spreadsheet:Spreadsheet, startDateTime:datetime, endDateTime:datetime, raster:str, timeStampFormat:str, dataFrame:pd.DataFrame) -> pd.DataFrame:
+	"""
+	Time column with pd.date_range, a merge on the time stamps and one formatting at the end
+	"""
+
+	_timeGrid = spreadsheet._Spreadsheet__createTimeGrid(startDateTime=startDateTime, endDateTime=endDateTime, raster=raster)
+	_dataTable = pd.DataFrame({"TimeStamp": _timeGrid.tz_localize(None)})
+
+	_dataTable = pd.merge(_dataTable, dataFrame, how='left', on="TimeStamp")
+	_dataTable["TimeStamp"] = _dataTable["TimeStamp"].dt.strftime(timeStampFormat)
+	return _dataTable
+
+
+def benchTimeGrid(args) -> None:
+	"""
+	Compare the legacy time column creation with the pd.date_range based one for a yearly report
+	"""
+
+	_spreadsheet = Spreadsheet(logLevel=log.LOG_LEVEL_ERROR)
+	_timeZone = pytz.timezone("Europe/Zurich")
+	_startDateTime = datetime(2022, 1, 1).astimezone(_timeZone)
+	_endDateTime = datetime(2023, 1, 1).astimezone(_timeZone)
+	_timeStampFormat = "%Y-%m-%d %H:%M:%S"
+
+	print(f"{'raster':>8} | {'rows':>8} | {'legacy [s]':>12} | {'legacy [MB]':>12} | {'date_range [s]':>14} | {'date_range [MB]':>15}")
+
+	for _raster, _timeTick in (("S60", timedelta(seconds=60)), ("M1", timedelta(minutes=1)), ("M15", timedelta(minutes=15))):
+
+		_rows = int((_endDateTime - _startDateTime) / _timeTick)
+		_dataFrame = pd.DataFrame({	"TimeStamp": [_startDateTime.replace(tzinfo=None) + _timeTick * _index for _index in range(_rows)],
+									"Value": [float(_index) for _index in range(_rows)]})
+
+		_legacyTime, _legacyMemory = measure(legacyTimeGrid, _startDateTime, _endDateTime, _timeTick, _timeStampFormat, _dataFrame)
+		_time, _memory = measure(timeGrid, _spreadsheet, _startDateTime, _endDateTime, _raster, _timeStampFormat, _dataFrame)
+
+		print(f"{_raster:>8} | {_rows:>8} | {_legacyTime:12.3f} | {_legacyMemory:12.1f} | {_time:14.3f} | {_memory:15.1f}")
+
+
+def legacyJoin(timeStamps:pd.DatetimeIndex, dataFrames:dict) -> pd.DataFrame:
+	"""
+	Join of the data columns as it was done before with one pd.merge per column. Only used as reference.
+	"""
+
+	_dataTable = pd.DataFrame({"TimeStamp": timeStamps})
+
+	for _columnName, _dataFrame in dataFrames.items():
+		_dataTable = pd.merge(_dataTable, _dataFrame, how='left', on="TimeStamp")
+
+	return _dataTable
+
+
+def benchJoin(args) -> None:
+	"""
+	Compare the legacy join with one merge per column with the single pass join of all columns
+	"""
+
+	_spreadsheet = Spreadsheet(logLevel=log.LOG_LEVEL_ERROR)
+	_startDateTime = datetime(2022, 1, 1)
+	_rows = args.join_rows
+
+	_timeStamps = pd.date_range(start=_startDateTime, periods=_rows, freq="15min")
+
+	print(f"{'columns':>8} | {'rows':>8} | {'merge [s]':>10} | {'merge [MB]':>11} | {'single pass [s]':>15} | {'single pass [MB]':>16}")
+
+	for _columns in args.columns:
+
+		#Every column misses some time stamps
+		_dataFrames = {}
+		for _column in range(_columns):
+			_columnName = f"Value {_column}"
+			_dataFrames[_columnName] = pd.DataFrame({	"TimeStamp": _timeStamps[_column % 7::1 + _column % 3],
+														_columnName: [float(_index) for _index in range(len(_timeStamps[_column % 7::1 + _column % 3]))]})
+
+		_legacyTime, _legacyMemory = measure(legacyJoin, _timeStamps, _dataFrames)
+		_time, _memory = measure(_spreadsheet._Spreadsheet__joinDataColumns, _timeStamps, "TimeStamp", _dataFrames)
+
+		print(f"{_columns:>8} | {_rows:>8} | {_legacyTime:10.3f} | {_legacyMemory:11.1f} | {_time:15.3f} | {_memory:16.1f}")
+
+
+def formulaTemplate(templateFile:str, filePath:str) -> str:
+	"""
+	Create a copy of a template with synthetic data and formulas on every data row
+
+	Return
+	------
+	-> str = Name of the sheet with the formulas
+	"""
+
+	_workbook = load_workbook(filename=templateFile)
+	_sheet = _workbook.worksheets[0]
+	_lastRow = _sheet.max_row
+	_lastColumn = _sheet.max_column
+	_formulaColumn = _lastColumn + 1
+
+	#Replace the configuration and the empty cells with numbers
+	for _row in range(2, _lastRow + 1):
+		for _column in range(2, _lastColumn + 1):
+			_sheet.cell(row=_row, column=_column, value=float(_row * _column % 97))
+
+		_sheet.cell(row=_row, column=_formulaColumn, value=f"=IF(B{_row}>C{_row},B{_row}-C{_row},SUM(B{_row}:C{_row})*2)")
+
+	#Summary rows below the data
+	_sheet.cell(row=_lastRow + 1, column=_formulaColumn, value=f"=SUM(B2:C{_lastRow})")
+	_sheet.cell(row=_lastRow + 2, column=_formulaColumn, value=f"=AVERAGE(B2:C{_lastRow})")
+	_sheet.cell(row=_lastRow + 3, column=_formulaColumn, value=f"=MAX(B2:B{_lastRow})-MIN(C2:C{_lastRow})")
+
+	_workbook.save(filePath)
+	return _sheet.title
+
+
+def builtinFormulas(filePath:str, sheet:str) -> list:
+	"""
+	Calculate the sheet with the builtin evaluator
+	"""
+
+	_workbook = load_workbook(filename=filePath)
+	return FormulaEvaluator(workbook=_workbook, logLevel=log.LOG_LEVEL_ERROR).evaluateSheet(sheet=sheet)
+
+
+def benchFormulas(args) -> None:
+	"""
+	Compare the formulas package with the builtin evaluator on the templates of the examples folder
+	"""
+
+	_spreadsheet = Spreadsheet(logLevel=log.LOG_LEVEL_ERROR)
+	_examples = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "examples")
+
+	print(f"{'template':>34} | {'cells':>6} | {'formulas [s]':>12} | {'formulas [MB]':>13} | {'builtin [s]':>11} | {'builtin [MB]':>12} | {'equal':>5}")
+
+	with tempfile.TemporaryDirectory() as _directory:
+
+		for _template in sorted(os.listdir(_examples)):
+
+			if not _template.endswith(".xlsx"):
+				continue
+
+			_filePath = os.path.join(_directory, _template)
+			_sheet = formulaTemplate(templateFile=os.path.join(_examples, _template), filePath=_filePath)
+
+			_formulasTime, _formulasMemory = measure(_spreadsheet._Spreadsheet__calculateWithFormulas, _filePath, _sheet)
+			_builtinTime, _builtinMemory = measure(builtinFormulas, _filePath, _sheet)
+
+			_expected = _spreadsheet._Spreadsheet__calculateWithFormulas(_filePath, _sheet)
+			_values = builtinFormulas(_filePath, _sheet)
+			_cells = sum(len(_row) for _row in _values)
+
+			print(f"{_template:>34} | {_cells:>6} | {_formulasTime:12.3f} | {_formulasMemory:13.1f} | {_builtinTime:11.3f} | {_builtinMemory:12.1f} | {str(_expected == _values):>5}")
+
+
+def largeTemplate(filePath:str, sheets:int, rows:int) -> None:
+	"""
+	Create a data list template with the given amount of sheets. Every sheet has the given amount of rows
+	"""
+
+	_workbook = Workbook(write_only=True)
+
+	for _sheetIndex in range(sheets):
+
+		_sheet = _workbook.create_sheet(title=f"Sheet{_sheetIndex + 1}")
+		_sheet.append(["TimeStamp", "Value 1", "Value 2", "Comment"])
+		_sheet.append(['{"timeStamp":"%Y-%m-%d %H:%M", "raster":"M15"}', '{"assetId":"1", "attribute":"power", "mode":"sum"}', '{"assetId":"2", "attribute":"power", "mode":"sum"}', ""])
+
+		for _row in range(rows - 2):
+			_sheet.append([f"row {_row}", float(_row), float(_row * 2), "text"])
+
+	_workbook.save(filePath)
+
+
+def legacyTemplate(filePath:str, sheet:str) -> pd.DataFrame:
+	"""
+	Template reading as it was done before with the full workbook loaded. Only used as reference.
+	"""
+
+	_sheet = load_workbook(filename=filePath)[sheet]
+	_template = pd.DataFrame(_sheet.values)
+	_template.columns = _template.iloc[0]
+	_template = _template[1:]
+	_template.reset_index(drop=True, inplace=True)
+
+	return _template
+
+
+def benchTemplate(args) -> None:
+	"""
+	Compare the full workbook loading with the read only loading of the configured sheet
+	"""
+
+	_spreadsheet = Spreadsheet(logLevel=log.LOG_LEVEL_ERROR)
+
+	print(f"{'sheets':>6} | {'rows':>8} | {'full [s]':>9} | {'full [MB]':>10} | {'read only [s]':>13} | {'read only [MB]':>14} | {'equal':>5}")
+
+	with tempfile.TemporaryDirectory() as _directory:
+
+		_filePath = os.path.join(_directory, "template.xlsx")
+		largeTemplate(filePath=_filePath, sheets=args.sheets, rows=args.template_rows)
+
+		_settings = {"templateFile": _filePath, "sheet": "Sheet1", "separator": ";"}
+
+		_legacyTime, _legacyMemory = measure(legacyTemplate, _filePath, "Sheet1")
+		_time, _memory = measure(_spreadsheet._Spreadsheet__readTableTemplate, _settings)
+
+		_equal = legacyTemplate(_filePath, "Sheet1").equals(_spreadsheet._Spreadsheet__readTableTemplate(_settings))
+
+		print(f"{args.sheets:>6} | {args.template_rows:>8} | {_legacyTime:9.3f} | {_legacyMemory:10.1f} | {_time:13.3f} | {_memory:14.1f} | {str(_equal):>5}")
+
+
+class SyntheticEliona:
+	"""
+	eliona handler returning synthetic aggregated data for every time stamp of the requested time span.
+	The values only depend on the time stamp, so every request returns the same value for a time stamp
+	"""
+
+	def get_data_aggregated(self, from_date:str, to_date:str, data_subtype:str, raster:str, attribute:str, asset_id:int|None=None, asset_gai:str|None=None) -> tuple:
+		_timeStamps = pd.date_range(start=datetime.fromisoformat(from_date), end=datetime.fromisoformat(to_date), freq="15min")
+
+		return [{	"asset_id": asset_id,
+					"attribute": attribute,
+					"raster": raster,
+					"timestamp": _timeStamp.to_pydatetime(),
+					"sum": float(_timeStamp.value // 900_000_000_000 % 1000)} for _timeStamp in _timeStamps], None
+
+
+def dataListTemplate(filePath:str, columns:int) -> None:
+	"""
+	Create a data list template with a M15 time stamp column and the given amount of data columns
+	"""
+
+	_workbook = Workbook()
+	_sheet = _workbook.active
+	_sheet.title = "Sheet1"
+	_sheet.append(["TimeStamp"] + [f"Value {_column}" for _column in range(columns)])
+	_sheet.append(['{"timeStamp":"%Y-%m-%d %H:%M", "raster":"M15"}'] + [f'{{"assetId":"{_column + 1}", "attribute":"power", "mode":"sum"}}' for _column in range(columns)])
+	_workbook.save(filePath)
+
+
+def dataListReport(settings:dict, startDateTime:datetime, endDateTime:datetime) -> bool:
+	"""
+	Create a csv data list report with the synthetic eliona handler
+	"""
+
+	_spreadsheet = Spreadsheet(logLevel=log.LOG_LEVEL_ERROR)
+	_spreadsheet.reportFilePath = settings["tempPath"]
+
+	return _spreadsheet._Spreadsheet__createDataListReport(eliona=SyntheticEliona(), settings=settings, startDateTime=startDateTime, endDateTime=endDateTime)
+
+
+def benchStreaming(args) -> None:
+	"""
+	Compare the yearly csv data list report built at once with the report streamed month by month
+	"""
+
+	_startDateTime = datetime(2022, 1, 1, tzinfo=pytz.utc)
+	_endDateTime = datetime(2023, 1, 1, tzinfo=pytz.utc)
+	_rows = int((_endDateTime - _startDateTime) / timedelta(minutes=15))
+
+	print(f"{'columns':>8} | {'rows':>8} | {'full [s]':>9} | {'full [MB]':>10} | {'streaming [s]':>13} | {'streaming [MB]':>14} | {'equal':>5}")
+
+	with tempfile.TemporaryDirectory() as _directory:
+
+		for _columns in args.stream_columns:
+
+			_templateFile = os.path.join(_directory, f"template_{_columns}.xlsx")
+			dataListTemplate(filePath=_templateFile, columns=_columns)
+
+			_results = {}
+			for _streaming in (False, True):
+
+				_settings = {	"type": "DataListSequential",
+								"templateFile": _templateFile,
+								"sheet": "Sheet1",
+								"separator": ";",
+								"firstRow": "0",
+								"fromTemplate": False,
+								"streaming": _streaming,
+								"tempPath": os.path.join(_directory, f"report_{_columns}_{_streaming}.csv")}
+
+				_results[_streaming] = measure(dataListReport, _settings, _startDateTime, _endDateTime)
+
+			with open(os.path.join(_directory, f"report_{_columns}_False.csv"), "rb") as _full, open(os.path.join(_directory, f"report_{_columns}_True.csv"), "rb") as _streamed:
+				_equal = _full.read() == _streamed.read()
+
+			_fullTime, _fullMemory = _results[False]
+			_time, _memory = _results[True]
+
+			print(f"{_columns:>8} | {_rows:>8} | {_fullTime:9.3f} | {_fullMemory:10.1f} | {_time:13.3f} | {_memory:14.1f} | {str(_equal):>5}")
+
+
+BENCHMARKS = {
+	"aggregation": benchAggregation,
+	"timegrid": benchTimeGrid,
+	"join": benchJoin,
+	"formulas": benchFormulas,
+	"template": benchTemplate,
+	"streaming": benchStreaming,
+}
+
+
+if __name__ == "__main__":
+
+	_argumentParser = argparse.ArgumentParser()
+	_argumentParser.add_argument("-b", "--bench", type=str, required=True, choices=BENCHMARKS.keys(), help="Benchmark to run")
+	_argumentParser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="Row counts of the synthetic data")
+	_argumentParser.add_argument("--columns", type=int, nargs="+", default=[10, 50, 100], help="Column counts of the join benchmark")
+	_argumentParser.add_argument("--join-rows", type=int, default=35_040, help="Row count of the join benchmark")
+	_argumentParser.add_argument("--sheets", type=int, default=20, help="Sheet count of the template benchmark")
+	_argumentParser.add_argument("--template-rows", type=int, default=50_000, help="Row count of every sheet of the template benchmark")
+	_argumentParser.add_argument("--stream-columns", type=int, nargs="+", default=[10, 50], help="Column counts of the streaming benchmark")
+	_argumentParser.add_argument("--legacy-limit", type=int, default=10_000, help="Skip the legacy implementation above this row count")
+	_args = _argumentParser.parse_args()
+
+	BENCHMARKS[_args.bench](_args)
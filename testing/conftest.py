@@ -0,0 +1,8 @@
+"""
+Configuration of the tests. The modules of the app are imported like the app imports them
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "spreadsheet-report-app"))
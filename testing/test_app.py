@@ -0,0 +1,164 @@
+"""
+Tests of the application settings
+"""
+
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+
+from enums import ReportState
+from spreadsheet_report_app import Spreadsheet_report_app
+
+
+def createApp(path, settings:dict) -> Spreadsheet_report_app:
+	"""
+	Create the app with the given settings file
+	"""
+
+	_settingsPath = path / "settings.json"
+	_settingsPath.write_text(json.dumps(settings))
+
+	return Spreadsheet_report_app(settingsPath=str(_settingsPath), storagePath=str(path) + "/", testingEnable=False, loggingLevel="ERROR")
+
+
+SETTINGS = {"eliona_handler": {"host": "eliona.example.com", "api": "https://eliona.example.com/api/v2", "apiKey": "secret", "dbTimeZone": "Europe/Zurich", "sslVerify": False}}
+
+
+def test_settingsChangeResolvesAssetIdsAgain(tmp_path):
+	_app = createApp(tmp_path, SETTINGS)
+
+	assert _app._reloadSettings()
+	assert not _app._reloadSettings()
+
+	_app.assetIdCache._assetIds["Asset 1"] = 1
+	_app._applySettings()
+
+	assert _app.assetIdCache._assetIds == {}
+
+
+class BlockingSender:
+	"""
+	Report sending till the release is set
+	"""
+
+	def __init__(self, release:threading.Event) -> None:
+		self.release = release
+		self.state = ReportState.IDLE
+		self.renderPool = None
+		self.sent = False
+
+	def sendReport(self, year:int, month:int, day:int, sendAsync:bool) -> None:
+		self.release.wait(timeout=5)
+		self.sent = True
+		self.state = ReportState.IDLE
+
+
+def test_schedulerChangeResetsCanceledJobs(tmp_path):
+	_app = createApp(tmp_path, SETTINGS)
+	_app._configureScheduler(config={"workers": 2, "renderProcesses": 0})
+
+	_release = threading.Event()
+	for _name in ("a", "b", "c"):
+		_app.reports[_name] = BlockingSender(release=_release)
+		_app._schedule(key="report:" + _name, sender=_app.reports[_name], now=datetime(2023, 1, 1))
+
+	#Two jobs are running and one is queued
+	threading.Timer(0.2, _release.set).start()
+	_app._configureScheduler(config={"workers": 3, "renderProcesses": 0})
+
+	assert [_app.reports[_name].sent for _name in ("a", "b", "c")] == [True, True, False]
+	assert all(_app.reports[_name].state == ReportState.IDLE for _name in ("a", "b", "c"))
+	assert _app.jobs == {}
+
+
+class DueSender:
+	"""
+	Report in the given state due at the given time
+	"""
+
+	def __init__(self, state:ReportState, dueTime:datetime) -> None:
+		self.state = state
+		self.dueTime = dueTime
+
+	def nextDueTime(self) -> datetime:
+		return self.dueTime
+
+
+def test_canceledSendersAreQueuedAtTheirNextPeriod(tmp_path):
+	_app = createApp(tmp_path, SETTINGS)
+	_dueTime = datetime.now(tz=timezone.utc) + timedelta(days=1)
+	_app.settings = {"reports": [{"name": "a"}, {"name": "b"}]}
+	_app.reports = {"a": DueSender(state=ReportState.CANCELED, dueTime=_dueTime),
+					"b": DueSender(state=ReportState.IDLE, dueTime=datetime(2023, 1, 1, tzinfo=timezone.utc))}
+
+	_app._queueDueTimes()
+
+	assert sorted(_key for _time, _key in _app.dueTimes) == ["report:a", "report:b"]
+	assert dict((_key, _time) for _time, _key in _app.dueTimes)["report:a"] == _dueTime
+	assert _app._waitTillDue() == {"report:b"}
+
+
+DIFF_SETTINGS = {"eliona_handler": SETTINGS["eliona_handler"],
+				"reports": [{"name": "Report 1", "schedule": "monthly"}, {"name": "Report 2", "schedule": "monthly"}],
+				"reportConfig": [{"name": "Monthly", "schedule": "monthly"}, {"name": "Yearly", "schedule": "yearly"}],
+				"users": [{"name": "User 1", "reports": ["Monthly"]}, {"name": "User 2", "reports": ["Yearly"]}]}
+
+
+def test_diffSettingsFindsChangedReportsAndUsers(tmp_path):
+	_app = createApp(tmp_path, SETTINGS)
+
+	_settings = json.loads(json.dumps(DIFF_SETTINGS))
+	_settings["reports"] = [{"name": "Report 1", "schedule": "yearly"}, {"name": "Report 3", "schedule": "monthly"}]
+	_settings["reportConfig"][1]["schedule"] = "monthly"
+
+	assert _app._diffSettings(lastSettings=DIFF_SETTINGS, settings=DIFF_SETTINGS) == set()
+	assert _app._diffSettings(lastSettings=DIFF_SETTINGS, settings=_settings) == {"report:Report 1", "report:Report 2", "report:Report 3", "user:User 2"}
+
+
+def test_diffSettingsChangesAllWithTheConnection(tmp_path):
+	_app = createApp(tmp_path, SETTINGS)
+
+	_settings = json.loads(json.dumps(DIFF_SETTINGS))
+	_settings["eliona_handler"]["apiKey"] = "other"
+
+	assert _app._diffSettings(lastSettings=DIFF_SETTINGS, settings=_settings) == {"report:Report 1", "report:Report 2", "user:User 1", "user:User 2"}
+	assert _app._diffSettings(lastSettings={}, settings=DIFF_SETTINGS) == {"report:Report 1", "report:Report 2", "user:User 1", "user:User 2"}
+
+
+REPORT = {"name": "Report 1", "schedule": "monthly", "type": "DataEntry", "templateFile": "template.xlsx", "reportPath": "report.xlsx", "receiver": [{"msgEndpoint": "user@example.com"}]}
+
+
+def readSettings(path, settings) -> tuple:
+	"""
+	Read and validate the given settings like the app does
+	"""
+
+	_app = createApp(path, settings)
+
+	return _app._readSettings(settingsPath=_app.settingsPath, settingsValidator=_app.SETTINGS_VALIDATOR)
+
+
+def test_settingsValidatorSkipsInvalidEntries(tmp_path):
+	_settings = dict(SETTINGS, 
+					reports=[REPORT, dict(REPORT, name="Report 2", type="Unknown"), dict(REPORT, name="Report 3", receiver=[{}])],
+					users=[{"name": "User 1", "msgEndpoint": "user@example.com", "reports": ["Report 1"]}, {"name": "User 2", "reports": []}])
+
+	_read, _valid = readSettings(tmp_path, _settings)
+
+	assert _valid
+	assert [_report["name"] for _report in _read["reports"]] == ["Report 1"]
+	assert [_user["name"] for _user in _read["users"]] == ["User 1"]
+
+
+def test_settingsValidatorRejectsInvalidSettings(tmp_path):
+	assert not readSettings(tmp_path, dict(SETTINGS, scheduler={"workers": 0}))[1]
+	assert not readSettings(tmp_path, dict(SETTINGS, reports={"name": "Report 1"}))[1]
+	assert not readSettings(tmp_path, {"reports": [REPORT]})[1]
+	assert readSettings(tmp_path, dict(SETTINGS, reports=[REPORT]))[1]
+
+
+def test_settingsWithInvalidJsonAreRejected(tmp_path):
+	_app = createApp(tmp_path, SETTINGS)
+	(tmp_path / "settings.json").write_text("{")
+
+	assert _app._readSettings(settingsPath=_app.settingsPath, settingsValidator=_app.SETTINGS_VALIDATOR) == ({}, False)
@@ -0,0 +1,255 @@
+"""
+Tests of the caches
+"""
+
+import sqlite3
+import threading
+import time
+
+import utils.logger as log
+from cache import DataCache
+
+
+def runThreads(target, count:int=8) -> None:
+	"""
+	Run the target in several threads at the same time and wait till all are done
+	"""
+
+	_threads = [threading.Thread(target=target) for _ in range(count)]
+	for _thread in _threads:
+		_thread.start()
+	for _thread in _threads:
+		_thread.join()
+
+
+class LockedConnection:
+	"""
+	Database connection failing like a database locked by another process
+	"""
+
+	def execute(self, *args):
+		raise sqlite3.OperationalError("database is locked")
+
+
+def dataCache(path) -> DataCache:
+	"""
+	Create a cache with one closed period of asset 1
+	"""
+
+	_cache = DataCache(path=str(path / "cache" / "aggregated.sqlite"), logLevel=log.LOG_LEVEL_ERROR)
+	_cache.set(asset="1", attribute="power", raster="H1", startDate="2023-01-01", endDate="2023-02-01", openPeriod=False, data=[{"power": 1}], assetId=1)
+
+	return _cache
+
+
+def test_dataCacheReadErrorIsMiss(tmp_path):
+	_cache = dataCache(tmp_path)
+
+	assert _cache.get(asset="1", attribute="power", raster="H1", startDate="2023-01-01", endDate="2023-02-01") == ([{"power": 1}], 1)
+
+	_cache._connection = LockedConnection()
+
+	assert _cache.get(asset="1", attribute="power", raster="H1", startDate="2023-01-01", endDate="2023-02-01") == None
+	assert (_cache.hits, _cache.misses) == (1, 1)
+
+
+def test_dataCacheCountsConcurrentRequests(tmp_path):
+	_cache = dataCache(tmp_path)
+
+	def request():
+		for _ in range(100):
+			_cache.get(asset="1", attribute="power", raster="H1", startDate="2023-01-01", endDate="2023-02-01")
+			_cache.get(asset="2", attribute="power", raster="H1", startDate="2023-01-01", endDate="2023-02-01")
+
+	runThreads(request)
+
+	assert (_cache.hits, _cache.misses) == (800, 800)
+
+def test_templateCacheCountsConcurrentRequests(tmp_path):
+	from cache import TemplateCache
+
+	_path = tmp_path / "template.csv"
+	_path.write_text("Timestamp;Energie\n")
+	_cache = TemplateCache(logLevel=log.LOG_LEVEL_ERROR)
+	_loads = []
+
+	def load():
+		_loads.append(1)
+		return {"rows": 1}
+
+	def request():
+		for _ in range(100):
+			assert _cache.get(path=str(_path), key=("Sheet1", ";"), loader=load) == {"rows": 1}
+
+	runThreads(request)
+
+	assert _cache.hits + _cache.misses == 800
+	assert _cache.misses == len(_loads)
+
+def test_keyLocksAreExclusivePerKey():
+	from cache import KeyLocks
+
+	_locks = KeyLocks()
+	_holders = {}
+	_overlaps = []
+	_keys = iter([f"report_{_index % 3}.xlsx" for _index in range(24)])
+	_keysLock = threading.Lock()
+
+	def hold():
+		with _keysLock:
+			_key = next(_keys)
+
+		with _locks.hold(key=_key):
+			_holders[_key] = _holders.get(_key, 0) + 1
+			if _holders[_key] > 1:
+				_overlaps.append(_key)
+			time.sleep(0.005)
+			_holders[_key] -= 1
+
+	runThreads(hold, count=24)
+
+	assert _overlaps == []
+	assert len(_locks) == 0
+
+
+def test_keyLocksAreRemovedAfterUse():
+	from cache import KeyLocks
+
+	_locks = KeyLocks()
+	for _index in range(100):
+		with _locks.hold(key=f"report_{_index}.xlsx"):
+			assert len(_locks) == 1
+
+	assert len(_locks) == 0
+
+def test_artifactStoreCreatesEveryKeyOnce(tmp_path):
+	from cache import ArtifactStore
+
+	_store = ArtifactStore(path=str(tmp_path / "artifacts") + "/", logLevel=log.LOG_LEVEL_ERROR)
+	_created = []
+	_paths = []
+
+	def create(tempPath:str) -> bool:
+		_created.append(tempPath)
+		time.sleep(0.05)
+		with open(tempPath, "w") as file:
+			file.write("report")
+		return True
+
+	def request():
+		_paths.append(_store.get(key="abc", fileName="report.xlsx", create=create))
+
+	runThreads(request, count=5)
+
+	assert len(_created) == 1
+	assert len(set(_paths)) == 1
+	assert open(_paths[0]).read() == "report"
+
+	for _index in range(20):
+		_store.get(key=f"key{_index}", fileName="report.xlsx", create=create)
+
+	assert len(_store._locks) == 0
+
+
+def test_artifactStoreCountsConcurrentRequests(tmp_path):
+	from cache import ArtifactStore
+
+	_store = ArtifactStore(path=str(tmp_path / "artifacts") + "/", logLevel=log.LOG_LEVEL_ERROR)
+
+	def create(tempPath:str) -> bool:
+		with open(tempPath, "w") as file:
+			file.write("report")
+		return True
+
+	def request():
+		for _index in range(50):
+			_store.get(key=f"key{_index % 10}", fileName="report.xlsx", create=create)
+
+	runThreads(request)
+
+	assert _store.hits + _store.misses == 400
+	assert _store.misses == 10
+
+
+def test_dataCacheExpiresOpenPeriods(tmp_path):
+	_cache = dataCache(tmp_path)
+	_cache.configure(config={"openPeriodTtl": 0})
+	_cache.set(asset="1", attribute="power", raster="H1", startDate="2023-02-01", endDate="2023-03-01", openPeriod=True, data=[{"power": 2}], assetId=1)
+
+	assert _cache.get(asset="1", attribute="power", raster="H1", startDate="2023-02-01", endDate="2023-03-01") == None
+	assert _cache.get(asset="1", attribute="power", raster="H1", startDate="2023-01-01", endDate="2023-02-01") == ([{"power": 1}], 1)
+
+
+def test_dataCacheEvictsLeastRecentlyUsed(tmp_path):
+	_cache = DataCache(path=str(tmp_path / "aggregated.sqlite"), logLevel=log.LOG_LEVEL_ERROR)
+	_data = [{"power": "x" * 1000}]
+
+	#Room for two entries
+	_cache.configure(config={"maxSizeMb": 2500 / (1024 * 1024)})
+
+	for _month in (1, 2):
+		_cache.set(asset="1", attribute="power", raster="H1", startDate=f"2023-0{_month}-01", endDate="", openPeriod=False, data=_data, assetId=1)
+		time.sleep(0.01)
+
+	assert _cache.get(asset="1", attribute="power", raster="H1", startDate="2023-01-01", endDate="") != None
+	time.sleep(0.01)
+	_cache.set(asset="1", attribute="power", raster="H1", startDate="2023-03-01", endDate="", openPeriod=False, data=_data, assetId=1)
+
+	assert _cache.get(asset="1", attribute="power", raster="H1", startDate="2023-01-01", endDate="") != None
+	assert _cache.get(asset="1", attribute="power", raster="H1", startDate="2023-02-01", endDate="") == None
+	assert _cache.get(asset="1", attribute="power", raster="H1", startDate="2023-03-01", endDate="") != None
+
+
+class AssetIdHandler:
+	"""
+	eliona handler resolving the known asset GAIs
+	"""
+
+	def __init__(self, assetIds:dict) -> None:
+		self.assetIds = assetIds
+		self.requests = []
+
+	def get_asset_id(self, asset_gai:str) -> int | None:
+		self.requests.append(asset_gai)
+		return self.assetIds.get(asset_gai, None)
+
+
+def test_assetIdCacheResolvesEveryGaiOnce():
+	from cache import AssetIdCache
+
+	_cache = AssetIdCache(logLevel=log.LOG_LEVEL_ERROR)
+	_eliona = AssetIdHandler({"Asset 1": 1, "Asset 2": 2})
+
+	_cache.prefill(eliona=_eliona, assetGais={"Asset 1", "Asset 2"})
+
+	assert _cache.get(eliona=_eliona, assetGai="Asset 1") == 1
+	assert _cache.get(eliona=_eliona, assetGai="Asset 2") == 2
+	assert sorted(_eliona.requests) == ["Asset 1", "Asset 2"]
+
+
+def test_assetIdCacheResolvesUnknownGaisAgain():
+	from cache import AssetIdCache
+
+	_cache = AssetIdCache(logLevel=log.LOG_LEVEL_ERROR)
+	_eliona = AssetIdHandler({})
+
+	assert _cache.get(eliona=_eliona, assetGai="Asset 1") == 0
+
+	_eliona.assetIds["Asset 1"] = 1
+
+	assert _cache.get(eliona=_eliona, assetGai="Asset 1") == 1
+	assert _eliona.requests == ["Asset 1", "Asset 1"]
+
+
+def test_assetIdCacheClear():
+	from cache import AssetIdCache
+
+	_cache = AssetIdCache(logLevel=log.LOG_LEVEL_ERROR)
+	_eliona = AssetIdHandler({"Asset 1": 1})
+	_cache.get(eliona=_eliona, assetGai="Asset 1")
+
+	#The asset was created again with another id
+	_eliona.assetIds["Asset 1"] = 7
+	_cache.clear()
+
+	assert _cache.get(eliona=_eliona, assetGai="Asset 1") == 7
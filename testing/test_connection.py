@@ -0,0 +1,140 @@
+"""
+Tests of the connection manager
+"""
+
+import threading
+
+import utils.logger as log
+import connection
+from connection import ConnectionManager
+from spreadsheet import Spreadsheet
+from eliona_modules.api.core.eliona_core import ConStat
+
+
+SETTINGS = {"host": "eliona", "api": "https://eliona/api/v2", "projectId": "1", "apiKey": "key", "dbTimeZone": "UTC"}
+
+
+class SlowHandler:
+	"""
+	Eliona handler with a connection check waiting for a release
+	"""
+
+	release = threading.Event()
+	checking = threading.Event()
+
+	def __init__(self, settings:dict, logger:str) -> None:
+		self.settings = settings
+		self.connection = ConStat.DISCONNECTED
+
+	def check_connection(self) -> None:
+		if self.settings["host"] == "slow":
+			self.checking.set()
+			self.release.wait(timeout=10)
+		self.connection = ConStat.CONNECTED
+
+
+def connectionManager(monkeypatch) -> ConnectionManager:
+	"""
+	Create a manager using the slow handler
+	"""
+
+	SlowHandler.release = threading.Event()
+	SlowHandler.checking = threading.Event()
+	monkeypatch.setattr(connection, "ElionaApiHandler", SlowHandler)
+
+	return ConnectionManager(logLevel=log.LOG_LEVEL_ERROR)
+
+
+def test_connectionIsCheckedOncePerCycle(monkeypatch):
+	_manager = connectionManager(monkeypatch)
+
+	_eliona = _manager.get(settings=SETTINGS)
+
+	assert _manager.get(settings=SETTINGS) is _eliona
+	assert _manager.checks == 1
+
+	_manager.newCycle()
+
+	assert _manager.get(settings=SETTINGS) is _eliona
+	assert _manager.checks == 1
+
+
+def test_threadsUseOwnHandlers(monkeypatch):
+	_manager = connectionManager(monkeypatch)
+	_handlers = []
+
+	def request():
+		_handlers.append(_manager.get(settings=SETTINGS))
+
+	_threads = [threading.Thread(target=request) for _ in range(4)]
+	for _thread in _threads:
+		_thread.start()
+	for _thread in _threads:
+		_thread.join()
+
+	assert len(set(map(id, _handlers))) == 4
+	assert all(_eliona.connection == ConStat.CONNECTED for _eliona in _handlers)
+
+
+def test_leasedHandlersAreNotShared(monkeypatch):
+	_manager = connectionManager(monkeypatch)
+
+	with _manager.lease(settings=SETTINGS) as _first:
+		with _manager.lease(settings=SETTINGS) as _second:
+			assert _first is not _second
+
+	with _manager.lease(settings=SETTINGS) as _again:
+		assert _again in (_first, _second)
+
+	assert _manager.checks == 2
+
+
+def test_slowCheckDoesNotBlockOtherConnections(monkeypatch):
+	_manager = connectionManager(monkeypatch)
+
+	_slow = threading.Thread(target=_manager.get, kwargs={"settings": {**SETTINGS, "host": "slow"}})
+	_slow.start()
+	assert SlowHandler.checking.wait(timeout=5)
+
+	#The check of the slow connection is still running
+	_done = threading.Event()
+
+	def request():
+		_manager.get(settings=SETTINGS)
+		_done.set()
+
+	threading.Thread(target=request).start()
+
+	assert _done.wait(timeout=2)
+	SlowHandler.release.set()
+	_slow.join()
+
+
+def test_clearReplacesHandlers(monkeypatch):
+	_manager = connectionManager(monkeypatch)
+
+	_eliona = _manager.get(settings=SETTINGS)
+	with _manager.lease(settings=SETTINGS) as _leased:
+		pass
+
+	_manager.clear()
+
+	assert _manager.get(settings=SETTINGS) is not _eliona
+	with _manager.lease(settings=SETTINGS) as _again:
+		assert _again is not _leased
+
+
+def test_concurrentRequestsUseOwnHandlers(monkeypatch):
+	_manager = connectionManager(monkeypatch)
+	_spreadsheet = Spreadsheet(logLevel=log.LOG_LEVEL_ERROR, connectionManager=_manager)
+	_spreadsheet._connectionSettings = SETTINGS
+	_barrier = threading.Barrier(4, timeout=5)
+
+	def request(eliona, column:str):
+		_barrier.wait()
+		return eliona
+
+	_requests = {_column: {"eliona": _manager.get(settings=SETTINGS), "column": _column} for _column in "abcd"}
+	_results = _spreadsheet._Spreadsheet__fetchConcurrent(function=request, requests=_requests, maxWorkers=4)
+
+	assert len(set(map(id, _results.values()))) == 4
@@ -0,0 +1,82 @@
+"""
+Tests of the builtin formula engine
+"""
+
+import pytest
+from openpyxl import Workbook
+
+import utils.logger as log
+from evaluator import FormulaEvaluator, UnsupportedFormulaError
+from spreadsheet import Spreadsheet
+
+
+def evaluate(formulas:list, values:tuple=(2, 3)) -> list:
+	"""
+	Calculate formulas below the given values in the first column of a sheet
+
+	Return
+	------
+	-> list		= Calculated values of the formulas
+	"""
+
+	_workbook = Workbook()
+	_sheet = _workbook.active
+	_sheet.title = "Sheet1"
+
+	for _value in list(values) + list(formulas):
+		_sheet.append([_value])
+
+	_rows = FormulaEvaluator(workbook=_workbook, logLevel=log.LOG_LEVEL_ERROR).evaluateSheet(sheet="Sheet1")
+
+	return [_row[0] for _row in _rows[len(values):]]
+
+
+def test_operators():
+	assert evaluate(["=A1*A2+1", "=1+2*3^2", "=(A1+A2)/2", "=A2-A1-1", '=A1&"x"', "=A1<A2", "=A1<>2"]) == [7, 19, 2.5, 0, "2x", True, False]
+
+
+def test_functions():
+	assert evaluate(["=SUM(A1:A2)", "=AVERAGE(A1:A2)", "=MIN(A1:A2,1)", "=MAX(A1:A2)", '=IF(A1>A2,"yes","no")', "=IF(A1,SUM(A1:A2)*2,0)"]) == [5, 2.5, 1, 3, "no", 10]
+
+
+def test_numbersAreStoredLikeOpenpyxl():
+	assert evaluate(["=0.1+0.2", "=4/2", "=1/3"]) == [0.3, 2, 0.3333333333333333]
+
+
+def test_formulasOfOtherSheets():
+	_workbook = Workbook()
+	_sheet = _workbook.active
+	_sheet.title = "Sheet1"
+	_sheet["A1"] = 2
+	_sheet["A2"] = "='Other Sheet'!B1+1"
+
+	_other = _workbook.create_sheet("Other Sheet")
+	_other["B1"] = "=Sheet1!A1*10"
+
+	assert FormulaEvaluator(workbook=_workbook, logLevel=log.LOG_LEVEL_ERROR).evaluateSheet(sheet="Sheet1") == [(2,), (21,)]
+
+
+#Unknown functions, excel errors, a reference to the cell itself and syntax errors
+@pytest.mark.parametrize("formula", ["=VLOOKUP(A1,A1:A2,1)", "=A1/0", "=A3", "=SUM(A1:A2", '=A1+"text"', "=#REF!"])
+def test_unsupportedFormulas(formula):
+	with pytest.raises(UnsupportedFormulaError):
+		evaluate([formula])
+
+
+def test_sameValuesAsFormulasPackage(tmp_path):
+	_workbook = Workbook()
+	_sheet = _workbook.active
+	_sheet.title = "Sheet1"
+	_sheet.append(["Timestamp", "Energie", "Leistung", "Summe"])
+
+	for _row in range(2, 12):
+		_sheet.append([f"2023-03-{_row:02}", _row * 1.5, _row % 4, f"=IF(B{_row}>C{_row},B{_row}-C{_row},SUM(B{_row}:C{_row})*2)"])
+
+	_sheet.append(["Total", "=SUM(B2:B11)", "=AVERAGE(C2:C11)", "=MAX(D2:D11)-MIN(D2:D11)"])
+
+	_path = str(tmp_path / "report.xlsx")
+	_workbook.save(_path)
+
+	_expected = Spreadsheet(logLevel=log.LOG_LEVEL_ERROR)._Spreadsheet__calculateWithFormulas(excelFilePath=_path, excelSheet="Sheet1")
+
+	assert FormulaEvaluator(workbook=_workbook, logLevel=log.LOG_LEVEL_ERROR).evaluateSheet(sheet="Sheet1") == _expected
@@ -0,0 +1,116 @@
+"""
+Tests of the mail delivery
+"""
+
+import threading
+
+import mail
+import utils.logger as log
+from enums import ReportState
+
+
+class MailStateHandler:
+	"""
+	Connected eliona handler returning the given mail states
+	"""
+
+	connection = mail.ConStat.CONNECTED
+
+	def __init__(self, states:dict) -> None:
+		self.states = states
+
+	def get_mail_state(self, mailId:str) -> tuple:
+		return self.states[mailId]
+
+
+class DelayedDeliveryHandler:
+	"""
+	Connected eliona handler reporting a mail as scheduled for the given number of checks. The intervals of the mail are recorded on every check
+	"""
+
+	connection = mail.ConStat.CONNECTED
+
+	def __init__(self, tracker:mail.MailTracker, checks:int) -> None:
+		self.tracker = tracker
+		self.checks = checks
+		self.intervals = []
+
+	def get_mail_state(self, mailId:str) -> tuple:
+		self.intervals.append(self.tracker._mails[mailId]["interval"])
+
+		if len(self.intervals) > self.checks:
+			return {"status": "sent"}, ""
+
+		return {"status": "scheduled"}, ""
+
+
+class StaticConnections:
+	"""
+	Connection manager returning the same handler for every connection
+	"""
+
+	def __init__(self, eliona) -> None:
+		self.eliona = eliona
+
+	def get(self, settings:dict):
+		return self.eliona
+
+
+def test_pollSkipsOnlyMailsWithoutState():
+	_eliona = MailStateHandler({"1": (None, "Internal server error"),
+								"2": ({}, ""),
+								"3": ({"status": "sent"}, ""),
+								"4": ({"status": "scheduled"}, "")})
+	_tracker = mail.MailTracker(logLevel=log.LOG_LEVEL_ERROR, connectionManager=StaticConnections(_eliona))
+	_connection = {"host": "eliona.example.com"}
+
+	_results = _tracker._poll(mails={_mailId: {"connection": _connection} for _mailId in ("1", "2", "3", "4")})
+
+	assert _results == {"3": ReportState.SEND_SUCCESSFULLY, "4": ReportState.SENDING}
+
+
+def trackMail(monkeypatch, checks:int, timeout:float=5) -> tuple:
+	"""
+	Track one mail with short poll intervals till its delivery is decided
+
+	Return
+	-----
+	-> tuple = States passed to onDelivery, checked intervals and the tracker
+	"""
+
+	monkeypatch.setattr(mail, "MAIL_POLL_INTERVAL", 0.01)
+	monkeypatch.setattr(mail, "MAIL_POLL_MAX_INTERVAL", 0.05)
+	monkeypatch.setattr(mail, "MAIL_DELIVERY_TIMEOUT", timeout)
+
+	_tracker = mail.MailTracker(logLevel=log.LOG_LEVEL_ERROR)
+	_eliona = DelayedDeliveryHandler(tracker=_tracker, checks=checks)
+	_tracker.connectionManager = StaticConnections(_eliona)
+
+	_states = []
+	_decided = threading.Event()
+
+	def onDelivery(state:ReportState) -> None:
+		_states.append(state)
+		_decided.set()
+
+	_tracker.track(connection={"host": "eliona.example.com"}, mailId="1", onDelivery=onDelivery)
+
+	assert _decided.wait(timeout=10)
+
+	return _states, _eliona.intervals, _tracker
+
+
+def test_trackerDoublesPollIntervalTillSent(monkeypatch):
+	_states, _intervals, _tracker = trackMail(monkeypatch, checks=4)
+
+	assert _states == [ReportState.SEND_SUCCESSFULLY]
+	assert _intervals == [0.01, 0.02, 0.04, 0.05, 0.05]
+	assert _tracker.pending() == 0
+
+
+def test_trackerCancelsMailsNotSentInTime(monkeypatch):
+	_states, _intervals, _tracker = trackMail(monkeypatch, checks=1000, timeout=0.2)
+
+	assert _states == [ReportState.CANCELED]
+	assert 2 < len(_intervals) < 1000
+	assert _tracker.pending() == 0
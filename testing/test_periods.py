@@ -0,0 +1,51 @@
+"""
+Tests of the report periods
+"""
+
+from datetime import datetime
+
+import pytz
+
+import utils.logger as log
+from enums import Schedule
+from periods import PeriodCalendar, parseTimeZone
+from reporting import Report
+
+
+def test_timeZoneNamesAreDaylightSavingTimeAware():
+	_calendar = PeriodCalendar.get(schedule=Schedule.MONTHLY, timeZone="Europe/Zurich")
+	_start, _end = _calendar.periodBefore(datetime(2023, 4, 15))
+
+	assert _start.utcoffset().total_seconds() == 3600
+	assert _end.utcoffset().total_seconds() == 7200
+	assert (_start.replace(tzinfo=None), _end.replace(tzinfo=None)) == (datetime(2023, 3, 1), datetime(2023, 4, 1))
+
+
+def test_timeZoneOffsetsAreFixed():
+	assert parseTimeZone(2) == pytz.FixedOffset(120)
+	assert parseTimeZone("-5") == pytz.FixedOffset(-300)
+	assert parseTimeZone(0) == pytz.FixedOffset(0)
+
+	for _schedule in (Schedule.YEARLY, Schedule.MONTHLY, Schedule.WEEKLY, Schedule.DAILY):
+
+		_calendar = PeriodCalendar.get(schedule=_schedule, timeZone=2)
+		_start, _end = _calendar.periodBefore(datetime(2023, 7, 15, 12))
+
+		assert _start.utcoffset().total_seconds() == 7200
+		assert _end.utcoffset().total_seconds() == 7200
+		assert _start < _end <= _calendar.lastBoundary(datetime(2023, 7, 15, 12))
+
+	_calendar = PeriodCalendar.get(schedule=Schedule.DAILY, timeZone=2)
+	assert _calendar.nextBoundary(datetime(2023, 7, 15, 12)).replace(tzinfo=None) == datetime(2023, 7, 16)
+	assert _calendar.lastBoundary(datetime(2023, 7, 15, 12)).replace(tzinfo=None) == datetime(2023, 7, 15)
+
+
+def test_reportWithTimeZoneOffset(tmp_path):
+	_report = Report(name="Report 1", tempFilePath=str(tmp_path) + "/", logLevel=log.LOG_LEVEL_ERROR, testing=True)
+	_report.configure(elionaConfig={"dbTimeZone": 2}, reportConfig={"name": "Report 1", "schedule": "monthly", "receiver": []})
+
+	assert _report.wasReportSend(datetime(2023, 7, 15)) == False
+
+	_start, _end = _report._getReportTimeSpan(schedule=Schedule.MONTHLY, timeZone=2, year=2023, month=7)
+
+	assert (_start, _end) == (datetime(2023, 6, 1, tzinfo=pytz.FixedOffset(120)), datetime(2023, 7, 1, tzinfo=pytz.FixedOffset(120)))
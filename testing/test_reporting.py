@@ -0,0 +1,106 @@
+"""
+Tests of the reports and users
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import utils.logger as log
+from enums import ReportState
+from reporting import User
+
+
+def test_userKeepsReportsNotDue(tmp_path):
+	_user = User(name="User 1", tempFilePath=str(tmp_path) + "/", logLevel=log.LOG_LEVEL_ERROR, testing=True)
+	_user.configure(elionaConfig={"dbTimeZone": "Europe/Zurich"},
+					userConfig={"name": "User 1", "msgEndpoint": "user@example.com", "reports": ["Monthly", "Yearly"]},
+					reportConfig=[{"name": "Monthly", "schedule": "monthly"}, {"name": "Yearly", "schedule": "yearly"}])
+
+	_created = []
+
+	def create(report:dict, year:int, month:int, day:int=1) -> bool:
+		_created.append((year, month, report["name"]))
+		return False
+
+	_user._create = create
+
+	#Only the monthly report is due in December
+	_user.lastSend = datetime(2023, 11, 1, 1)
+	_user.sendReport(year=2023, month=12, createOnly=True, sendAsync=False)
+
+	assert _created == [(2023, 12, "Monthly")]
+
+	#Both reports are due in January
+	_created.clear()
+	_user.lastSend = datetime(2023, 12, 1, 1)
+	_user.sendReport(year=2024, month=1, createOnly=True, sendAsync=False)
+
+	assert _created == [(2024, 1, "Monthly"), (2024, 1, "Yearly")]
+	assert [_report["name"] for _report in _user.reports] == ["Monthly", "Yearly"]
+
+
+def test_usersCreateTheSameReportOnce(tmp_path):
+	_user = User(name="User 1", tempFilePath=str(tmp_path) + "/", logLevel=log.LOG_LEVEL_ERROR, testing=True)
+	_user.elionaConfig = {"dbTimeZone": "Europe/Zurich"}
+	_rendered = []
+	_results = []
+
+	def render(report:dict, startDt:datetime, endDt:datetime) -> bool:
+		_rendered.append(report["tempPath"])
+		time.sleep(0.05)
+		with open(report["tempPath"], "w") as file:
+			file.write("report")
+		return True
+
+	def create():
+		_results.append(_user._create(report={"name": "Monthly", "schedule": "monthly", "reportPath": "Monthly.xlsx"}, year=2023, month=12))
+
+	_user._render = render
+
+	_threads = [threading.Thread(target=create) for _ in range(4)]
+	for _thread in _threads:
+		_thread.start()
+	for _thread in _threads:
+		_thread.join()
+
+	assert _results == [True] * 4
+	assert len(_rendered) == 1
+	assert os.path.isfile(_rendered[0])
+
+
+def monthlyUser(path) -> User:
+	"""
+	Create a user receiving a monthly report in the time zone of Zurich
+	"""
+
+	_user = User(name="User 1", tempFilePath=str(path) + "/", logLevel=log.LOG_LEVEL_ERROR, testing=False)
+	_user.configure(elionaConfig={"dbTimeZone": "Europe/Zurich"},
+					userConfig={"name": "User 1", "msgEndpoint": "user@example.com", "reports": ["Monthly"]},
+					reportConfig=[{"name": "Monthly", "schedule": "monthly"}])
+
+	return _user
+
+
+def test_nextDueTimeIsInTheTimeZoneOfTheCalendar(tmp_path):
+	_user = monthlyUser(tmp_path)
+	_user.lastSend = datetime(2023, 12, 1, 1)
+
+	assert _user.nextDueTime() == datetime(2023, 12, 31, 23, tzinfo=timezone.utc)
+
+
+def test_canceledSendingResumesWithTheNextPeriod(tmp_path):
+	_user = monthlyUser(tmp_path)
+	_user._cancel()
+
+	_now = datetime.now(tz=timezone.utc)
+	assert _now < _user.nextDueTime() <= _now + timedelta(days=32)
+
+	_user.resumeCanceled()
+	assert _user.state == ReportState.CANCELED
+
+	#The sending was canceled in the last period
+	_user.canceledAt = _now - timedelta(days=32)
+	_user.resumeCanceled()
+	assert _user.state == ReportState.IDLE
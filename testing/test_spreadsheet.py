@@ -0,0 +1,224 @@
+"""
+Tests of the report creation
+"""
+
+from datetime import datetime, timedelta
+
+import pytz
+
+import spreadsheet
+import utils.logger as log
+from cache import AssetIdCache
+from spreadsheet import Spreadsheet
+
+
+class TrendHandler:
+	"""
+	eliona handler returning the trend data of asset 1. The requests fail while failing is set
+	"""
+
+	def __init__(self) -> None:
+		self.failing = True
+		self.requests = 0
+
+	def get_data_trends(self, asset_id:int, from_date:str, to_date:str, data_subtype:str) -> tuple:
+		self.requests += 1
+
+		if self.failing:
+			return None, "Service unavailable"
+
+		return [{"asset_id": asset_id, "data": {"power": 42}}], ""
+
+
+def test_lastValueOfFailedSearchIsNotMemorized():
+	from cache import LastValueCache
+
+	_spreadsheet = Spreadsheet(logLevel=log.LOG_LEVEL_ERROR, lastValueCache=LastValueCache())
+	_eliona = TrendHandler()
+	_start = datetime(2023, 3, 1, tzinfo=pytz.utc)
+
+	assert _spreadsheet.getLastReceivedValue(eliona=_eliona, assetGai="", assetId=1, attribute="power", startDateTime=_start) == "NO-VALUE"
+
+	_eliona.failing = False
+
+	assert _spreadsheet.getLastReceivedValue(eliona=_eliona, assetGai="", assetId=1, attribute="power", startDateTime=_start) == 42
+	assert _spreadsheet.getLastReceivedValue(eliona=_eliona, assetGai="", assetId=1, attribute="power", startDateTime=_start) == 42
+	assert _eliona.requests == 2
+
+
+def test_lastValuesAreSharedByAllReports():
+	from cache import LastValueCache
+
+	_memo = LastValueCache()
+	_eliona = TrendHandler()
+	_eliona.failing = False
+	_start = datetime(2023, 3, 1, tzinfo=pytz.utc)
+
+	for _ in range(3):
+		_spreadsheet = Spreadsheet(logLevel=log.LOG_LEVEL_ERROR, lastValueCache=_memo)
+		assert _spreadsheet.getLastReceivedValue(eliona=_eliona, assetGai="", assetId=1, attribute="power", startDateTime=_start) == 42
+
+	assert _eliona.requests == 1
+
+	#Late data may change the last value. Expired values are searched again
+	_memo = LastValueCache(ttl=0)
+	for _ in range(2):
+		_spreadsheet = Spreadsheet(logLevel=log.LOG_LEVEL_ERROR, lastValueCache=_memo)
+		_spreadsheet.getLastReceivedValue(eliona=_eliona, assetGai="", assetId=1, attribute="power", startDateTime=_start)
+
+	assert _eliona.requests == 3
+
+
+def test_lastValueCacheRemovesLeastRecentlyUsed():
+	from cache import LastValueCache
+
+	_memo = LastValueCache(maxEntries=2)
+	_memo.set(key=("a",), value=1)
+	_memo.set(key=("b",), value=2)
+	_memo.get(key=("a",))
+	_memo.set(key=("c",), value=3)
+
+	assert (_memo.get(key=("a",)), _memo.get(key=("b",)), _memo.get(key=("c",))) == (1, None, 3)
+	assert len(_memo) == 2
+
+
+class DataListHandler:
+	"""
+	eliona handler with the hourly sums of asset 1. The given hours have no data
+	"""
+
+	def __init__(self, start:datetime, hours:int, gaps:set) -> None:
+		self.start = start
+		self.hours = hours
+		self.gaps = gaps
+
+	def get_data_aggregated(self, from_date:str, to_date:str, data_subtype:str, raster:str, attribute:str, asset_id:int|None=None, asset_gai:str|None=None) -> tuple:
+		_entries = [{"asset_id": 1, "attribute": attribute, "raster": raster, "timestamp": self.start + timedelta(hours=_hour), "sum": float(_hour + 1)}
+					for _hour in range(self.hours) if _hour not in self.gaps]
+		return _entries, None
+
+	def get_data_trends(self, asset_id:int, from_date:str, to_date:str, data_subtype:str) -> tuple:
+		return [{"asset_id": asset_id, "data": {"power": 42.0}}], ""
+
+
+def createDataListTable(fillNone:str) -> list:
+	"""
+	Create a data list table of six hours without data at the second and the fifth hour. The report setting fillNone is false
+	"""
+
+	import pandas as pd
+	from cache import LastValueCache
+
+	_start = datetime(2023, 3, 1, tzinfo=pytz.utc)
+	_spreadsheet = Spreadsheet(logLevel=log.LOG_LEVEL_ERROR, lastValueCache=LastValueCache())
+	_table = _spreadsheet._Spreadsheet__createDataListTable(eliona=DataListHandler(start=_start, hours=6, gaps={1, 4}), 
+															settings={"fillNone": False}, 
+															timeGrid=pd.date_range(start=_start, periods=6, freq="H"), 
+															timeStampColumnName="Timestamp", 
+															timeStampFormat="%Y-%m-%d %H:%M", 
+															raster="H1", 
+															dataColumns={"Energie": {"assetGai": "", "assetId": 1, "attribute": "power", "mode": "sum", "fillNone": fillNone}}, 
+															maxWorkers=1, 
+															previousRow=None, 
+															filledColumns=set())
+
+	return [None if pd.isnull(_value) else _value for _value in _table["Energie"]]
+
+
+def test_dataListColumnFillNoneFillsEveryGap():
+	assert createDataListTable(fillNone="zero") == [1.0, 0, 3.0, 4.0, 0, 6.0]
+	assert createDataListTable(fillNone="last") == [1.0, 42.0, 3.0, 4.0, 4.0, 6.0]
+	assert createDataListTable(fillNone="") == [1.0, None, 3.0, 4.0, None, 6.0]
+
+def test_csvWithoutFormulasSkipsFormattedEmptyCells(tmp_path):
+	from openpyxl import Workbook
+	from openpyxl.styles import Font
+
+	_workbook = Workbook()
+	_sheet = _workbook.active
+	_sheet.title = "Sheet1"
+	_sheet.append(["Timestamp", "Energie"])
+	_sheet.append(["2023-03-01", 1])
+	_sheet.append(["2023-03-02", 2])
+
+	#Formatted cells extend the sheet without a value
+	_sheet["C1"].font = Font(bold=True)
+	_sheet["A6"].font = Font(bold=True)
+
+	_path = str(tmp_path / "report.xlsx")
+	_workbook.save(_path)
+
+	_spreadsheet = Spreadsheet(logLevel=log.LOG_LEVEL_ERROR)
+	_spreadsheet.reportFilePath = _path
+
+	assert _spreadsheet._Spreadsheet__createCalculatedCsv(excelFilePath=_path, excelSheet="Sheet1", csvSeparator=";")
+	assert open(str(tmp_path / "report.csv")).read() == "Timestamp;Energie\n2023-03-01;1\n2023-03-02;2\n"
+
+
+class AggregatedHandler:
+	"""
+	eliona handler counting the aggregated data requests
+	"""
+
+	def __init__(self) -> None:
+		self.requests = 0
+
+	def get_data_aggregated(self, asset_id:int, from_date:str, to_date:str, data_subtype:str, raster:str, attribute:str) -> tuple:
+		self.requests += 1
+		return [{"asset_id": asset_id, "timestamp": from_date, "data": {"power_sum": 1}}], None
+
+
+def test_recentlyClosedPeriodsAreNotCachedForever(tmp_path):
+	from cache import DataCache
+
+	_end = datetime.now(tz=pytz.utc).replace(minute=0, second=0, microsecond=0) - timedelta(hours=3)
+	_start = _end - timedelta(days=1)
+
+	for _grace, _requests in ((86400, 2), (0, 1)):
+
+		_cache = DataCache(path=str(tmp_path / f"aggregated_{_grace}.sqlite"), logLevel=log.LOG_LEVEL_ERROR)
+		_cache.configure(config={"openPeriodTtl": 0, "closedPeriodGrace": _grace})
+		_spreadsheet = Spreadsheet(logLevel=log.LOG_LEVEL_ERROR, dataCache=_cache)
+		_eliona = AggregatedHandler()
+
+		for _ in range(2):
+			_spreadsheet._Spreadsheet__requestAggregatedData(eliona=_eliona, assetId=1, attribute="power", startDateTime=_start, endDateTime=_end, raster="DAY")
+
+		assert _eliona.requests == _requests
+
+
+class RecordingSpreadsheet:
+	"""
+	Report creator recording the caches it was given
+	"""
+
+	caches = []
+
+	def __init__(self, logLevel:int, dataCache, assetIdCache, templateCache, connectionManager) -> None:
+		self.caches.append((assetIdCache, templateCache))
+
+	def createReport(self, startDt:datetime, endDt:datetime, connectionSettings:dict, reportSettings:dict) -> bool:
+		return True
+
+
+def test_renderProcessClearsCachesWhenSettingsChanged(monkeypatch):
+	monkeypatch.setattr(spreadsheet, "Spreadsheet", RecordingSpreadsheet)
+	monkeypatch.setattr(spreadsheet, "_renderCaches", {})
+	RecordingSpreadsheet.caches = []
+
+	_assetIdCache = AssetIdCache(logLevel=log.LOG_LEVEL_ERROR)
+
+	def render() -> None:
+		_job = spreadsheet.createRenderJob(startDt=datetime(2023, 1, 1), endDt=datetime(2023, 2, 1), connectionSettings={}, reportSettings={}, 
+											logLevel=log.LOG_LEVEL_ERROR, assetIdCache=_assetIdCache)
+		assert spreadsheet.renderReport(_job)
+
+	render()
+	render()
+	_assetIdCache.clear()
+	render()
+
+	_first, _second, _third = RecordingSpreadsheet.caches
+
+	assert _first == _second
+	assert (_third[0] is not _first[0]) and (_third[1] is not _first[1])